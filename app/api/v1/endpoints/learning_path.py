@@ -1,27 +1,29 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from datetime import datetime
+import json
 import uuid
-from schemas.learning_path import LearningPathCreate, LearningPath, Task
+from config import get_settings
+from schemas.learning_path import (
+    LearningPathCreate, LearningPath, ReplanRequest, ReplanDelta,
+    TaskQueryResult, CriticalPath, TaskCompletion
+)
 from services.path_generator import PathGenerator
+from services.batch_generator import BatchPathGenerator
 from services.task_generator import TaskGenerator
-from core.knowledge_base import KnowledgeBase
-from core.materials_base import MaterialsBase
+from services.path_stream import stream_learning_path
+from services.replanner import Replanner
+from services.task_graph import TaskGraph, get_path_stage_store, get_task_graph_store
+from core.knowledge_base import KnowledgeBase, get_knowledge_base
+from core.materials_base import MaterialsBase, get_materials_base
 from core.kimi import KimiAPIError, KimiAuthenticationError, KimiRateLimitError
+from core.llm_usage import current_usage
+from core.timing import span
 
 router = APIRouter()
 
-def get_knowledge_base():
-    """Dependency to get KnowledgeBase instance"""
-    kb = KnowledgeBase()
-    kb.load_methods("data/study_methods/methods.json")
-    return kb
-
-def get_materials_base():
-    """Dependency to get MaterialsBase instance"""
-    mb = MaterialsBase()
-    mb.load_materials("data/study_materials/materials.json")
-    return mb
+COMPACT_MEDIA_TYPE = "application/vnd.learning-path.compact+json"
 
 def get_path_generator(
     kb: KnowledgeBase = Depends(get_knowledge_base),
@@ -30,6 +32,40 @@ def get_path_generator(
     """Dependency to get PathGenerator instance"""
     return PathGenerator(kb, mb)
 
+def wants_compact(request: Request, format: Optional[str]) -> bool:
+    """Whether the client opted into the compact response format"""
+    if format is not None:
+        return format == "compact"
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+def build_learning_path(
+    path_id: str,
+    profile: LearningPathCreate,
+    tasks: List[Dict[str, Any]],
+    degraded: bool = False
+) -> Dict[str, Any]:
+    """Assemble a LearningPath response body from task dicts already in Task shape"""
+    return {
+        "id": path_id,
+        "subject": profile.subject,
+        "difficulty_level": profile.difficulty_level,
+        "learning_goals": profile.learning_goals,
+        "available_time": profile.available_time,
+        "learning_style": profile.learning_style,
+        "created_at": datetime.utcnow().isoformat(),
+        "tasks": tasks,
+        "degraded": degraded
+    }
+
+def compact_learning_path(learning_path: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a learning path: stage names go into a lookup table keyed by stage_id"""
+    stages: Dict[str, str] = {}
+    tasks = []
+    for task in learning_path["tasks"]:
+        stages.setdefault(task["stage_id"], task["stage_name"])
+        tasks.append({key: value for key, value in task.items() if key != "stage_name"})
+    return {**learning_path, "tasks": tasks, "stages": stages}
+
 def get_task_generator():
     """Dependency to get TaskGenerator instance"""
     return TaskGenerator()
@@ -39,7 +75,7 @@ def get_task_generator():
     response_model=LearningPath,
     status_code=status.HTTP_201_CREATED,
     responses={
-        201: {"description": "Learning path created successfully"},
+        201: {"description": "Learning path created successfully", "content": {COMPACT_MEDIA_TYPE: {}}},
         400: {"description": "Invalid request parameters"},
         401: {"description": "Authentication failed"},
         429: {"description": "Rate limit exceeded"},
@@ -48,12 +84,26 @@ def get_task_generator():
 )
 async def create_learning_path(
     path: LearningPathCreate,
+    request: Request,
+    deadline: Optional[float] = Query(
+        None,
+        gt=0,
+        le=30,
+        description="Latency SLO in seconds for the Kimi plan (default: LLM_DEADLINE_SECONDS)"
+    ),
+    format: Optional[str] = Query(None, description="json or compact (default: from Accept)"),
     generator: PathGenerator = Depends(get_path_generator),
     task_generator: TaskGenerator = Depends(get_task_generator)
 ):
     """
     Create a new learning path based on user preferences and goals
     
+    If Kimi has not answered within the deadline, the path is built from
+    knowledge base retrieval only and returned with degraded=true.
+    
+    With format=compact or an Accept of application/vnd.learning-path.compact+json,
+    tasks omit stage_name and a "stages" table maps stage_id to its name.
+    
     Parameters:
     - subject: 学科名称 (e.g., 高中数学)
     - difficulty_level: 难度级别 (基础, 中等, 提高, 挑战)
@@ -71,25 +121,31 @@ async def create_learning_path(
     - 500: Internal server error
     """
     try:
-        # Generate learning path with stages and materials
-        learning_stages = await generator.generate_path(path)
+        # One Kimi plan per request, shared by both generators
+        plan = generator.create_plan(path, deadline)
         
-        # Generate tasks for each stage
-        tasks = await task_generator.generate_tasks(path, learning_stages)
+        # Generate learning path with stages and materials
+        learning_stages = await generator.generate_path(path, plan)
         
-        # Create learning path response
-        learning_path = LearningPath(
-            id=str(uuid.uuid4()),
-            subject=path.subject,
-            difficulty_level=path.difficulty_level,
-            learning_goals=path.learning_goals,
-            available_time=path.available_time,
-            learning_style=path.learning_style,
-            created_at=datetime.utcnow(),
-            tasks=[Task(**task) for task in tasks]
-        )
+        # Generate tasks for each stage; their ids derive from the path id
+        path_id = str(uuid.uuid4())
+        tasks = await task_generator.generate_tasks(path, learning_stages, plan, path_id)
+        get_task_graph_store().put(path_id, TaskGraph(tasks))
         
-        return learning_path
+        # Tasks already have the response shape, so skip re-validating them
+        # Stage durations reach the Server-Timing header via ServerTimingMiddleware
+        learning_path = build_learning_path(path_id, path, tasks, plan.degraded)
+        with span("serialize"):
+            if wants_compact(request, format):
+                return JSONResponse(
+                    status_code=status.HTTP_201_CREATED,
+                    content=compact_learning_path(learning_path),
+                    media_type=COMPACT_MEDIA_TYPE
+                )
+            return JSONResponse(
+                status_code=status.HTTP_201_CREATED,
+                content=learning_path
+            )
         
     except ValueError as e:
         raise HTTPException(
@@ -116,3 +172,319 @@ async def create_learning_path(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create learning path: {str(e)}"
         )
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Render one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _sse_events(events: AsyncIterator[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[str]:
+    async for event, data in events:
+        yield format_sse(event, data)
+
+@router.post(
+    "/learning-path/stream",
+    responses={
+        200: {"description": "Server-Sent Events stream of the learning path", "content": {"text/event-stream": {}}},
+        400: {"description": "Invalid request parameters"}
+    }
+)
+async def stream_learning_path_events(
+    path: LearningPathCreate,
+    generator: PathGenerator = Depends(get_path_generator),
+    task_generator: TaskGenerator = Depends(get_task_generator)
+):
+    """
+    Stream a new learning path as Server-Sent Events
+    
+    Events:
+    - path: path header (id, profile, created_at), sent immediately
+    - stage: one learning stage with its materials, methods and tasks
+    - recommendation: one Kimi study method recommendation, as it is generated
+    - error: a stage or recommendation failure (status_code, detail)
+    - done: end of stream with per-stage timings
+    """
+    return StreamingResponse(
+        _sse_events(stream_learning_path(path, generator, task_generator)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_ndjson(data: Dict[str, Any]) -> str:
+    """Render one newline-delimited JSON record"""
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+def _batch_error(error: Exception) -> Dict[str, Any]:
+    if isinstance(error, HTTPException):
+        return {"status_code": error.status_code, "detail": error.detail}
+    if isinstance(error, KimiAPIError):
+        return {"status_code": error.status_code, "detail": error.message}
+    if isinstance(error, ValueError):
+        return {"status_code": status.HTTP_400_BAD_REQUEST, "detail": str(error)}
+    return {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": str(error)}
+
+async def _batch_records(
+    profiles: List[LearningPathCreate],
+    batch_generator: BatchPathGenerator,
+    deadline: Optional[float]
+) -> AsyncIterator[str]:
+    timings: Dict[str, float] = {}
+    groups = set()
+    async for result in batch_generator.generate(profiles, deadline, timings):
+        groups.add(result["group"])
+        record = {
+            "index": result["index"],
+            "group": result["group"],
+            "group_size": result["group_size"]
+        }
+        if "error" in result:
+            record["error"] = _batch_error(result["error"])
+        else:
+            get_task_graph_store().put(result["path_id"], TaskGraph(result["tasks"]))
+            record["learning_path"] = build_learning_path(
+                result["path_id"],
+                result["profile"],
+                result["tasks"],
+                result["plan"].degraded
+            )
+        yield format_ndjson(record)
+        
+    usage = current_usage()
+    yield format_ndjson({
+        "done": True,
+        "students": len(profiles),
+        "groups": len(groups),
+        "timings": timings,
+        "llm": usage.summary() if usage is not None else None
+    })
+
+@router.post(
+    "/learning-path/batch",
+    responses={
+        200: {"description": "Newline-delimited JSON, one record per student", "content": {"application/x-ndjson": {}}},
+        400: {"description": "Empty or oversized batch"}
+    }
+)
+async def create_learning_paths_batch(
+    profiles: List[LearningPathCreate],
+    deadline: Optional[float] = Query(
+        None,
+        gt=0,
+        le=30,
+        description="Latency SLO in seconds for each Kimi plan (default: LLM_DEADLINE_SECONDS)"
+    ),
+    generator: PathGenerator = Depends(get_path_generator),
+    task_generator: TaskGenerator = Depends(get_task_generator)
+):
+    """
+    Create learning paths for a whole class in one request
+    
+    Profiles that match on subject, level, time, style and (normalized)
+    goals share one Kimi plan; retrieval for all profiles runs as a single
+    batched search. Results stream back as NDJSON in completion order.
+    
+    Records:
+    - {index, group, group_size, learning_path}: one student's learning path
+    - {index, group, group_size, error}: one student's failure (status_code, detail)
+    - {done, students, groups, timings, llm}: end of stream
+    """
+    max_profiles = get_settings().BATCH_MAX_PROFILES
+    if not profiles or len(profiles) > max_profiles:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch must contain between 1 and {max_profiles} profiles"
+        )
+        
+    return StreamingResponse(
+        _batch_records(profiles, BatchPathGenerator(generator, task_generator), deadline),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _task_records(
+    path: LearningPathCreate,
+    path_id: str,
+    generator: PathGenerator,
+    task_generator: TaskGenerator,
+    start_week: int,
+    end_week: Optional[int]
+) -> AsyncIterator[str]:
+    # Later pages of the same path reuse its stages instead of retrieving and asking Kimi again
+    store = get_path_stage_store()
+    stored = store.get(path_id)
+    if stored is None:
+        plan = generator.create_plan(path)
+        learning_stages = await generator.generate_path(path, plan)
+        stored = (learning_stages, await plan.top_recommendation(), datetime.now())
+        store.put(path_id, stored)
+    learning_stages, recommendation, start_date = stored
+    for task in task_generator.iter_tasks(
+        learning_stages,
+        start_date=start_date,
+        recommendation=recommendation,
+        start_week=start_week,
+        end_week=end_week,
+        path_id=path_id
+    ):
+        yield format_ndjson(task)
+
+@router.post(
+    "/learning-path/tasks",
+    responses={
+        200: {"description": "Newline-delimited JSON, one task per line", "content": {"application/x-ndjson": {}}},
+        400: {"description": "Invalid request parameters"}
+    }
+)
+async def stream_learning_path_tasks(
+    path: LearningPathCreate,
+    start_week: int = Query(1, ge=1, description="First week to generate"),
+    end_week: Optional[int] = Query(None, ge=1, description="Last week to generate (default: end of plan)"),
+    path_id: Optional[str] = Query(None, description="X-Path-Id of an earlier page of the same path"),
+    generator: PathGenerator = Depends(get_path_generator),
+    task_generator: TaskGenerator = Depends(get_task_generator)
+):
+    """
+    Stream the tasks of a learning path as NDJSON, optionally for a week range
+    
+    Tasks are generated lazily as they are written, so memory stays flat
+    however many weeks and materials the plan has. The X-Path-Id response
+    header names the path; passing it back as path_id for other week ranges
+    gives the same task ids and dates without regenerating the path.
+    """
+    if end_week is not None and end_week < start_week:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_week must not be before start_week"
+        )
+        
+    path_id = path_id or str(uuid.uuid4())
+    return StreamingResponse(
+        _task_records(path, path_id, generator, task_generator, start_week, end_week),
+        media_type="application/x-ndjson",
+        headers={"X-Path-Id": path_id}
+    )
+
+@router.post(
+    "/learning-path/replan",
+    response_model=ReplanDelta,
+    responses={
+        200: {"description": "Changes to apply to the plan"},
+        400: {"description": "Invalid request parameters or unknown task IDs"}
+    }
+)
+async def replan_learning_path(request: ReplanRequest):
+    """
+    Re-plan a learning path from progress events without regenerating it
+    
+    Only the tasks downstream of each event, along their dependencies, are
+    recomputed; no retrieval or Kimi calls are made. Unaffected tasks keep
+    their ids and are left out of the response.
+    
+    Events:
+    - completed: mark a task done; a late completion (date after due_date) delays its dependents
+    - delayed: push a task and its open dependents back by delay_days
+    - skipped: drop a task, or a week or month with the tasks it groups; its dependents are relinked
+    
+    Returns:
+    - updated: changed tasks in full, removed: dropped task IDs, unchanged: count of the rest
+    """
+    tasks = [task.dict() for task in request.plan.tasks]
+    try:
+        delta = Replanner().replan(tasks, request.events)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+        
+    # Keep the graph queried by the endpoints below in step with the new plan
+    store = get_task_graph_store()
+    graph = store.get(request.plan.id)
+    if graph is not None:
+        removed = set(delta["removed"])
+        updated = {task["id"]: task for task in delta["updated"]}
+        store.put(request.plan.id, TaskGraph(
+            {**updated.get(task["id"], task), "completed": True} if task["id"] in graph.completed
+            else updated.get(task["id"], task)
+            for task in tasks if task["id"] not in removed
+        ))
+    return {"path_id": request.plan.id, **delta}
+
+def _stored_graph(path_id: str, task_id: Optional[str] = None) -> TaskGraph:
+    """Task graph of a generated path, or 404 if it is unknown or has expired"""
+    graph = get_task_graph_store().get(path_id)
+    if graph is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Learning path {path_id} not found or expired"
+        )
+    if task_id is not None and task_id not in graph:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task {task_id} not found in learning path {path_id}"
+        )
+    return graph
+
+@router.get(
+    "/learning-path/{path_id}/tasks/ready",
+    response_model=TaskQueryResult,
+    responses={404: {"description": "Learning path not found or expired"}}
+)
+async def get_ready_tasks(path_id: str):
+    """
+    Open tasks whose dependencies are all completed, i.e. what to work on now
+    """
+    graph = _stored_graph(path_id)
+    return {"path_id": path_id, "tasks": [graph.tasks[task_id] for task_id in graph.ready()]}
+
+@router.get(
+    "/learning-path/{path_id}/tasks/{task_id}/dependents",
+    response_model=TaskQueryResult,
+    responses={404: {"description": "Learning path or task not found"}}
+)
+async def get_task_dependents(
+    path_id: str,
+    task_id: str,
+    transitive: bool = Query(False, description="Include indirect dependents")
+):
+    """
+    Tasks that depend on a task, directly or (with transitive=true) through other tasks
+    
+    Transitive dependents are listed in topological order.
+    """
+    graph = _stored_graph(path_id, task_id)
+    if transitive:
+        downstream = graph.downstream(task_id)
+        task_ids = [dependent for dependent in graph.topological_order() if dependent in downstream]
+    else:
+        task_ids = graph.dependents[task_id]
+    return {"path_id": path_id, "tasks": [graph.tasks[dependent] for dependent in task_ids]}
+
+@router.get(
+    "/learning-path/{path_id}/critical-path",
+    response_model=CriticalPath,
+    responses={404: {"description": "Learning path not found or expired"}}
+)
+async def get_critical_path(path_id: str):
+    """
+    Longest chain of open tasks by study minutes
+    
+    Monthly and weekly tasks only group daily work and add no minutes of their own.
+    """
+    graph = _stored_graph(path_id)
+    minutes, task_ids = graph.critical_path()
+    return {"path_id": path_id, "minutes": minutes, "tasks": [graph.tasks[task_id] for task_id in task_ids]}
+
+@router.post(
+    "/learning-path/{path_id}/tasks/{task_id}/complete",
+    response_model=TaskCompletion,
+    responses={404: {"description": "Learning path or task not found"}}
+)
+async def complete_task(path_id: str, task_id: str):
+    """
+    Mark a task completed and return the tasks it unblocked
+    
+    Due dates are not changed; use /learning-path/replan for late completions.
+    """
+    graph = _stored_graph(path_id, task_id)
+    unblocked = graph.complete(task_id)
+    return {"path_id": path_id, "task_id": task_id, "unblocked": [graph.tasks[dependent] for dependent in unblocked]}
@@ -1,23 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
 from schemas.materials import Material, MaterialResponse
-from core.materials_base import MaterialsBase
-from core.knowledge_base import KnowledgeBase
+from core.materials_base import MaterialsBase, get_materials_base
+from core.knowledge_base import KnowledgeBase, get_knowledge_base
 
 router = APIRouter()
 
-def get_materials_base():
-    """Dependency to get MaterialsBase instance"""
-    mb = MaterialsBase()
-    mb.load_materials("data/study_materials/materials.json")
-    return mb
-
-def get_knowledge_base():
-    """Dependency to get KnowledgeBase instance"""
-    kb = KnowledgeBase()
-    kb.load_methods("data/study_methods/methods.json")
-    return kb
-
 @router.get("/materials/{stage_id}", response_model=List[MaterialResponse])
 async def get_materials(
     stage_id: str,
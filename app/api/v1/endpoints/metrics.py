@@ -0,0 +1,95 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from core.llm_usage import usage_aggregator
+from core.loop_monitor import get_loop_monitor
+from core.metrics import metrics_registry
+from core.profiling import get_profiler, profile_token_valid
+
+router = APIRouter()
+exposition_router = APIRouter()
+
+@router.get("/metrics/llm")
+async def get_llm_metrics():
+    """
+    Aggregated Kimi usage since process start
+    
+    Returns one row per (route, caller) with call, cache hit, error and retry
+    counts, prompt/completion tokens and latency totals.
+    """
+    return {"usage": usage_aggregator.snapshot()}
+
+@router.get("/metrics/timing")
+async def get_timing_metrics():
+    """
+    Histograms of request stage durations since process start
+    
+    span_duration_ms has one series per span (llm, materials, methods,
+    encode, search, model_load, tasks, serialize, kimi, ...), with
+    cumulative bucket counts in milliseconds.
+    """
+    return metrics_registry.snapshot()
+
+@router.get("/metrics/loop")
+async def get_loop_metrics():
+    """
+    Event loop lag since process start and the most recent stalls
+    
+    Each stall has the loop thread's stack at the moment the watchdog saw
+    it blocked: the frame doing blocking work on the loop, to be moved to
+    run_in_worker(). lag_ms is the stall's full length once it is over.
+    """
+    return get_loop_monitor().snapshot()
+
+def _check_profile_token(token: Optional[str]) -> None:
+    if not profile_token_valid(token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token is required")
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """
+    Recently captured request profiles, newest first
+    
+    Requests opt in with X-Profile: 1 (or ?profile=1) and X-Profile-Token;
+    see core.profiling.ProfilingMiddleware.
+    """
+    _check_profile_token(x_profile_token)
+    return {"profiles": get_profiler().list(), "skipped": get_profiler().skipped}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    x_profile_token: Optional[str] = Header(None)
+):
+    """
+    One captured profile as collapsed stacks or a speedscope file
+    
+    Collapsed stacks feed flamegraph.pl or speedscope directly; the
+    speedscope JSON opens at https://www.speedscope.app.
+    """
+    _check_profile_token(x_profile_token)
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "speedscope":
+        return JSONResponse(
+            profile.speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'}
+        )
+    return PlainTextResponse(profile.collapsed())
+
+@exposition_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_prometheus_metrics():
+    """
+    All metrics in the Prometheus text exposition format
+    
+    Request latency per route, encode batch sizes, stage latencies
+    (encode, search, kimi, ...), cache lookups, Kimi calls, worker pool
+    depth and process RSS. Served at the root, outside the API prefix,
+    where scrapers look by default.
+    """
+    return PlainTextResponse(
+        metrics_registry.exposition(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -9,8 +9,26 @@ class Settings(BaseSettings):
     API_V1_STR: str = os.getenv("API_V1_STR", "/api/v1")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     KIMI_API_KEY: str = os.getenv("KIMI_API_KEY", "")
+    KIMI_BASE_URL: str = os.getenv("KIMI_BASE_URL", "https://api.kimi.moonshot.cn/v1")  # Point at scripts/mock_kimi_server.py for offline runs
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "80"))
+    KIMI_MAX_RETRIES: int = int(os.getenv("KIMI_MAX_RETRIES", "2"))
+    KIMI_RETRY_MAX_WAIT: float = float(os.getenv("KIMI_RETRY_MAX_WAIT", "5"))
+    LLM_DEADLINE_SECONDS: float = float(os.getenv("LLM_DEADLINE_SECONDS", "8"))
+    LLM_LATE_CACHE_TTL: int = int(os.getenv("LLM_LATE_CACHE_TTL", "3600"))  # 0 disables
+    LLM_LATE_CACHE_SIZE: int = int(os.getenv("LLM_LATE_CACHE_SIZE", "256"))
+    RETRIEVAL_WORKERS: int = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+    BATCH_MAX_PROFILES: int = int(os.getenv("BATCH_MAX_PROFILES", "60"))
+    TASK_GRAPH_STORE_SIZE: int = int(os.getenv("TASK_GRAPH_STORE_SIZE", "256"))  # 0 disables
+    TASK_GRAPH_TTL: int = int(os.getenv("TASK_GRAPH_TTL", "86400"))
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")  # Empty disables per-request profiling
+    PROFILE_SAMPLE_HZ: float = float(os.getenv("PROFILE_SAMPLE_HZ", "100"))
+    PROFILE_MAX_CONCURRENT: int = int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))
+    PROFILE_STORE_SIZE: int = int(os.getenv("PROFILE_STORE_SIZE", "16"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "")  # Also write collapsed stacks here when set
+    LOOP_MONITOR_INTERVAL: float = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))  # Seconds; 0 disables
+    LOOP_LAG_THRESHOLD_MS: float = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))  # Lag that counts as a stall
+    LOOP_STALLS_KEPT: int = int(os.getenv("LOOP_STALLS_KEPT", "20"))
 
     class Config:
         case_sensitive = True
@@ -0,0 +1,78 @@
+from typing import Any, Dict, NamedTuple, Optional
+from functools import lru_cache
+import re
+from core.metrics import register_cache
+
+UNIT_MINUTES = {"分钟": 1, "小时": 60, "天": 1440, "周": 10080, "个月": 43200, "月": 43200}
+_UNIT = "|".join(sorted(UNIT_MINUTES, key=len, reverse=True))
+_DURATION_PATTERN = re.compile(
+    rf"(?P<low>\d+(?:\.\d+)?)\s*(?P<low_unit>{_UNIT})?"
+    rf"(?:\s*(?:-|~|～|到|至)\s*(?P<high>\d+(?:\.\d+)?))?\s*(?P<unit>{_UNIT})"
+)
+
+class Duration(NamedTuple):
+    """A parsed duration such as "每天1-2小时": prefix "每天", 1 to 2 of unit "小时"."""
+    prefix: str
+    low: float
+    high: float
+    unit: str
+    min_minutes: int
+    max_minutes: int
+
+    def scaled(self, factor: float) -> str:
+        """Render the duration with both bounds multiplied by ``factor``, keeping prefix and unit"""
+        if self.unit == "分钟":
+            values = [str(int(self.low * factor)), str(int(self.high * factor))]
+        else:
+            values = [f"{self.low * factor:.1f}", f"{self.high * factor:.1f}"]
+        if self.low == self.high:
+            values = values[:1]
+        return f"{self.prefix}{'-'.join(values)}{self.unit}"
+
+@lru_cache(maxsize=4096)
+def parse_duration(text: str) -> Optional[Duration]:
+    """Parse "30分钟", "1-2小时", "每天1-2小时", "每个概念30-60分钟", "1-2周" or "1小时30分钟"
+
+    Text before the first number is the prefix. Several amounts in a row
+    ("1小时30分钟") add up and are reported in minutes. Returns None when
+    there is no amount with a unit. Results are cached, so callers share
+    one parse per distinct string.
+    """
+    matches = list(_DURATION_PATTERN.finditer(str(text)))
+    if not matches:
+        return None
+    prefix = text[:matches[0].start()].strip()
+    if len(matches) > 1:
+        low = high = 0
+        for match in matches:
+            bounds = _bounds_minutes(match)
+            low += bounds[0]
+            high += bounds[1]
+        return Duration(prefix, low, high, "分钟", int(low), int(high))
+
+    match = matches[0]
+    low = float(match.group("low"))
+    high = float(match.group("high") or low)
+    low_minutes, high_minutes = _bounds_minutes(match)
+    return Duration(prefix, low, high, match.group("unit"), int(low_minutes), int(high_minutes))
+
+register_cache("duration_parse", lambda: parse_duration.cache_info()[:2])
+
+def duration_minutes(text: str, default: int = 0) -> int:
+    """Upper bound in minutes of a duration string, or ``default`` if it has none"""
+    duration = parse_duration(text)
+    return duration.max_minutes if duration is not None else default
+
+def material_minutes(material: Dict[str, Any], default: int = 0) -> int:
+    """Minutes of a material, precomputed at ingest when available"""
+    minutes = material.get("estimated_minutes")
+    if minutes is not None:
+        return minutes
+    return duration_minutes(material.get("estimated_time", ""), default)
+
+def _bounds_minutes(match: "re.Match") -> tuple:
+    unit = UNIT_MINUTES[match.group("unit")]
+    low_unit = UNIT_MINUTES[match.group("low_unit")] if match.group("low_unit") else unit
+    low = float(match.group("low")) * low_unit
+    high = float(match.group("high")) * unit if match.group("high") else low
+    return low, high
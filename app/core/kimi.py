@@ -1,11 +1,19 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 import httpx
 import json
 import base64
 import asyncio
+import time
 from datetime import datetime, timedelta
 from config import get_settings
 from fastapi import HTTPException
+from core.prompt_builder import estimate_tokens
+from core.llm_usage import LLMCallRecord, record_call
+from core.timing import record_span
+
+SYSTEM_PROMPT = "You are an AI tutor specializing in Chinese high school mathematics education."
+SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
 class KimiAPIError(Exception):
     """Base exception for Kimi API errors"""
@@ -25,12 +33,71 @@ class KimiRateLimitError(KimiAPIError):
         super().__init__(message, status_code=429)
         self.retry_after = retry_after
 
+class RecommendationStreamParser:
+    """Incrementally extract objects from the recommended_methods array of a streamed reply"""
+    KEY = '"recommended_methods"'
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.in_array = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add a chunk of content and return the recommendations it completed"""
+        self.buffer += text
+        completed = []
+        if self.done:
+            return completed
+        
+        # Wait until the array opening bracket has arrived
+        if not self.in_array:
+            key_at = self.buffer.find(self.KEY)
+            bracket_at = self.buffer.find("[", key_at + len(self.KEY)) if key_at >= 0 else -1
+            if bracket_at < 0:
+                return completed
+            self.in_array = True
+            self.position = bracket_at + 1
+            
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.object_start = self.position
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        completed.append(json.loads(self.buffer[self.object_start:self.position + 1]))
+                    except json.JSONDecodeError:
+                        pass
+            elif char == "]" and self.depth == 0:
+                self.done = True
+                break
+            self.position += 1
+            
+        return completed
+
 class KimiAPI:
     def __init__(self):
         """Initialize Kimi API client with configuration"""
         settings = get_settings()
         self.api_key = settings.KIMI_API_KEY
-        self.base_url = "https://api.kimi.moonshot.cn/v1"
+        self.base_url = settings.KIMI_BASE_URL.rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -41,6 +108,9 @@ class KimiAPI:
             "max_requests": 100,  # Requests per minute
             "window_size": 60     # Window size in seconds
         }
+        self.max_retries = settings.KIMI_MAX_RETRIES
+        self.retry_max_wait = settings.KIMI_RETRY_MAX_WAIT
+        self.retry_budget = settings.LLM_DEADLINE_SECONDS  # Retrying past the plan deadline only feeds the late cache
         
         # Validate API key format
         self._validate_api_key()
@@ -77,41 +147,99 @@ class KimiAPI:
             
         self.rate_limit["requests"] += 1
 
-    async def generate_method_match(self, user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate method matches based on user profile using Kimi API"""
+    async def generate_method_match(
+        self,
+        user_profile: Dict[str, Any],
+        caller: str = "method_match"
+    ) -> List[Dict[str, Any]]:
+        """Generate method matches based on user profile using Kimi API
+
+        ``caller`` labels the call in the per-request and aggregated usage.
+        """
+        record = None
+        started = time.perf_counter()
         try:
             await self._check_rate_limit()
-            prompt = self._create_method_match_prompt(user_profile)
+            prompt, prompt_tokens = self._create_method_match_prompt(user_profile)
+            record = LLMCallRecord(caller, prompt_tokens=SYSTEM_PROMPT_TOKENS + prompt_tokens)
             
             async with httpx.AsyncClient() as client:
                 try:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        headers=self.headers,
-                        json={
-                            "messages": [
-                                {"role": "system", "content": "You are an AI tutor specializing in Chinese high school mathematics education."},
-                                {"role": "user", "content": prompt}
-                            ],
-                            "model": "moonshot-v1-8k",
-                            "temperature": 0.7,
-                            "response_format": {"type": "json_object"}
-                        },
-                        timeout=30.0  # 30 second timeout
-                    )
-                    
-                    if response.status_code == 401:
-                        raise KimiAuthenticationError("Invalid API key or authentication failed")
-                    elif response.status_code == 429:
-                        retry_after = int(response.headers.get("Retry-After", 60))
-                        raise KimiRateLimitError("Rate limit exceeded", retry_after=retry_after)
-                    elif response.status_code != 200:
-                        raise KimiAPIError(f"Kimi API error: {response.text}", status_code=response.status_code)
+                    response = await self._send(client, self._build_payload(prompt), record)
+                    self._raise_for_status(response)
                         
                     result = response.json()
-                    return self._parse_method_match_response(result)
+                    record.apply_usage(result.get("usage"))
+                    methods = self._parse_method_match_response(result)
+                    record.status = "ok"
+                    return methods
+                    
+                except httpx.TimeoutException:
+                    record.status = "timeout"
+                    raise KimiAPIError("Request timed out", status_code=504)
+                except httpx.RequestError as e:
+                    raise KimiAPIError(f"Request failed: {str(e)}", status_code=502)
+                    
+        except KimiAPIError as e:
+            # Convert to FastAPI HTTPException
+            raise HTTPException(
+                status_code=e.status_code,
+                detail={"message": e.message, "retry_after": getattr(e, "retry_after", None)}
+            )
+        finally:
+            if record is not None:
+                record.latency_ms = (time.perf_counter() - started) * 1000
+                record_call(record)
+                record_span("kimi_stream" if record.streamed else "kimi", record.latency_ms)
+
+    async def stream_method_match(
+        self,
+        user_profile: Dict[str, Any],
+        caller: str = "method_match_stream"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream method matches, yielding each recommendation as soon as its JSON object is complete"""
+        record = None
+        started = time.perf_counter()
+        try:
+            await self._check_rate_limit()
+            prompt, prompt_tokens = self._create_method_match_prompt(user_profile)
+            record = LLMCallRecord(caller, prompt_tokens=SYSTEM_PROMPT_TOKENS + prompt_tokens, streamed=True)
+            parser = RecommendationStreamParser()
+            yielded = 0
+            
+            async with httpx.AsyncClient() as client:
+                try:
+                    response = await self._send(client, self._build_payload(prompt, stream=True), record, stream=True)
+                    try:
+                        if response.status_code != 200:
+                            await response.aread()
+                            self._raise_for_status(response)
+                        
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            chunk = json.loads(data)
+                            choice = chunk["choices"][0]
+                            record.apply_usage(chunk.get("usage") or choice.get("usage"))
+                            for recommendation in parser.feed(choice.get("delta", {}).get("content") or ""):
+                                yielded += 1
+                                yield recommendation
+                    finally:
+                        await response.aclose()
                     
-                except httpx.TimeoutError:
+                    # Fall back to a full parse if the reply was not incrementally parseable
+                    if not yielded and parser.buffer:
+                        for recommendation in self._parse_method_match_response(
+                            {"choices": [{"message": {"content": parser.buffer}}]}
+                        ):
+                            yield recommendation
+                    record.status = "ok"
+                            
+                except httpx.TimeoutException:
+                    record.status = "timeout"
                     raise KimiAPIError("Request timed out", status_code=504)
                 except httpx.RequestError as e:
                     raise KimiAPIError(f"Request failed: {str(e)}", status_code=502)
@@ -122,30 +250,115 @@ class KimiAPI:
                 status_code=e.status_code,
                 detail={"message": e.message, "retry_after": getattr(e, "retry_after", None)}
             )
+        finally:
+            if record is not None:
+                record.latency_ms = (time.perf_counter() - started) * 1000
+                record_call(record)
+                record_span("kimi_stream" if record.streamed else "kimi", record.latency_ms)
 
-    def _create_method_match_prompt(self, user_profile: Dict[str, Any]) -> str:
-        """Create prompt for method matching based on user profile"""
-        return f"""Based on the following student profile, suggest appropriate study methods:
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        payload: Dict[str, Any],
+        record: LLMCallRecord,
+        stream: bool = False
+    ) -> httpx.Response:
+        """POST a chat completion, retrying 429/5xx and transport errors up to KIMI_MAX_RETRIES
+
+        429s wait for Retry-After (capped at KIMI_RETRY_MAX_WAIT), other failures
+        back off exponentially. No retry starts once ``retry_budget`` seconds
+        (LLM_DEADLINE_SECONDS) have passed since the first attempt, or would
+        start after that. The last response or error is returned/raised.
+        """
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + self.retry_budget
+        attempt = 0
+        while True:
+            request = client.build_request(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=self.headers,
+                json=payload,
+                timeout=30.0  # 30 second timeout
+            )
+            try:
+                response = await client.send(request, stream=stream)
+            except (httpx.TimeoutException, httpx.TransportError):
+                delay = min(self._backoff(attempt), self.retry_max_wait)
+                if attempt >= self.max_retries or loop.time() + delay >= give_up_at:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                delay = self._backoff(attempt)
+                if response.status_code == 429:
+                    try:
+                        delay = float(response.headers.get("Retry-After", delay))
+                    except ValueError:
+                        pass
+                delay = min(delay, self.retry_max_wait)
+                if loop.time() + delay >= give_up_at:
+                    return response
+                await response.aclose()
+            attempt += 1
+            record.retries = attempt
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return 0.5 * (2 ** attempt)
+
+    def _build_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        """Build the chat completion request body"""
+        payload = {
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "model": "moonshot-v1-8k",
+            "temperature": 0.7,
+            "response_format": {"type": "json_object"}
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _raise_for_status(self, response: httpx.Response) -> None:
+        """Map non-200 Kimi responses to KimiAPIError subclasses"""
+        if response.status_code == 401:
+            raise KimiAuthenticationError("Invalid API key or authentication failed")
+        elif response.status_code == 429:
+            retry_after = int(response.headers.get("Retry-After", 60))
+            raise KimiRateLimitError("Rate limit exceeded", retry_after=retry_after)
+        elif response.status_code != 200:
+            raise KimiAPIError(f"Kimi API error: {response.text}", status_code=response.status_code)
+
+    def _create_method_match_prompt(self, user_profile: Dict[str, Any]) -> Tuple[str, int]:
+        """Create prompt for method matching based on user profile
+
+        Returns the prompt and its estimated token count.
+        """
+        header = f"""Based on the following student profile, suggest appropriate study methods:
 
 Subject: {user_profile.get('subject', '高中数学')}
 Difficulty Level: {user_profile.get('difficulty_level', '中等')}
 Learning Goals: {user_profile.get('learning_goals', '')}
 Available Time: {user_profile.get('available_time', '')}
-Learning Style: {user_profile.get('learning_style', '')}
-
-Please analyze this profile and provide study method recommendations in the following JSON format:
-{{
+Learning Style: {user_profile.get('learning_style', '')}"""
+        footer = """Please analyze this profile and provide study method recommendations in the following JSON format:
+{
     "recommended_methods": [
-        {{
+        {
             "method_type": "string",
             "reasoning": "string",
             "priority": "number (1-5)",
             "time_allocation": "string"
-        }}
+        }
     ],
     "learning_style_analysis": "string",
     "time_management_suggestions": "string"
-}}"""
+}"""
+        prompt = f"{header}\n\n{footer}"
+        return prompt, estimate_tokens(prompt)
 
     def _parse_method_match_response(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Parse and validate Kimi API response"""
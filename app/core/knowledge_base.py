@@ -1,10 +1,17 @@
 from typing import List, Dict, Any, Optional, Union
+from functools import lru_cache
 import json
 import os
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 from pydantic import BaseModel, Field, validator
+from core.metrics import metrics_registry, SIZE_BUCKETS
+from core.timing import span
+
+encode_batch_size = metrics_registry.histogram(
+    "encode_batch_size", "Queries per embedding encode call", ("index",), SIZE_BUCKETS
+)
 
 class StudyMethod(BaseModel):
     id: str = Field(..., description="Unique identifier for the study method")
@@ -52,7 +59,8 @@ class KnowledgeBase:
             
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            self.methods = [StudyMethod(**method) for method in data]
+            methods = data.get("study_methods", []) if isinstance(data, dict) else data
+            self.methods = [StudyMethod(**method) for method in methods]
             
         # Create embeddings for all methods
         texts = [
@@ -76,26 +84,36 @@ class KnowledgeBase:
             
     def search_methods(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """Search for relevant study methods using FAISS with cosine similarity"""
-        if self.index is None or not self.methods:
-            return []
+        return self.search_methods_batch([query], k)[0]
+
+    def search_methods_batch(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search several queries with a single encode pass and a single FAISS search"""
+        if self.index is None or not self.methods or not queries:
+            return [[] for _ in queries]
             
-        # Encode and normalize query
-        query_embedding = self.model.encode([query]).astype(np.float32)
-        faiss.normalize_L2(query_embedding)
+        # Encode and normalize all queries at once
+        encode_batch_size.observe(len(queries), "methods")
+        with span("encode"):
+            query_embeddings = self.model.encode(queries).astype(np.float32)
+        faiss.normalize_L2(query_embeddings)
         
         # Search using inner product (cosine similarity since vectors are normalized)
-        D, I = self.index.search(query_embedding, k)
+        with span("search"):
+            D, I = self.index.search(query_embeddings, k)
         
-        results = []
-        for similarity, idx in zip(D[0], I[0]):
-            if idx < len(self.methods) and idx >= 0:
-                method = self.methods[idx]
-                results.append({
-                    "method": method.dict(),
-                    "similarity_score": float(similarity)  # Already normalized
-                })
+        batch_results = []
+        for row_similarities, row_indices in zip(D, I):
+            results = []
+            for similarity, idx in zip(row_similarities, row_indices):
+                if idx < len(self.methods) and idx >= 0:
+                    method = self.methods[idx]
+                    results.append({
+                        "method": method.dict(),
+                        "similarity_score": float(similarity)  # Already normalized
+                    })
+            batch_results.append(sorted(results, key=lambda x: x["similarity_score"], reverse=True))
         
-        return sorted(results, key=lambda x: x["similarity_score"], reverse=True)
+        return batch_results
     
     def add_method(self, method: StudyMethod) -> None:
         """Add a new study method to the knowledge base"""
@@ -120,3 +138,11 @@ class KnowledgeBase:
             if method.id == method_id:
                 return method
         raise ValueError(f"Study method not found with ID: {method_id}")
+
+@lru_cache()
+def get_knowledge_base() -> KnowledgeBase:
+    """Process-wide KnowledgeBase of the study methods, loaded and encoded once"""
+    with span("model_load"):
+        base = KnowledgeBase()
+        base.load_methods("data/study_methods/methods.json")
+    return base
@@ -0,0 +1,175 @@
+from typing import List, Dict, Any, Optional, Tuple
+from contextvars import ContextVar
+import threading
+from core.metrics import metrics_registry
+
+kimi_call_duration = metrics_registry.histogram(
+    "kimi_call_duration_ms", "Kimi call latency in milliseconds, retries included", ("caller", "status")
+)
+
+class LLMCallRecord:
+    __slots__ = (
+        "caller", "route", "prompt_tokens", "completion_tokens", "latency_ms",
+        "retries", "cache", "status", "streamed", "usage_reported"
+    )
+
+    def __init__(self, caller: str, prompt_tokens: int = 0, cache: str = "miss", streamed: bool = False):
+        """Usage of a single Kimi call (or plan cache hit)"""
+        self.caller = caller
+        self.route = ""
+        self.prompt_tokens = prompt_tokens  # Estimated until the response reports usage
+        self.completion_tokens = 0
+        self.latency_ms = 0.0
+        self.retries = 0
+        self.cache = cache
+        self.status = "error"
+        self.streamed = streamed
+        self.usage_reported = False
+
+    def apply_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        """Take token counts from the response ``usage`` field when present"""
+        if not usage:
+            return
+        self.prompt_tokens = int(usage.get("prompt_tokens", self.prompt_tokens))
+        self.completion_tokens = int(usage.get("completion_tokens", 0))
+        self.usage_reported = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class RequestUsage:
+    def __init__(self, route: str = ""):
+        """LLM calls made while serving one HTTP request"""
+        self.route = route
+        self.calls: List[LLMCallRecord] = []
+
+    def summary(self) -> Dict[str, Any]:
+        misses = [call for call in self.calls if call.cache != "hit"]
+        return {
+            "calls": len(misses),
+            "cache_hits": len(self.calls) - len(misses),
+            "prompt_tokens": sum(call.prompt_tokens for call in misses),
+            "completion_tokens": sum(call.completion_tokens for call in misses),
+            "latency_ms": round(sum(call.latency_ms for call in misses), 1),
+            "retries": sum(call.retries for call in misses),
+            "errors": sum(1 for call in misses if call.status != "ok")
+        }
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        """Response headers summarizing this request's LLM usage"""
+        summary = self.summary()
+        names = {
+            "calls": "X-LLM-Calls",
+            "cache_hits": "X-LLM-Cache-Hits",
+            "prompt_tokens": "X-LLM-Prompt-Tokens",
+            "completion_tokens": "X-LLM-Completion-Tokens",
+            "latency_ms": "X-LLM-Latency-Ms",
+            "retries": "X-LLM-Retries",
+            "errors": "X-LLM-Errors"
+        }
+        return [(names[key].encode("latin-1"), str(value).encode("latin-1")) for key, value in summary.items()]
+
+class UsageAggregator:
+    def __init__(self):
+        """Process-wide LLM usage totals keyed by (route, caller)"""
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def add(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            totals = self._totals.setdefault((record.route, record.caller), {
+                "calls": 0, "cache_hits": 0, "errors": 0, "retries": 0,
+                "prompt_tokens": 0, "completion_tokens": 0,
+                "latency_ms_total": 0.0, "latency_ms_max": 0.0
+            })
+            if record.cache == "hit":
+                totals["cache_hits"] += 1
+                return
+            totals["calls"] += 1
+            totals["errors"] += record.status != "ok"
+            totals["retries"] += record.retries
+            totals["prompt_tokens"] += record.prompt_tokens
+            totals["completion_tokens"] += record.completion_tokens
+            totals["latency_ms_total"] += record.latency_ms
+            totals["latency_ms_max"] = max(totals["latency_ms_max"], record.latency_ms)
+        kimi_call_duration.observe(record.latency_ms, record.caller, record.status)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = []
+            for (route, caller), totals in sorted(self._totals.items()):
+                calls = totals["calls"]
+                rows.append({
+                    "route": route,
+                    "caller": caller,
+                    **totals,
+                    "latency_ms_total": round(totals["latency_ms_total"], 1),
+                    "latency_ms_max": round(totals["latency_ms_max"], 1),
+                    "latency_ms_avg": round(totals["latency_ms_total"] / calls, 1) if calls else 0.0
+                })
+            return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+    def samples(self, field: str) -> List[Tuple[Tuple[str, str], float]]:
+        """One total per (route, caller), for the Prometheus exposition"""
+        with self._lock:
+            return [(key, totals[field]) for key, totals in sorted(self._totals.items())]
+
+usage_aggregator = UsageAggregator()
+
+for _field, _description in (
+    ("calls", "Kimi calls made"),
+    ("errors", "Kimi calls that failed after retries"),
+    ("retries", "Kimi call retries"),
+    ("cache_hits", "Kimi plans served from the plan cache instead of a call"),
+    ("prompt_tokens", "Kimi prompt tokens"),
+    ("completion_tokens", "Kimi completion tokens")
+):
+    metrics_registry.counter_callback(
+        f"kimi_{_field}_total", _description, ("route", "caller"),
+        lambda field=_field: usage_aggregator.samples(field)
+    )
+_current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("llm_request_usage", default=None)
+
+def current_usage() -> Optional[RequestUsage]:
+    """Usage of the request being served, if any"""
+    return _current_usage.get()
+
+def record_call(record: LLMCallRecord) -> None:
+    """Attach a finished call to the current request and the process totals"""
+    usage = _current_usage.get()
+    if usage is not None:
+        record.route = usage.route
+        usage.calls.append(record)
+    usage_aggregator.add(record)
+
+class LLMUsageMiddleware:
+    def __init__(self, app):
+        """ASGI middleware that scopes LLM usage to each request and reports it in headers
+
+        Streaming responses send their headers before any LLM call finishes, so
+        their usage is only visible in the aggregate (and in the stream itself).
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        usage = RequestUsage(scope.get("path", ""))
+        token = _current_usage.set(usage)
+
+        async def send_with_usage(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + usage.headers()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_usage)
+        finally:
+            _current_usage.reset(token)
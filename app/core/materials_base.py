@@ -1,10 +1,18 @@
 from typing import List, Dict, Any, Optional
+from functools import lru_cache
 import json
 import os
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 from pydantic import BaseModel, Field, validator
+from core.durations import parse_duration
+from core.metrics import metrics_registry, SIZE_BUCKETS
+from core.timing import span
+
+encode_batch_size = metrics_registry.histogram(
+    "encode_batch_size", "Queries per embedding encode call", ("index",), SIZE_BUCKETS
+)
 
 class StudyMaterial(BaseModel):
     id: str = Field(..., description="Unique identifier for the study material")
@@ -18,6 +26,10 @@ class StudyMaterial(BaseModel):
     prerequisites: List[str] = Field(default=[], description="Required prior knowledge")
     related_methods: List[str] = Field(..., description="IDs of related study methods")
     learning_outcomes: List[str] = Field(..., description="Expected learning outcomes")
+    estimated_minutes: Optional[int] = Field(
+        default=None,
+        description="Upper bound of estimated_time in minutes, parsed at load; None if it has no duration"
+    )
 
     @validator('category')
     def validate_category(cls, v):
@@ -36,6 +48,11 @@ class StudyMaterial(BaseModel):
             raise ValueError(f"Type must be one of: {valid_types}")
         return v
 
+    @validator('estimated_minutes', always=True)
+    def parse_estimated_minutes(cls, v, values):
+        duration = parse_duration(values.get("estimated_time", ""))
+        return duration.max_minutes if duration is not None else v
+
     @validator('difficulty_level')
     def validate_difficulty_level(cls, v):
         valid_levels = {"基础", "提高", "挑战"}
@@ -76,32 +93,42 @@ class MaterialsBase:
 
     def save_materials(self, file_path: str) -> None:
         """Save study materials to a JSON file"""
-        data = {"study_materials": [material.dict() for material in self.materials]}
+        data = {"study_materials": [material.dict(exclude={"estimated_minutes"}) for material in self.materials]}
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
     def search_materials(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """Search for relevant study materials using FAISS with cosine similarity"""
-        if not self.materials:
-            return []
+        return self.search_materials_batch([query], k)[0]
+
+    def search_materials_batch(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search several queries with a single encode pass and a single FAISS search"""
+        if not self.materials or not queries:
+            return [[] for _ in queries]
             
-        # Encode and normalize query
-        query_embedding = self.model.encode([query]).astype(np.float32)
-        faiss.normalize_L2(query_embedding)
+        # Encode and normalize all queries at once
+        encode_batch_size.observe(len(queries), "materials")
+        with span("encode"):
+            query_embeddings = self.model.encode(queries).astype(np.float32)
+        faiss.normalize_L2(query_embeddings)
         
         # Search using inner product (cosine similarity since vectors are normalized)
-        similarities, indices = self.index.search(query_embedding, min(k, len(self.materials)))
+        with span("search"):
+            similarities, indices = self.index.search(query_embeddings, min(k, len(self.materials)))
         
-        results = []
-        for similarity, idx in zip(similarities[0], indices[0]):
-            if idx < len(self.materials) and idx >= 0:
-                material = self.materials[idx]
-                results.append({
-                    "material": material.dict(),
-                    "similarity_score": float(similarity)
-                })
+        batch_results = []
+        for row_similarities, row_indices in zip(similarities, indices):
+            results = []
+            for similarity, idx in zip(row_similarities, row_indices):
+                if idx < len(self.materials) and idx >= 0:
+                    material = self.materials[idx]
+                    results.append({
+                        "material": material.dict(),
+                        "similarity_score": float(similarity)
+                    })
+            batch_results.append(sorted(results, key=lambda x: x["similarity_score"], reverse=True))
         
-        return sorted(results, key=lambda x: x["similarity_score"], reverse=True)
+        return batch_results
 
     def add_material(self, material: StudyMaterial) -> None:
         """Add a new study material to the knowledge base"""
@@ -134,3 +161,11 @@ class MaterialsBase:
             material for material in self.materials
             if method_id in material.related_methods
         ]
+
+@lru_cache()
+def get_materials_base() -> MaterialsBase:
+    """Process-wide MaterialsBase of the study materials, loaded and encoded once"""
+    with span("model_load"):
+        base = MaterialsBase()
+        base.load_materials("data/study_materials/materials.json")
+    return base
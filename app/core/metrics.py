@@ -0,0 +1,234 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import bisect
+import os
+import threading
+import time
+
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+Sample = Tuple[Tuple[str, ...], float]
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        """Cumulative-bucket histogram, one series per combination of label values"""
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self) -> List[Dict]:
+        """Per-series counts, sum and cumulative bucket counts"""
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        rows = []
+        for labels, series in sorted(items):
+            cumulative, total = [], 0
+            for count in series[:-1]:
+                total += count
+                cumulative.append(total)
+            rows.append({
+                "labels": dict(zip(self.label_names, labels)),
+                "count": total,
+                "sum": series[-1],
+                "buckets": dict(zip([*map(str, self.buckets), "+Inf"], cumulative))
+            })
+        return rows
+
+    def exposition(self) -> List[str]:
+        lines = []
+        bounds = [*self.buckets, float("inf")]
+        for row in self.snapshot():
+            values = tuple(row["labels"].values())
+            for bound, count in zip(bounds, row["buckets"].values()):
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {_format_value(row['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {row['count']}")
+        return lines
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        """Monotonic counter, one series per combination of label values"""
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def exposition(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in self.samples()]
+
+class CallbackMetric:
+    def __init__(self, name: str, kind: str, description: str, label_names: Sequence[str], collect: Callable[[], Iterable[Sample]]):
+        """Gauge or counter whose samples are read from their owner when scraped
+
+        Queue depths, RSS and totals already kept elsewhere (usage aggregator,
+        lru_cache statistics) cost nothing until /metrics is requested.
+        """
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def exposition(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in self.collect()]
+
+Metric = Union[Histogram, Counter, CallbackMetric]
+
+class MetricsRegistry:
+    def __init__(self):
+        """Process-wide metrics, created on first use"""
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def histogram(self, name: str, description: str = "", label_names: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, description, label_names, buckets or LATENCY_BUCKETS_MS)
+            return metric
+
+    def counter(self, name: str, description: str = "", label_names: Sequence[str] = ()) -> Counter:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Counter(name, description, label_names)
+            return metric
+
+    def gauge(self, name: str, description: str, label_names: Sequence[str], collect: Callable[[], Iterable[Sample]]) -> None:
+        """Register a gauge read by ``collect`` at scrape time"""
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, "gauge", description, label_names, collect)
+
+    def counter_callback(self, name: str, description: str, label_names: Sequence[str], collect: Callable[[], Iterable[Sample]]) -> None:
+        """Register a counter whose totals are kept elsewhere and read by ``collect``"""
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, "counter", description, label_names, collect)
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Histogram snapshots by name"""
+        with self._lock:
+            metrics = [metric for metric in self._metrics.values() if isinstance(metric, Histogram)]
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def exposition(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+metrics_registry = MetricsRegistry()
+
+_caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+def register_cache(name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """Report a cache's (hits, misses) as cache_requests_total{cache=name}
+
+    The cache keeps its own counts; they are only read at scrape time.
+    """
+    _caches[name] = stats
+
+def _cache_samples() -> Iterable[Sample]:
+    for name, stats in sorted(_caches.items()):
+        hits, misses = stats()
+        yield (name, "hit"), hits
+        yield (name, "miss"), misses
+
+metrics_registry.counter_callback(
+    "cache_requests_total", "Cache lookups by cache and result; hit ratio = hit / (hit + miss)",
+    ("cache", "result"), _cache_samples
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _rss_samples() -> Iterable[Sample]:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            yield (), int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return  # No /proc on this platform
+
+metrics_registry.gauge("process_resident_memory_bytes", "Resident set size of the process", (), _rss_samples)
+
+http_request_duration = metrics_registry.histogram(
+    "http_request_duration_ms", "HTTP request latency in milliseconds by route template", ("method", "route", "status")
+)
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        """ASGI middleware recording each request's latency under its route template
+
+        Labels use the matched route's path template ("/learning-path/{path_id}")
+        so path parameters do not create new series; unmatched paths share
+        "unmatched". Latency runs until the last body chunk is sent.
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                (time.perf_counter() - started) * 1000,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status
+            )
@@ -0,0 +1,244 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from urllib.parse import parse_qs
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from config import get_settings
+
+MAX_DEPTH = 128
+_IDLE_FRAMES = {  # Leaf frames of threads waiting for work
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its queue
+    ("selectors.py", "select")
+}
+
+class Profile:
+    def __init__(self, method: str, path: str, thread_id: int, interval: float):
+        """Stack samples taken while one request was being served
+
+        ``stacks`` counts identical stacks, root first, each rooted at the
+        name of the thread it was seen on.
+        """
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.thread_id = thread_id
+        self.interval = interval
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.stacks: "Counter[Tuple[str, ...]]" = Counter()
+        self._started = time.perf_counter()
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 2)
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, one "frame;frame;frame count" per line"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> Dict[str, Any]:
+        """speedscope's file format: one sampled profile, identical stacks merged and weighted"""
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(round(count * self.interval * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "exporter": "ai-learning-path",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(self.duration_ms, 3),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+class SamplingProfiler:
+    def __init__(self, sample_hz: float = 100, max_concurrent: int = 1, store_size: int = 16, directory: str = ""):
+        """Wall-clock stack sampler shared by every profiled request
+
+        One daemon thread, running only while a profile is active, reads
+        every thread's stack ``sample_hz`` times a second and adds it to all
+        active profiles. The sample rate is global, so overhead does not grow
+        with the number of profiled requests, and at most ``max_concurrent``
+        requests are profiled at once. Samples cover the whole process:
+        other requests served concurrently on the event loop show up too.
+        Worker threads idling on their queue are skipped.
+
+        Finished profiles are kept in memory (``store_size`` most recent) and,
+        with a ``directory``, written there as collapsed stacks by write().
+        """
+        self.interval = 1 / sample_hz if sample_hz > 0 else 0.01
+        self.max_concurrent = max_concurrent
+        self.store_size = store_size
+        self.directory = directory
+        self.skipped = 0
+        self._active: Dict[str, Profile] = {}
+        self._finished: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, method: str, path: str) -> Optional[Profile]:
+        """Start profiling the calling thread's request, or None when at the concurrency cap"""
+        with self._lock:
+            if len(self._active) >= self.max_concurrent:
+                self.skipped += 1
+                return None
+            profile = Profile(method, path, threading.get_ident(), self.interval)
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: Profile) -> None:
+        profile.finish()
+        with self._lock:
+            self._active.pop(profile.id, None)
+            self._finished[profile.id] = profile
+            while len(self._finished) > self.store_size:
+                self._finished.popitem(last=False)
+
+    def write(self, profile: Profile) -> None:
+        """Write a finished profile's collapsed stacks to the directory, if set; blocking, so run it off the loop"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{profile.id}.collapsed"), "w", encoding="utf-8") as f:
+            f.write(profile.collapsed())
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._finished.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._finished.values())]
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    self._thread = None
+                    return
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            request_threads = {profile.thread_id for profile in profiles}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if thread_id not in request_threads and (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stack.reverse()
+                stacks.append(tuple(stack))
+            with self._lock:
+                for profile in profiles:
+                    if profile.id not in self._active:
+                        continue  # Ended while this sample was taken
+                    profile.stacks.update(stacks)
+                    profile.samples += 1
+
+@lru_cache()
+def get_profiler() -> SamplingProfiler:
+    """Process-wide sampling profiler"""
+    settings = get_settings()
+    return SamplingProfiler(
+        settings.PROFILE_SAMPLE_HZ,
+        settings.PROFILE_MAX_CONCURRENT,
+        settings.PROFILE_STORE_SIZE,
+        settings.PROFILE_DIR
+    )
+
+def profile_token_valid(token: Optional[str]) -> bool:
+    """Whether ``token`` matches PROFILE_TOKEN; always False while profiling is disabled"""
+    expected = get_settings().PROFILE_TOKEN
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode(), expected.encode())
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        """ASGI middleware profiling requests that opt in
+
+        A request is profiled when it carries ``X-Profile: 1`` or
+        ``?profile=1`` together with ``X-Profile-Token`` matching
+        PROFILE_TOKEN. The response carries ``X-Profile-Id``, the id to
+        fetch the profile under, or ``X-Profile-Skipped: busy`` at the
+        concurrency cap. Requests that do not opt in only pay for a header
+        lookup; with no PROFILE_TOKEN set, not even that.
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().PROFILE_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        flag = headers.get(b"x-profile", b"").decode("latin-1")
+        if not flag and b"profile=" in scope.get("query_string", b""):
+            flag = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [""])[0]
+        if flag not in ("1", "true") or not profile_token_valid(headers.get(b"x-profile-token", b"").decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = get_profiler()
+        profile = profiler.begin(scope["method"], scope.get("path", ""))
+        result = (b"x-profile-id", profile.id.encode()) if profile else (b"x-profile-skipped", b"busy")
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [result]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if profile is not None:
+                profiler.end(profile)
+                if profiler.directory:
+                    await asyncio.get_running_loop().run_in_executor(None, profiler.write, profile)
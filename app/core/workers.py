@@ -0,0 +1,38 @@
+from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+import asyncio
+import contextvars
+from config import get_settings
+from core.metrics import metrics_registry
+
+@lru_cache()
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for blocking encode/FAISS work"""
+    settings = get_settings()
+    return ThreadPoolExecutor(
+        max_workers=settings.RETRIEVAL_WORKERS,
+        thread_name_prefix="retrieval"
+    )
+
+async def run_in_worker(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call on the retrieval pool without stalling the event loop
+
+    The call runs in a copy of the caller's context, so request-scoped
+    accounting (LLM usage, timing spans) follows it onto the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_retrieval_executor(), partial(context.run, func, *args, **kwargs))
+
+def _pool_samples():
+    if get_retrieval_executor.cache_info().currsize == 0:
+        return  # Pool not started yet
+    executor = get_retrieval_executor()
+    yield ("retrieval", "queued"), executor._work_queue.qsize()
+    yield ("retrieval", "threads"), len(executor._threads)
+
+metrics_registry.gauge(
+    "worker_pool_tasks", "Retrieval pool calls waiting for a worker and threads started",
+    ("pool", "state"), _pool_samples
+)
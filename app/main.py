@@ -20,8 +20,24 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Scope Kimi usage accounting to each request
+from core.llm_usage import LLMUsageMiddleware
+app.add_middleware(LLMUsageMiddleware)
+
+# Report per-stage durations as Server-Timing headers
+from core.timing import ServerTimingMiddleware
+app.add_middleware(ServerTimingMiddleware)
+
+# Record request latency per route for /metrics
+from core.metrics import RequestMetricsMiddleware
+app.add_middleware(RequestMetricsMiddleware)
+
+# Profile requests that opt in with X-Profile and a valid X-Profile-Token
+from core.profiling import ProfilingMiddleware
+app.add_middleware(ProfilingMiddleware)
+
 # Import and include API routers
-from api.v1.endpoints import learning_path, materials
+from api.v1.endpoints import learning_path, materials, metrics
 
 app.include_router(
     learning_path.router,
@@ -34,3 +50,32 @@ app.include_router(
     prefix=os.getenv("API_V1_STR", "/api/v1"),
     tags=["materials"]
 )
+
+app.include_router(
+    metrics.router,
+    prefix=os.getenv("API_V1_STR", "/api/v1"),
+    tags=["metrics"]
+)
+
+app.include_router(metrics.exposition_router)
+
+# Load and encode the retrieval bases once, before the first request needs them
+import asyncio
+from core.knowledge_base import get_knowledge_base
+from core.materials_base import get_materials_base
+from core.workers import run_in_worker
+
+@app.on_event("startup")
+async def load_retrieval_bases():
+    await asyncio.gather(run_in_worker(get_knowledge_base), run_in_worker(get_materials_base))
+
+# Measure event loop lag and capture the stacks of stalls
+from core.loop_monitor import get_loop_monitor
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    get_loop_monitor().start()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    get_loop_monitor().stop()
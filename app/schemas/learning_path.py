@@ -91,3 +91,47 @@ class LearningPath(BaseModel):
     learning_style: str = Field(..., description="Learning style preference")
     created_at: datetime = Field(..., description="Creation timestamp")
     tasks: List[Task] = Field(..., description="Learning tasks")
+    degraded: bool = Field(default=False, description="Built from retrieval only because Kimi missed the latency deadline")
+
+class ProgressEvent(BaseModel):
+    task_id: str = Field(..., description="Task the event applies to")
+    status: str = Field(..., description="Event type (completed, skipped, delayed)")
+    date: Optional[str] = Field(None, description="When it happened (YYYY-MM-DD); a completion after the due date delays dependent tasks")
+    delay_days: int = Field(default=0, ge=0, description="Days to push a delayed task back")
+
+    @validator('status')
+    def validate_status(cls, v):
+        valid_statuses = {"completed", "skipped", "delayed"}
+        if v not in valid_statuses:
+            raise ValueError(f"Event status must be one of: {valid_statuses}")
+        return v
+
+    @validator('date')
+    def validate_date(cls, v):
+        if v is not None:
+            datetime.strptime(v, "%Y-%m-%d")
+        return v
+
+class ReplanRequest(BaseModel):
+    plan: LearningPath = Field(..., description="The current learning path")
+    events: List[ProgressEvent] = Field(..., description="Progress since the plan was generated")
+
+class ReplanDelta(BaseModel):
+    path_id: str = Field(..., description="Learning path identifier")
+    updated: List[Task] = Field(default=[], description="Tasks whose completion, due date or dependencies changed")
+    removed: List[str] = Field(default=[], description="IDs of skipped tasks and the tasks the skipped weeks and months group")
+    unchanged: int = Field(..., description="Number of tasks left as they were")
+
+class TaskQueryResult(BaseModel):
+    path_id: str = Field(..., description="Learning path identifier")
+    tasks: List[Task] = Field(..., description="Matching tasks")
+
+class CriticalPath(BaseModel):
+    path_id: str = Field(..., description="Learning path identifier")
+    minutes: int = Field(..., description="Study minutes along the longest chain of open tasks")
+    tasks: List[Task] = Field(..., description="Tasks on the chain, in dependency order")
+
+class TaskCompletion(BaseModel):
+    path_id: str = Field(..., description="Learning path identifier")
+    task_id: str = Field(..., description="Task marked completed")
+    unblocked: List[Task] = Field(default=[], description="Tasks that became ready")
@@ -0,0 +1,232 @@
+"""
+Local stand-in for the Kimi chat completions API, for offline load and latency testing.
+
+Speaks the /v1/chat/completions contract used by core.kimi.KimiAPI, including
+streaming (stream: true), with configurable latency, error and 429 injection.
+
+Run from the app directory:
+    python -m scripts.mock_kimi_server --port 8001 --latency lognormal:1500:0.6 --rate-limit-rate 0.1
+
+Point the app at it with:
+    KIMI_BASE_URL=http://127.0.0.1:8001/v1
+    KIMI_API_KEY=<any base64 string of at least 32 bytes>
+"""
+from typing import List, Dict, Any, AsyncIterator, Optional
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+METHOD_TYPES = ["概念图解法", "错题整理法", "费曼学习法", "间隔复习法", "题型归纳法", "数学建模实践"]
+TIME_ALLOCATIONS = ["每天30分钟", "每天45分钟", "每天1小时", "每周3小时"]
+
+class LatencyDistribution:
+    def __init__(self, spec: str):
+        """
+        Parse a latency spec in milliseconds.
+
+        Supported forms: fixed:MS, uniform:MIN:MAX, normal:MEAN:STD,
+        lognormal:MEDIAN:SIGMA
+        """
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(values) != expected[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'. Use one of: fixed:MS, uniform:MIN:MAX, normal:MEAN:STD, lognormal:MEDIAN:SIGMA")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng: random.Random) -> float:
+        """Sample a latency in seconds"""
+        if self.kind == "fixed":
+            ms = self.values[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(*self.values)
+        elif self.kind == "normal":
+            ms = rng.gauss(*self.values)
+        else:
+            median, sigma = self.values
+            ms = rng.lognormvariate(0, sigma) * median
+        return max(ms, 0) / 1000
+
+class MockKimiConfig:
+    def __init__(
+        self,
+        latency: str = "fixed:200",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        chunk_size: int = 16,
+        chunk_delay_ms: float = 20,
+        seed: Optional[int] = None
+    ):
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.chunk_size = chunk_size
+        self.chunk_delay_ms = chunk_delay_ms
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "MockKimiConfig":
+        seed = os.getenv("MOCK_KIMI_SEED")
+        return cls(
+            latency=os.getenv("MOCK_KIMI_LATENCY", "fixed:200"),
+            error_rate=float(os.getenv("MOCK_KIMI_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("MOCK_KIMI_RATE_LIMIT_RATE", "0")),
+            retry_after=int(os.getenv("MOCK_KIMI_RETRY_AFTER", "1")),
+            chunk_size=int(os.getenv("MOCK_KIMI_CHUNK_SIZE", "16")),
+            chunk_delay_ms=float(os.getenv("MOCK_KIMI_CHUNK_DELAY_MS", "20")),
+            seed=int(seed) if seed else None
+        )
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, four other characters per token"""
+    cjk = sum(1 for c in text if "\u4e00" <= c <= "\u9fff")
+    return cjk + (len(text) - cjk + 3) // 4
+
+def build_reply(messages: List[Dict[str, Any]]) -> str:
+    """Build a deterministic JSON reply from the prompt"""
+    prompt = "".join(str(m.get("content", "")) for m in messages)
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    methods = [
+        {
+            "method_type": METHOD_TYPES[(digest[i] + i) % len(METHOD_TYPES)],
+            "reasoning": "根据学生的学习目标和学习风格推荐",
+            "priority": digest[i + 8] % 5 + 1,
+            "time_allocation": TIME_ALLOCATIONS[digest[i + 16] % len(TIME_ALLOCATIONS)]
+        }
+        for i in range(3)
+    ]
+    return json.dumps({
+        "recommended_methods": methods,
+        "learning_style_analysis": "学生适合练习与理论结合的学习方式",
+        "time_management_suggestions": "建议固定每日学习时段并每周复盘"
+    }, ensure_ascii=False)
+
+def create_app(config: Optional[MockKimiConfig] = None) -> FastAPI:
+    config = config or MockKimiConfig.from_env()
+    app = FastAPI(title="Mock Kimi API")
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request, authorization: str = Header("")):
+        stats["requests"] += 1
+        if not authorization.startswith("Bearer ") or len(authorization) <= len("Bearer "):
+            return JSONResponse({"error": {"message": "Invalid Authentication", "type": "invalid_authentication_error"}}, status_code=401)
+            
+        body = await request.json()
+        await asyncio.sleep(config.latency.sample(config.rng))
+        
+        roll = config.rng.random()
+        if roll < config.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_reached_error"}},
+                status_code=429,
+                headers={"Retry-After": str(config.retry_after)}
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Injected server error", "type": "server_error"}}, status_code=500)
+            
+        messages = body.get("messages", [])
+        reply = build_reply(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "moonshot-v1-8k")
+        usage = {
+            "prompt_tokens": sum(estimate_tokens(str(m.get("content", ""))) for m in messages),
+            "completion_tokens": estimate_tokens(reply)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        
+        if body.get("stream"):
+            stats["streams"] += 1
+            return StreamingResponse(
+                stream_reply(completion_id, model, reply, usage, config),
+                media_type="text/event-stream"
+            )
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**stats, "latency": config.latency.spec}
+
+    return app
+
+async def stream_reply(
+    completion_id: str,
+    model: str,
+    reply: str,
+    usage: Dict[str, int],
+    config: MockKimiConfig
+) -> AsyncIterator[str]:
+    """Emit the reply as chat.completion.chunk SSE messages"""
+    created = int(time.time())
+    for start in range(0, len(reply), config.chunk_size):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": reply[start:start + config.chunk_size]}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(config.chunk_delay_ms / 1000)
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop", "usage": usage}]
+    }
+    yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Kimi API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=os.getenv("MOCK_KIMI_LATENCY", "fixed:200"),
+                        help="fixed:MS, uniform:MIN:MAX, normal:MEAN:STD or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("MOCK_KIMI_ERROR_RATE", "0")))
+    parser.add_argument("--rate-limit-rate", type=float, default=float(os.getenv("MOCK_KIMI_RATE_LIMIT_RATE", "0")))
+    parser.add_argument("--retry-after", type=int, default=int(os.getenv("MOCK_KIMI_RETRY_AFTER", "1")))
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("MOCK_KIMI_CHUNK_SIZE", "16")))
+    parser.add_argument("--chunk-delay-ms", type=float, default=float(os.getenv("MOCK_KIMI_CHUNK_DELAY_MS", "20")))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    import uvicorn
+    config = MockKimiConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        chunk_size=args.chunk_size,
+        chunk_delay_ms=args.chunk_delay_ms,
+        seed=args.seed
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
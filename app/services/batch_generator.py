@@ -0,0 +1,101 @@
+from typing import List, Dict, Any, Optional, AsyncIterator
+import asyncio
+import re
+import uuid
+from schemas.learning_path import LearningPathCreate
+from services.learning_plan import LearningPlan
+from services.path_generator import PathGenerator
+from services.task_generator import TaskGenerator
+
+def profile_group_key(profile: LearningPathCreate) -> str:
+    """Key under which near-identical profiles share retrieval and one Kimi plan
+
+    Learning goals are compared ignoring case, whitespace and punctuation.
+    """
+    goals = re.sub(r"[\W_]+", "", profile.learning_goals).lower()
+    return "|".join([
+        profile.subject,
+        profile.difficulty_level,
+        profile.available_time,
+        profile.learning_style,
+        goals
+    ])
+
+class BatchPathGenerator:
+    def __init__(self, generator: PathGenerator, task_generator: TaskGenerator):
+        """Generate learning paths for a whole class with shared retrieval and deduplicated Kimi calls"""
+        self.generator = generator
+        self.task_generator = task_generator
+
+    async def generate(
+        self,
+        profiles: List[LearningPathCreate],
+        deadline: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one result per student as soon as the student's group is ready
+
+        All groups' Kimi plans start together, then every unique retrieval
+        query is encoded in one pass. Each result holds the student's
+        ``index``, ``group`` number and ``group_size``, plus ``path_id``,
+        ``profile``, ``tasks`` and ``plan`` on success or ``error`` on failure.
+        """
+        timings = timings if timings is not None else {}
+        groups: Dict[str, List[int]] = {}
+        for index, profile in enumerate(profiles):
+            groups.setdefault(profile_group_key(profile), []).append(index)
+        group_keys = list(groups)
+        representatives = {key: profiles[groups[key][0]] for key in group_keys}
+        
+        # One plan per group, all issued before retrieval so they overlap it
+        plans: Dict[str, LearningPlan] = {
+            key: self.generator.create_plan(representatives[key], deadline)
+            for key in group_keys
+        }
+        for plan in plans.values():
+            plan.start()
+        
+        materials_by_query, methods_by_query = await self.generator.retrieve_batch(
+            list(representatives.values()),
+            timings
+        )
+
+        async def build_group(key: str):
+            plan = plans[key]
+            try:
+                recommended_methods = await plan.resolve()
+                stages = self.generator.assemble_stages(
+                    representatives[key],
+                    materials_by_query,
+                    methods_by_query,
+                    recommended_methods,
+                    degraded=plan.degraded
+                )
+                return key, stages, None
+            except Exception as e:
+                return key, None, e
+
+        for next_group in asyncio.as_completed([build_group(key) for key in group_keys]):
+            key, stages, error = await next_group
+            indices = groups[key]
+            for index in indices:
+                result = {
+                    "index": index,
+                    "group": group_keys.index(key),
+                    "group_size": len(indices)
+                }
+                if error is None:
+                    try:
+                        # Tasks are per student, keyed by their own path id; the plan is already resolved
+                        path_id = str(uuid.uuid4())
+                        result["tasks"] = await self.task_generator.generate_tasks(
+                            profiles[index], stages, plans[key], path_id
+                        )
+                        result["path_id"] = path_id
+                        result["profile"] = profiles[index]
+                        result["plan"] = plans[key]
+                    except Exception as e:
+                        result["error"] = e
+                else:
+                    result["error"] = error
+                yield result
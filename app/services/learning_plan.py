@@ -0,0 +1,210 @@
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import asyncio
+import hashlib
+import json
+import time
+from config import get_settings
+from core.kimi import KimiAPI
+from core.llm_usage import LLMCallRecord, record_call
+from core.metrics import register_cache
+from schemas.learning_path import LearningPathCreate
+
+class PlanCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        """Small LRU cache, with a TTL, of Kimi plans that arrived after their request's deadline"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, recommendations = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return recommendations
+
+    def put(self, key: str, recommendations: List[Dict[str, Any]]) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic(), recommendations)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+@lru_cache()
+def get_plan_cache() -> PlanCache:
+    """Process-wide cache of late Kimi plans"""
+    settings = get_settings()
+    return PlanCache(settings.LLM_LATE_CACHE_SIZE, settings.LLM_LATE_CACHE_TTL)
+
+register_cache("plan", lambda: (get_plan_cache().hits, get_plan_cache().misses))
+
+class LearningPlan:
+    def __init__(
+        self,
+        kimi_api: KimiAPI,
+        user_profile: LearningPathCreate,
+        stages: Optional[List[Dict[str, Any]]] = None,
+        deadline: Optional[float] = None,
+        cache: Optional[PlanCache] = None
+    ):
+        """Request-scoped Kimi plan shared by the path and task generators.
+
+        The structured call is issued lazily on the first start()/resolve() and
+        at most once per plan; a plan nobody resolves costs no Kimi quota.
+
+        With a ``deadline`` (seconds from start()), resolve() stops waiting once
+        it passes and returns no recommendations, marking the plan degraded;
+        a failed call degrades the plan the same way.
+        The call keeps running and its late result is stored in ``cache`` for
+        the next identical request.
+        """
+        self.kimi_api = kimi_api
+        self.user_profile = user_profile
+        self.stages = stages or []
+        self.deadline = deadline
+        self.cache = cache
+        self.degraded = False
+        self.cache_hit = False
+        self._deadline_at: Optional[float] = None
+        self._future: Optional[asyncio.Future] = None
+
+    @property
+    def requested(self) -> bool:
+        """Whether the Kimi call has been issued for this plan"""
+        return self._future is not None
+
+    @property
+    def cache_key(self) -> str:
+        payload = json.dumps(self._build_profile(), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def start(self) -> asyncio.Future:
+        """Issue the Kimi call in the background if it is not running yet"""
+        if self._future is None:
+            loop = asyncio.get_running_loop()
+            if self.deadline is not None:
+                self._deadline_at = loop.time() + self.deadline
+            cached = self._cached()
+            if cached is not None:
+                self._future = loop.create_future()
+                self._future.set_result(cached)
+            else:
+                self._future = asyncio.ensure_future(
+                    self.kimi_api.generate_method_match(self._build_profile(), caller="learning_plan")
+                )
+        return self._future
+
+    async def resolve(self) -> List[Dict[str, Any]]:
+        """Return the recommended methods, sharing one call between all callers
+
+        Returns an empty list, and marks the plan degraded, if the deadline
+        passes before Kimi answers or the call fails. A degraded plan stays
+        degraded: later callers get the empty list too, whether a late call
+        succeeded or failed, so a path and its tasks never mix the two.
+        """
+        if self.degraded:
+            return []
+        future = self.start()
+        try:
+            if self._deadline_at is None or future.done():
+                return await future
+            remaining = self._deadline_at - asyncio.get_running_loop().time()
+            return await asyncio.wait_for(asyncio.shield(future), max(remaining, 0))
+        except asyncio.TimeoutError:
+            if not self.degraded:
+                self.degraded = True
+                future.add_done_callback(self._store_late_result)
+            return []
+        except Exception:
+            # Kimi failed in time; the failure is already in the LLM usage records
+            self.degraded = True
+            return []
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield recommendations as Kimi streams them
+
+        The streamed call is the plan's single call: resolve() callers get the
+        full list once the stream completes.
+        """
+        if self._future is not None:
+            for recommendation in await self._future:
+                yield recommendation
+            return
+            
+        self._future = asyncio.get_running_loop().create_future()
+        cached = self._cached()
+        if cached is not None:
+            self._future.set_result(cached)
+            for recommendation in cached:
+                yield recommendation
+            return
+            
+        recommendations = []
+        try:
+            stream = self.kimi_api.stream_method_match(self._build_profile(), caller="learning_plan_stream")
+            async for recommendation in stream:
+                recommendations.append(recommendation)
+                yield recommendation
+        except (asyncio.CancelledError, GeneratorExit):
+            self._future.cancel()
+            raise
+        except Exception as e:
+            self._future.set_exception(e)
+            raise
+        self._future.set_result(recommendations)
+
+    async def top_recommendation(self) -> Optional[Dict[str, Any]]:
+        """Return the highest priority recommendation, if any"""
+        recommendations = await self.resolve()
+        if not recommendations:
+            return None
+        return max(recommendations, key=self._priority)
+
+    def _cached(self) -> Optional[List[Dict[str, Any]]]:
+        if self.cache is None or not self.cache.enabled:
+            return None
+        cached = self.cache.get(self.cache_key)
+        self.cache_hit = cached is not None
+        if self.cache_hit:
+            record_call(LLMCallRecord("learning_plan", cache="hit"))
+        return cached
+
+    def _store_late_result(self, future: asyncio.Future) -> None:
+        """Cache a result that arrived after the deadline; a late failure is dropped
+
+        The failed call is already counted in the LLM usage records.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        if self.cache is not None:
+            self.cache.put(self.cache_key, future.result())
+
+    def _build_profile(self) -> Dict[str, Any]:
+        """Build the single structured request covering both generators"""
+        return {
+            **self.user_profile.dict(),
+            "learning_stages": self.stages
+        }
+
+    @staticmethod
+    def _priority(recommendation: Dict[str, Any]) -> int:
+        try:
+            return int(recommendation.get("priority", 3))
+        except (TypeError, ValueError):
+            return 3
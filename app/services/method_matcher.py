@@ -12,7 +12,7 @@ class MethodMatcher:
     async def match_methods(self, user_profile: LearningPathCreate) -> List[Dict[str, Any]]:
         """Match study methods to user profile using Kimi API and knowledge base"""
         # Get AI recommendations
-        recommendations = await self.kimi_api.generate_method_match(user_profile.dict())
+        recommendations = await self.kimi_api.generate_method_match(user_profile.dict(), caller="method_matcher")
         
         # Map recommendations to actual methods in knowledge base
         matched_methods = []
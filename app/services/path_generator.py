@@ -1,9 +1,38 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Awaitable, AsyncIterator, Iterator, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import time
 from core.kimi import KimiAPI
 from core.knowledge_base import KnowledgeBase
 from core.materials_base import MaterialsBase
+from core.workers import run_in_worker
 from schemas.learning_path import LearningPathCreate
+from services.learning_plan import LearningPlan, get_plan_cache
+from core.timing import record_span
+from services.scheduler import CapacityScheduler, ScheduleItem, DEFAULT_MATERIAL_MINUTES, parse_daily_minutes
+from core.durations import material_minutes
+from config import get_settings
+
+def _topic_key(text: str) -> str:
+    return "".join(text.split()).replace("的", "")
+
+def prerequisite_ids(materials: List[Dict[str, Any]]) -> List[List[str]]:
+    """IDs of the materials covering each material's prerequisite topics
+
+    Prerequisites are free-text topics such as "函数基本概念", not material
+    ids. A topic is covered by another material whose title contains it,
+    ignoring spaces and "的" ("函数的基本概念"); topics no material covers
+    are dropped.
+    """
+    titles = [(material["id"], _topic_key(material.get("title", ""))) for material in materials]
+    result = []
+    for material in materials:
+        topics = [_topic_key(topic) for topic in material.get("prerequisites") or []]
+        result.append(list(dict.fromkeys(
+            material_id for topic in topics if topic
+            for material_id, title in titles if topic in title and material_id != material["id"]
+        )))
+    return result
 
 class PathGenerator:
     def __init__(self, knowledge_base: KnowledgeBase, materials_base: MaterialsBase):
@@ -36,57 +65,221 @@ class PathGenerator:
             }
         ]
 
-    async def generate_path(self, user_profile: LearningPathCreate) -> List[Dict[str, Any]]:
-        """Generate complete learning path following the required sequence"""
-        # Get AI recommendations for path structure
-        path_structure = await self.kimi_api.generate_method_match({
-            **user_profile.dict(),
-            "learning_stages": self.learning_stages
-        })
+    def create_plan(self, user_profile: LearningPathCreate, deadline: Optional[float] = None) -> LearningPlan:
+        """Create the request-scoped Kimi plan shared with the task generator
+
+        ``deadline`` is the latency SLO in seconds for the Kimi answer and
+        defaults to LLM_DEADLINE_SECONDS; past it the path is retrieval-only.
+        """
+        return LearningPlan(
+            self.kimi_api,
+            user_profile,
+            self.learning_stages,
+            deadline=deadline if deadline is not None else get_settings().LLM_DEADLINE_SECONDS,
+            cache=get_plan_cache()
+        )
+
+    async def generate_path(
+        self,
+        user_profile: LearningPathCreate,
+        plan: Optional[LearningPlan] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate complete learning path following the required sequence
+
+        The Kimi plan, material retrieval and method retrieval run concurrently;
+        retrieval is batched and offloaded to the worker pool. Per-stage
+        durations in milliseconds are written into ``timings`` when given.
+        """
+        timings = timings if timings is not None else {}
+        started = time.perf_counter()
         
-        learning_path = []
-        current_date = datetime.now()
+        # Get AI recommendations for path structure (shared with TaskGenerator)
+        plan = plan or self.create_plan(user_profile)
+        recommended_methods, (material_results, method_results) = await asyncio.gather(
+            self._timed("llm", plan.resolve(), timings),
+            self._retrieve(user_profile, timings)
+        )
+        
+        learning_path = list(self._iter_stage_entries(
+            user_profile,
+            material_results,
+            method_results,
+            recommended_methods,
+            degraded=plan.degraded
+        ))
+        timings["path"] = (time.perf_counter() - started) * 1000
+        record_span("path", timings["path"])
+        return learning_path
+
+    async def iter_stages(
+        self,
+        user_profile: LearningPathCreate,
+        timings: Optional[Dict[str, float]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield stage entries as soon as retrieval is done, without waiting for Kimi
+
+        Stages yielded here carry no ``recommended_methods``; streaming callers
+        receive the Kimi recommendations separately from the plan.
+        """
+        timings = timings if timings is not None else {}
+        material_results, method_results = await self._retrieve(user_profile, timings)
+        for stage_entry in self._iter_stage_entries(user_profile, material_results, method_results, []):
+            yield stage_entry
+
+    async def retrieve_batch(
+        self,
+        user_profiles: List[LearningPathCreate],
+        timings: Optional[Dict[str, float]] = None
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]:
+        """Retrieve for many profiles at once, encoding each unique query a single time
+
+        Returns material and method results keyed by query, for assemble_stages().
+        """
+        timings = timings if timings is not None else {}
+        material_queries = list(dict.fromkeys(
+            query for profile in user_profiles for query in self._material_queries(profile)
+        ))
+        method_queries = list(dict.fromkeys(
+            query for profile in user_profiles for query in self._method_queries(profile)
+        ))
+        material_results, method_results = await asyncio.gather(
+            self._timed("materials", run_in_worker(
+                self.materials_base.search_materials_batch, material_queries, 3
+            ), timings),
+            self._timed("methods", run_in_worker(
+                self.knowledge_base.search_methods_batch, method_queries, 2
+            ), timings)
+        )
+        return dict(zip(material_queries, material_results)), dict(zip(method_queries, method_results))
+
+    def assemble_stages(
+        self,
+        user_profile: LearningPathCreate,
+        materials_by_query: Dict[str, List[Dict[str, Any]]],
+        methods_by_query: Dict[str, List[Dict[str, Any]]],
+        recommended_methods: List[Dict[str, Any]],
+        degraded: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Build a profile's stages from shared retrieve_batch() results"""
+        return list(self._iter_stage_entries(
+            user_profile,
+            [materials_by_query[query] for query in self._material_queries(user_profile)],
+            [methods_by_query[query] for query in self._method_queries(user_profile)],
+            recommended_methods,
+            degraded=degraded
+        ))
+
+    async def _retrieve(
+        self,
+        user_profile: LearningPathCreate,
+        timings: Dict[str, float]
+    ) -> Tuple[List[List[Dict[str, Any]]], List[List[Dict[str, Any]]]]:
+        """Run the batched material and method searches concurrently on the worker pool"""
+        return await asyncio.gather(
+            self._timed("materials", run_in_worker(
+                self.materials_base.search_materials_batch,
+                self._material_queries(user_profile),
+                3
+            ), timings),
+            self._timed("methods", run_in_worker(
+                self.knowledge_base.search_methods_batch,
+                self._method_queries(user_profile),
+                2
+            ), timings)
+        )
+
+    def _material_queries(self, user_profile: LearningPathCreate) -> List[str]:
+        """Material search queries for every stage category, in stage order"""
+        return [
+            f"{category} {user_profile.difficulty_level} {user_profile.learning_goals}"
+            for stage in self.learning_stages
+            for category in stage["categories"]
+        ]
+
+    def _method_queries(self, user_profile: LearningPathCreate) -> List[str]:
+        """Method search queries for every stage, in stage order"""
+        return [
+            f"{stage['description']} {user_profile.learning_style}"
+            for stage in self.learning_stages
+        ]
+
+    def _iter_stage_entries(
+        self,
+        user_profile: LearningPathCreate,
+        material_results: List[List[Dict[str, Any]]],
+        method_results: List[List[Dict[str, Any]]],
+        recommended_methods: List[Dict[str, Any]],
+        degraded: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Schedule retrieved materials and methods into the learning stages
+
+        Materials are packed into days of the profile's available time, one
+        stage after another; each entry's ``plan_day`` counts from the start
+        of the plan and its ``day`` from the start of its stage, and its
+        ``prerequisite_ids`` name the stage's materials covering its
+        prerequisite topics.
+        ``degraded`` marks a retrieval-only stage built without the Kimi plan.
+        """
+        start_date = datetime.now()
+        scheduler = CapacityScheduler(parse_daily_minutes(user_profile.available_time))
+        material_rows = iter(material_results)
         
         # Process each learning stage
-        for stage in self.learning_stages:
+        for stage, stage_methods in zip(self.learning_stages, method_results):
             stage_materials = []
             
             # Get materials for each category in the stage
             for category in stage["categories"]:
-                # Search for relevant materials
-                materials = self.materials_base.search_materials(
-                    f"{category} {user_profile.difficulty_level} {user_profile.learning_goals}",
-                    k=3
-                )
-                
-                # Add materials to stage with scheduling
-                for material in materials:
+                for material in next(material_rows):
                     stage_materials.append({
                         "material": material["material"],
-                        "scheduled_date": current_date.strftime("%Y-%m-%d"),
                         "stage": stage["name"],
                         "category": category,
                         "estimated_time": material["material"]["estimated_time"]
                     })
-                    current_date += timedelta(days=1)
-            
-            # Get methods appropriate for this stage
-            stage_methods = self.knowledge_base.search_methods(
-                f"{stage['description']} {user_profile.learning_style}",
-                k=2
-            )
+                    
+            # Pack the stage's materials into days of the user's available time,
+            # each after the materials covering its prerequisite topics
+            prerequisites = prerequisite_ids([entry["material"] for entry in stage_materials])
+            for entry, material_ids in zip(stage_materials, prerequisites):
+                entry["prerequisite_ids"] = material_ids
+            days = scheduler.schedule_stage([
+                ScheduleItem(
+                    entry["material"]["id"],
+                    material_minutes(entry["material"], DEFAULT_MATERIAL_MINUTES),
+                    entry["prerequisite_ids"]
+                )
+                for entry in stage_materials
+            ])
+            stage_start = min(days, default=scheduler.days_used)
+            for entry, day in zip(stage_materials, days):
+                entry["scheduled_date"] = (start_date + timedelta(days=day)).strftime("%Y-%m-%d")
+                entry["plan_day"] = day
+                entry["day"] = day - stage_start
+            stage_materials.sort(key=lambda entry: entry["day"])
             
             # Create stage entry
-            learning_path.append({
+            yield {
                 "stage": stage["name"],
                 "description": stage["description"],
                 "materials": stage_materials,
                 "methods": [method["method"] for method in stage_methods],
-                "duration": f"{len(stage_materials)}天",
+                "recommended_methods": recommended_methods,
+                "degraded": degraded,
+                "duration": f"{len({entry['day'] for entry in stage_materials})}天",
                 "learning_focus": self._generate_learning_focus(stage["name"], user_profile)
-            })
-        
-        return learning_path
+            }
+
+    @staticmethod
+    async def _timed(name: str, awaitable: Awaitable[Any], timings: Dict[str, float]) -> Any:
+        """Await one branch of the pipeline and record its duration, also as a request span"""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[name] = (time.perf_counter() - started) * 1000
+            record_span(name, timings[name])
         
     def _generate_learning_focus(self, stage: str, profile: LearningPathCreate) -> str:
         """Generate learning focus based on stage and user profile"""
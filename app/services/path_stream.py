@@ -0,0 +1,84 @@
+from typing import Dict, Any, AsyncIterator, Tuple
+from datetime import datetime
+import asyncio
+import uuid
+from fastapi import HTTPException
+from schemas.learning_path import LearningPathCreate
+from services.path_generator import PathGenerator
+from services.task_generator import TaskGenerator
+from core.llm_usage import current_usage
+
+async def stream_learning_path(
+    path: LearningPathCreate,
+    generator: PathGenerator,
+    task_generator: TaskGenerator
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (event, data) pairs for a learning path as each part becomes ready
+
+    The path header is emitted immediately, each stage with its tasks as soon
+    as retrieval finishes, and Kimi recommendations as they are streamed.
+    """
+    created_at = datetime.utcnow()
+    path_id = str(uuid.uuid4())
+    yield "path", {
+        "id": path_id,
+        "subject": path.subject,
+        "difficulty_level": path.difficulty_level,
+        "learning_goals": path.learning_goals,
+        "available_time": path.available_time,
+        "learning_style": path.learning_style,
+        "created_at": created_at.isoformat()
+    }
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    plan = generator.create_plan(path)
+    timings: Dict[str, float] = {}
+
+    async def pump_stages():
+        index = 0
+        previous = None
+        async for stage in generator.iter_stages(path, timings):
+            await queue.put(("stage", {
+                **stage,
+                "tasks": task_generator.generate_stage_tasks(
+                    stage, index, created_at, path_id=path_id, previous_stage=previous
+                )
+            }))
+            index += 1
+            previous = stage if stage["materials"] else previous
+
+    async def pump_recommendations():
+        async for recommendation in plan.stream():
+            await queue.put(("recommendation", recommendation))
+
+    async def run(producer):
+        try:
+            await producer()
+        except HTTPException as e:
+            await queue.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            await queue.put(("error", {"status_code": 500, "detail": str(e)}))
+        finally:
+            await queue.put(None)
+
+    producers = [
+        asyncio.create_task(run(pump_stages)),
+        asyncio.create_task(run(pump_recommendations))
+    ]
+    try:
+        remaining = len(producers)
+        while remaining:
+            item = await queue.get()
+            if item is None:
+                remaining -= 1
+                continue
+            yield item
+        usage = current_usage()
+        yield "done", {
+            "timings": {name: round(duration, 1) for name, duration in timings.items()},
+            "llm": usage.summary() if usage else None
+        }
+    finally:
+        # Stop background work if the client went away early
+        for producer in producers:
+            producer.cancel()
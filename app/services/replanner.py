@@ -0,0 +1,121 @@
+from typing import List, Dict, Any, Set
+from datetime import datetime, timedelta
+from schemas.learning_path import ProgressEvent
+from services.task_graph import TaskGraph
+
+DATE_FORMAT = "%Y-%m-%d"
+TASK_LEVELS = {"daily": 0, "weekly": 1, "monthly": 2}
+
+class Replanner:
+    def replan(self, tasks: List[Dict[str, Any]], events: List[ProgressEvent]) -> Dict[str, Any]:
+        """Apply progress events to a plan and return only what changed
+
+        Tasks link to the tasks they depend on through ``dependencies``:
+        daily tasks to the previous study day and their prerequisites,
+        weekly and monthly tasks to the tasks they group. An event only
+        touches its task and the tasks downstream of it:
+        - completed: the task is marked done; if ``date`` is after its due
+          date, open downstream tasks move back by the difference
+        - delayed: the task and open downstream tasks move back ``delay_days``
+        - skipped: the task, and for a weekly or monthly task the tasks it
+          groups, are removed; tasks that depended on them depend on what
+          the removed tasks depended on instead
+
+        A task pushed back by several events moves by the largest delay.
+        Returns {"updated": [...], "removed": [...], "unchanged": n}.
+        """
+        graph = TaskGraph(tasks)
+        unknown = [event.task_id for event in events if event.task_id not in graph]
+        if unknown:
+            raise ValueError(f"Unknown task IDs in events: {', '.join(unknown)}")
+            
+        completed: Set[str] = set()
+        removed: Set[str] = set()
+        shifts: Dict[str, int] = {}
+        for event in events:
+            task = graph.tasks[event.task_id]
+            if event.status == "skipped":
+                removed.update(self._grouped(graph, event.task_id))
+            elif event.status == "completed":
+                completed.add(event.task_id)
+                delay = self._days_late(task, event.date)
+                if delay > 0:
+                    self._shift(graph.downstream(event.task_id), delay, shifts)
+            elif event.delay_days > 0:
+                self._shift(graph.downstream(event.task_id, include_root=True), event.delay_days, shifts)
+                
+        bypass: Dict[str, List[str]] = {}
+        updated = []
+        for task in tasks:
+            task_id = task["id"]
+            if task_id in removed:
+                continue
+            changes: Dict[str, Any] = {}
+            if task_id in completed and not task["completed"]:
+                changes["completed"] = True
+            shift = 0 if task["completed"] or task_id in completed else shifts.get(task_id, 0)
+            if shift and task.get("due_date"):
+                due = datetime.strptime(task["due_date"], DATE_FORMAT) + timedelta(days=shift)
+                changes["due_date"] = due.strftime(DATE_FORMAT)
+            if removed.intersection(graph.dependencies[task_id]):
+                dependencies = list(dict.fromkeys(
+                    kept for dependency in graph.dependencies[task_id]
+                    for kept in self._bypass(graph, dependency, removed, bypass)
+                ))
+                # Drop dependencies another one already waits for
+                changes["dependencies"] = [
+                    dependency for dependency in dependencies
+                    if not graph.downstream(dependency).intersection(dependencies)
+                ]
+            if changes:
+                updated.append({**task, **changes})
+                
+        return {
+            "updated": updated,
+            "removed": [task["id"] for task in tasks if task["id"] in removed],
+            "unchanged": len(tasks) - len(updated) - len(removed)
+        }
+
+    @staticmethod
+    def _grouped(graph: TaskGraph, task_id: str) -> Set[str]:
+        """A task and, for a weekly or monthly task, the tasks it groups
+
+        A container groups the dependencies one level below it, so a weekly
+        task's link to the previous week is not followed.
+        """
+        grouped = {task_id}
+        queue = [task_id]
+        while queue:
+            container = queue.pop()
+            level = TASK_LEVELS.get(graph.tasks[container].get("type"), 0)
+            for dependency in graph.dependencies[container]:
+                if TASK_LEVELS.get(graph.tasks[dependency].get("type"), 0) < level and dependency not in grouped:
+                    grouped.add(dependency)
+                    queue.append(dependency)
+        return grouped
+
+    @staticmethod
+    def _bypass(graph: TaskGraph, task_id: str, removed: Set[str], cache: Dict[str, List[str]]) -> List[str]:
+        """``task_id`` if kept, else the kept tasks it depended on, transitively"""
+        if task_id not in removed:
+            return [task_id]
+        if task_id not in cache:
+            cache[task_id] = []  # Guards against cycles
+            cache[task_id] = list(dict.fromkeys(
+                kept for dependency in graph.dependencies[task_id]
+                for kept in Replanner._bypass(graph, dependency, removed, cache)
+            ))
+        return cache[task_id]
+
+    @staticmethod
+    def _shift(task_ids: Set[str], days: int, shifts: Dict[str, int]) -> None:
+        for task_id in task_ids:
+            shifts[task_id] = max(shifts.get(task_id, 0), days)
+
+    @staticmethod
+    def _days_late(task: Dict[str, Any], date: str) -> int:
+        """Days between a task's due date and when it was completed (0 if on time)"""
+        if not date or not task.get("due_date"):
+            return 0
+        late = datetime.strptime(date, DATE_FORMAT) - datetime.strptime(task["due_date"], DATE_FORMAT)
+        return max(late.days, 0)
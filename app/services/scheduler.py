@@ -0,0 +1,120 @@
+from typing import List, Optional, Sequence
+import heapq
+import re
+
+DEFAULT_MATERIAL_MINUTES = 30
+MAX_SKIPPED_DAYS = 16  # Open days passed over per placement before opening a new one
+_AVAILABLE_TIME_PATTERN = re.compile(r"^每(天|周)(\d+(?:\.\d+)?)小时$")
+
+def parse_daily_minutes(available_time: str) -> int:
+    """Daily study capacity in minutes from "每天X小时" or "每周X小时" """
+    match = _AVAILABLE_TIME_PATTERN.match(available_time.strip())
+    if not match:
+        raise ValueError("Available time must be in format: 每天X小时 or 每周X小时")
+    minutes = float(match.group(2)) * 60
+    if match.group(1) == "周":
+        minutes /= 7
+    return max(int(minutes), 1)
+
+class ScheduleItem:
+    __slots__ = ("key", "minutes", "dependencies")
+
+    def __init__(self, key: str, minutes: int, dependencies: Optional[Sequence[str]] = None):
+        """One unit of study to place on a day; dependencies are keys of other items"""
+        self.key = key
+        self.minutes = minutes
+        self.dependencies = dependencies or ()
+
+class CapacityScheduler:
+    def __init__(self, daily_minutes: int):
+        """Pack study items into days of at most ``daily_minutes`` each
+
+        Stages are scheduled in the order they are passed to schedule_stage()
+        and never share a day, so stage order is kept. Within a stage, items
+        whose dependencies are placed go into a ready heap, largest first, and
+        each goes to the open day with the most room left that is not before
+        its dependencies (worst-fit decreasing). At most MAX_SKIPPED_DAYS
+        days that are too early are passed over before a new day is opened,
+        keeping the whole schedule O(n log n) in the number of items. An item
+        longer than a whole day gets a day to itself.
+        """
+        if daily_minutes <= 0:
+            raise ValueError("daily_minutes must be positive")
+        self.daily_minutes = daily_minutes
+        self.next_day = 0
+
+    @property
+    def days_used(self) -> int:
+        return self.next_day
+
+    def schedule_stage(self, items: Sequence[ScheduleItem]) -> List[int]:
+        """Place one stage's items after all earlier stages
+
+        Returns the 0-based plan day of each item, in input order.
+        """
+        stage_start = self.next_day
+        index_by_key = {item.key: index for index, item in enumerate(items)}
+        dependents: List[List[int]] = [[] for _ in items]
+        waiting = [0] * len(items)
+        for index, item in enumerate(items):
+            for key in item.dependencies:
+                dependency = index_by_key.get(key)
+                if dependency is not None and dependency != index:
+                    dependents[dependency].append(index)
+                    waiting[index] += 1
+
+        ready = [(-item.minutes, index) for index, item in enumerate(items) if waiting[index] == 0]
+        heapq.heapify(ready)
+        open_days: List[tuple] = []  # (-remaining minutes, day)
+        days = [-1] * len(items)
+        placed = 0
+
+        while placed < len(items):
+            if not ready:
+                # A dependency cycle: release the earliest unplaced item
+                index = next(i for i, day in enumerate(days) if day < 0 and waiting[i] > 0)
+                waiting[index] = 0
+                heapq.heappush(ready, (-items[index].minutes, index))
+
+            _, index = heapq.heappop(ready)
+            item = items[index]
+            earliest = max(
+                [stage_start] + [
+                    days[index_by_key[key]] for key in item.dependencies
+                    if key in index_by_key and days[index_by_key[key]] >= 0
+                ]
+            )
+            days[index] = self._place(open_days, item.minutes, earliest)
+            placed += 1
+
+            for dependent in dependents[index]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, (-items[dependent].minutes, dependent))
+
+        return days
+
+    def _place(self, open_days: List[tuple], minutes: int, earliest: int) -> int:
+        """Put an item on the roomiest open day not before ``earliest``, or a new day"""
+        skipped = []
+        day = None
+        while open_days and -open_days[0][0] >= minutes and len(skipped) < MAX_SKIPPED_DAYS:
+            remaining, candidate = heapq.heappop(open_days)
+            if candidate >= earliest:
+                day = candidate
+                remaining += minutes
+                if remaining < 0:
+                    heapq.heappush(open_days, (remaining, day))
+                break
+            skipped.append((remaining, candidate))
+        for entry in skipped:
+            heapq.heappush(open_days, entry)
+        if day is not None:
+            return day
+
+        day = self.next_day
+        self.next_day += 1
+        remaining = self.daily_minutes - minutes
+        if remaining > 0:
+            heapq.heappush(open_days, (-remaining, day))
+        return day
@@ -1,12 +1,36 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from datetime import datetime, timedelta
 import uuid
-from core.kimi import KimiAPI
+from core.durations import duration_minutes
+from core.timing import span
 from schemas.learning_path import LearningPathCreate
+from services.learning_plan import LearningPlan
+
+def task_id(path_id: str, stage_id: str, index: int) -> str:
+    """Deterministic task id: the same path, stage and position always give the same id"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{path_id}/{stage_id}/{index}"))
+
+def _depends(dependencies: Dict[str, List[str]], task: str, target: str) -> bool:
+    """Whether ``task`` is ``target`` or depends on it, directly or transitively"""
+    stack, seen = [task], set()
+    while stack:
+        current = stack.pop()
+        if current == target:
+            return True
+        if current not in seen:
+            seen.add(current)
+            stack.extend(dependencies.get(current, ()))
+    return False
 
 class Task:
+    __slots__ = (
+        "id", "title", "description", "completed", "duration", "type",
+        "stage_id", "stage_name", "due_date", "dependencies"
+    )
+
     def __init__(
         self,
+        id: str,
         title: str,
         description: str,
         duration: str,
@@ -16,7 +40,7 @@ class Task:
         due_date: Optional[str] = None,
         dependencies: Optional[List[str]] = None
     ):
-        self.id = str(uuid.uuid4())
+        self.id = id
         self.title = title
         self.description = description
         self.completed = False
@@ -28,6 +52,7 @@ class Task:
         self.dependencies = dependencies or []
         
     def to_dict(self) -> Dict[str, Any]:
+        """Response shape of schemas.learning_path.Task, ready to serialize as is"""
         return {
             "id": self.id,
             "title": self.title,
@@ -35,17 +60,17 @@ class Task:
             "completed": self.completed,
             "duration": self.duration,
             "type": self.type,
-            "stageId": self.stage_id,
-            "stageName": self.stage_name,
-            "dueDate": self.due_date,
+            "stage_id": self.stage_id,
+            "stage_name": self.stage_name,
+            "due_date": self.due_date,
             "dependencies": self.dependencies
         }
 
 class TaskGenerator:
+    WEEKS_PER_STAGE = 4
+
     def __init__(self):
-        """Initialize task generator with Kimi API"""
-        self.kimi_api = KimiAPI()
-        
+        """Initialize task generator"""
         # Define learning stages and their characteristics
         self.stages = [
             {
@@ -81,77 +106,256 @@ class TaskGenerator:
     async def generate_tasks(
         self,
         learning_path: LearningPathCreate,
-        materials: List[Dict[str, Any]]
+        learning_stages: List[Dict[str, Any]],
+        plan: Optional[LearningPlan] = None,
+        path_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Generate tasks based on learning path and materials"""
-        all_tasks = []
-        current_date = datetime.now()
-        
-        # Get AI suggestions for task breakdown
-        task_suggestions = await self.kimi_api.generate_method_match({
-            **learning_path.dict(),
-            "stages": self.stages,
-            "materials": materials
-        })
+        """Generate tasks based on learning path and the stages from PathGenerator
+
+        Task ids derive from ``path_id``, so the same path always gets the same ids.
+        """
+        # Reuse the request's Kimi plan instead of issuing a second call
+        recommendation = await plan.top_recommendation() if plan else None
+        with span("tasks"):
+            return list(self.iter_tasks(learning_stages, recommendation=recommendation, path_id=path_id))
+
+    def iter_tasks(
+        self,
+        learning_stages: List[Dict[str, Any]],
+        start_date: Optional[datetime] = None,
+        recommendation: Optional[Dict[str, Any]] = None,
+        start_week: int = 1,
+        end_week: Optional[int] = None,
+        path_id: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily yield task dicts stage by stage and week by week
+
+        Weeks are numbered across the whole plan (four per stage); only tasks
+        of weeks start_week..end_week, and the monthly tasks of their stages,
+        are built. Task ids and dependencies depend only on ``path_id`` and
+        the task's position, not on the week range.
+        """
+        start_date = start_date or datetime.now()
+        path_id = path_id or str(uuid.uuid4())
+        after: List[str] = []
         
         # Process each stage
-        for stage in self.stages:
-            stage_materials = [m for m in materials if m["stage_id"] == stage["id"]]
-            
-            # Generate monthly tasks
-            monthly_task = Task(
-                title=f"{stage['name']}阶段月度计划",
-                description=f"完成{stage['name']}阶段的学习目标",
-                duration="1个月",
-                type="monthly",
+        for stage_index, stage in enumerate(self.stages):
+            first_week = stage_index * self.WEEKS_PER_STAGE + 1
+            if end_week is not None and first_week > end_week:
+                return
+            stage_materials = [
+                entry
+                for path_stage in learning_stages if path_stage["stage"] == stage["id"]
+                for entry in path_stage["materials"]
+            ]
+            if first_week + self.WEEKS_PER_STAGE - 1 >= start_week:
+                weeks = range(
+                    max(start_week - first_week, 0),
+                    self.WEEKS_PER_STAGE if end_week is None else min(end_week - first_week + 1, self.WEEKS_PER_STAGE)
+                )
+                for task in self._iter_stage_tasks(
+                    path_id, stage, stage_index, stage_materials, start_date, recommendation, weeks, after
+                ):
+                    yield task.to_dict()
+            after = self._layout(path_id, stage, stage_index, stage_materials, after)[2] or after
+
+    def generate_stage_tasks(
+        self,
+        path_stage: Dict[str, Any],
+        stage_index: int,
+        start_date: Optional[datetime] = None,
+        recommendation: Optional[Dict[str, Any]] = None,
+        path_id: Optional[str] = None,
+        previous_stage: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate the tasks of a single PathGenerator stage, for incremental delivery
+
+        Pass the last stage with materials delivered before it as
+        ``previous_stage`` so the stage's first day follows that stage's last
+        one, as in iter_tasks().
+        """
+        path_id = path_id or str(uuid.uuid4())
+        after: List[str] = []
+        if previous_stage is not None:
+            after = self._layout(
+                path_id, self._stage(previous_stage), stage_index - 1, previous_stage["materials"], []
+            )[2]
+        return [
+            task.to_dict()
+            for task in self._iter_stage_tasks(
+                path_id, self._stage(path_stage), stage_index, path_stage["materials"],
+                start_date or datetime.now(), recommendation, after=after
+            )
+        ]
+
+    def _stage(self, path_stage: Dict[str, Any]) -> Dict[str, Any]:
+        stage = next((s for s in self.stages if s["id"] == path_stage["stage"]), None)
+        if stage is None:
+            raise ValueError(f"Unknown learning stage: {path_stage['stage']}")
+        return stage
+
+    def _layout(
+        self,
+        path_id: str,
+        stage: Dict[str, Any],
+        stage_index: int,
+        stage_materials: List[Dict[str, Any]],
+        after: List[str]
+    ) -> Tuple[List[Tuple[str, List[Tuple[Dict[str, Any], str]]]], Dict[str, List[str]], List[str]]:
+        """Place one stage's daily tasks in weeks and link them in study order
+
+        Returns each week as (weekly task id, [(entry, daily task id)]), the
+        dependencies of each daily task, and the ids of the tasks on the
+        stage's last day. A daily task depends on every task of the stage's
+        previous study day, or on ``after`` on its first day, and on the
+        tasks of the same day whose materials are in its entry's
+        ``prerequisite_ids``.
+        """
+        buckets: List[List[Dict[str, Any]]] = [[] for _ in range(self.WEEKS_PER_STAGE)]
+        for entry in stage_materials:
+            buckets[min(entry.get("day", 0) // 7, self.WEEKS_PER_STAGE - 1)].append(entry)
+        by_week = []
+        index = 1
+        for week_materials in buckets:
+            by_week.append((task_id(path_id, stage["id"], index), [
+                (entry, task_id(path_id, stage["id"], index + 1 + material_index))
+                for material_index, entry in enumerate(week_materials)
+            ]))
+            index += 1 + len(week_materials)
+        
+        by_day: Dict[int, List[str]] = {}
+        by_material: Dict[str, List[str]] = {}
+        day_of: Dict[str, int] = {}
+        for _, week_materials in by_week:
+            for entry, daily_id in week_materials:
+                day_of[daily_id] = self._plan_day(entry, stage_index)
+                by_day.setdefault(day_of[daily_id], []).append(daily_id)
+                by_material.setdefault(entry["material"].get("id", ""), []).append(daily_id)
+        previous_day: Dict[int, List[str]] = {}
+        for day in sorted(by_day):
+            previous_day[day] = after
+            after = by_day[day]
+        
+        dependencies: Dict[str, List[str]] = {}
+        same_day: Dict[str, List[str]] = {}
+        for _, week_materials in by_week:
+            for entry, daily_id in week_materials:
+                dependencies[daily_id] = list(previous_day[day_of[daily_id]])
+                for material_id in entry.get("prerequisite_ids") or []:
+                    for prerequisite in by_material.get(material_id, []):
+                        # Earlier days already come first; skip an edge that would close a cycle
+                        if day_of[prerequisite] == day_of[daily_id] and not _depends(same_day, prerequisite, daily_id):
+                            same_day.setdefault(daily_id, []).append(prerequisite)
+                            dependencies[daily_id].append(prerequisite)
+        return by_week, dependencies, by_day[max(by_day)] if by_day else []
+
+    @staticmethod
+    def _plan_day(entry: Dict[str, Any], stage_index: int) -> int:
+        # Entries of paths stored before plan_day existed fall back to 30-day stages
+        return entry.get("plan_day", stage_index * 30 + entry.get("day", 0))
+
+    def _iter_stage_tasks(
+        self,
+        path_id: str,
+        stage: Dict[str, Any],
+        stage_index: int,
+        stage_materials: List[Dict[str, Any]],
+        start_date: datetime,
+        recommendation: Optional[Dict[str, Any]],
+        weeks: Optional[range] = None,
+        after: Optional[List[str]] = None
+    ) -> Iterator[Task]:
+        """Yield the monthly task of one stage, then its weekly and daily tasks
+
+        ``stage_materials`` are PathGenerator entries; each becomes one daily
+        task due on its scheduled ``plan_day`` after ``start_date``, under the
+        week its stage-relative ``day`` falls in (days past the fourth week
+        stay in the last one). A task's index within the stage follows from
+        its week and material, so ids are the same whichever weeks are
+        generated.
+
+        Daily tasks follow the study order (see _layout()); ``after`` are the
+        tasks the stage's first day waits for. Weekly and monthly tasks only
+        group that work and never block it: a weekly task depends on its
+        daily tasks and the previous week (an empty first week on ``after``),
+        the monthly task on its weeks.
+        """
+        by_week, dependencies, _ = self._layout(path_id, stage, stage_index, stage_materials, after or [])
+        
+        def due(days: int) -> str:
+            return (start_date + timedelta(days=days)).strftime("%Y-%m-%d")
+        
+        def plan_day(entry: Dict[str, Any]) -> int:
+            return self._plan_day(entry, stage_index)
+        
+        stage_start = min((plan_day(entry) - entry.get("day", 0) for entry in stage_materials), default=stage_index * 30)
+        last_day = max((plan_day(entry) + 1 for entry in stage_materials), default=0)
+        weekly_ids = [weekly_id for weekly_id, _ in by_week]
+        
+        # Generate monthly tasks
+        yield Task(
+            id=task_id(path_id, stage["id"], 0),
+            title=f"{stage['name']}阶段月度计划",
+            description=self._monthly_description(stage, recommendation),
+            duration="1个月",
+            type="monthly",
+            stage_id=stage["id"],
+            stage_name=stage["name"],
+            due_date=due(max(stage_start + 30, last_day)),
+            dependencies=weekly_ids
+        )
+        
+        # Generate weekly tasks
+        for week, (weekly_id, week_materials) in enumerate(by_week):
+            if weeks is not None and week not in weeks:
+                continue
+            yield Task(
+                id=weekly_id,
+                title=f"{stage['name']}第{week+1}周计划",
+                description=f"完成本周{stage['name']}学习任务",
+                duration="1周",
+                type="weekly",
                 stage_id=stage["id"],
                 stage_name=stage["name"],
-                due_date=(current_date + timedelta(days=30)).strftime("%Y-%m-%d")
+                due_date=due(max([stage_start + (week+1)*7] + [plan_day(entry) + 1 for entry, _ in week_materials])),
+                dependencies=[daily_id for _, daily_id in week_materials] + (
+                    weekly_ids[week - 1:week] if week else ([] if week_materials else after or [])
+                )
             )
-            all_tasks.append(monthly_task)
             
-            # Generate weekly tasks
-            for week in range(4):
-                weekly_task = Task(
-                    title=f"{stage['name']}第{week+1}周计划",
-                    description=f"完成本周{stage['name']}学习任务",
-                    duration="1周",
-                    type="weekly",
+            # Generate daily tasks for the materials scheduled this week
+            for entry, daily_id in week_materials:
+                material = entry["material"]
+                yield Task(
+                    id=daily_id,
+                    title=f"学习{material['title']}",
+                    description=material["description"],
+                    duration=material["estimated_time"],
+                    type="daily",
                     stage_id=stage["id"],
                     stage_name=stage["name"],
-                    due_date=(current_date + timedelta(days=(week+1)*7)).strftime("%Y-%m-%d"),
-                    dependencies=[monthly_task.id]
+                    due_date=due(plan_day(entry) + 1),
+                    dependencies=dependencies[daily_id]
                 )
-                all_tasks.append(weekly_task)
-                
-                # Generate daily tasks for materials
-                for material in stage_materials:
-                    daily_task = Task(
-                        title=f"学习{material['title']}",
-                        description=material["description"],
-                        duration=material["estimated_time"],
-                        type="daily",
-                        stage_id=stage["id"],
-                        stage_name=stage["name"],
-                        due_date=(current_date + timedelta(days=week*7 + 1)).strftime("%Y-%m-%d"),
-                        dependencies=[weekly_task.id]
-                    )
-                    all_tasks.append(daily_task)
-            
-            current_date += timedelta(days=30)
-        
-        return [task.to_dict() for task in all_tasks]
+
+    def _monthly_description(self, stage: Dict[str, Any], recommendation: Optional[Dict[str, Any]]) -> str:
+        """Describe the monthly goal, mentioning the AI recommended method if any"""
+        description = f"完成{stage['name']}阶段的学习目标"
+        if recommendation and recommendation.get("method_type"):
+            description += f"，推荐方法：{recommendation['method_type']}"
+            if recommendation.get("time_allocation"):
+                description += f"（{recommendation['time_allocation']}）"
+        return description
 
     def _estimate_task_duration(self, material_time: str, task_type: str) -> str:
         """Estimate task duration based on material time and task type"""
-        # Convert material time to minutes
-        try:
-            minutes = int(material_time.replace("分钟", ""))
-            if task_type == "daily":
-                return f"{minutes}分钟"
-            elif task_type == "weekly":
-                return "1周"
-            else:
-                return "1个月"
-        except ValueError:
+        minutes = duration_minutes(material_time)
+        if not minutes:
             return material_time  # Return original if parsing fails
+        if task_type == "daily":
+            return f"{minutes}分钟"
+        elif task_type == "weekly":
+            return "1周"
+        else:
+            return "1个月"
@@ -0,0 +1,188 @@
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+from collections import OrderedDict, deque
+from functools import lru_cache
+import time
+from config import get_settings
+from core.durations import parse_duration
+from core.metrics import register_cache
+
+class TaskGraph:
+    def __init__(self, tasks: Iterable[Dict[str, Any]]):
+        """Dependency graph of a path's tasks, indexed both ways
+
+        ``dependencies`` lists the tasks each task waits for and
+        ``dependents`` the tasks waiting on it; ids outside the plan are
+        ignored. Open tasks whose dependencies are all completed form the
+        ready set, kept up to date by complete() in O(1) per dependent.
+        The topological order is computed once; the critical path is cached
+        until the next completion.
+        """
+        self.tasks: Dict[str, Dict[str, Any]] = {task["id"]: task for task in tasks}
+        self.dependencies: Dict[str, List[str]] = {}
+        self.dependents: Dict[str, List[str]] = {task_id: [] for task_id in self.tasks}
+        for task_id, task in self.tasks.items():
+            dependencies = [
+                dependency for dependency in dict.fromkeys(task.get("dependencies") or [])
+                if dependency in self.tasks and dependency != task_id
+            ]
+            self.dependencies[task_id] = dependencies
+            for dependency in dependencies:
+                self.dependents[dependency].append(task_id)
+
+        self.completed: Set[str] = {task_id for task_id, task in self.tasks.items() if task.get("completed")}
+        self._waiting = {
+            task_id: sum(1 for dependency in dependencies if dependency not in self.completed)
+            for task_id, dependencies in self.dependencies.items()
+        }
+        self._ready: Dict[str, None] = {
+            task_id: None for task_id, waiting in self._waiting.items()
+            if waiting == 0 and task_id not in self.completed
+        }  # Insertion-ordered set
+        self._order: Optional[List[str]] = None
+        self._critical_path: Optional[Tuple[int, List[str]]] = None
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.tasks
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def ready(self) -> List[str]:
+        """IDs of open tasks whose dependencies are all completed"""
+        return list(self._ready)
+
+    def complete(self, task_id: str) -> List[str]:
+        """Mark a task completed and return the tasks it unblocked"""
+        if task_id not in self.tasks:
+            raise KeyError(task_id)
+        if task_id in self.completed:
+            return []
+        self.completed.add(task_id)
+        self.tasks[task_id] = {**self.tasks[task_id], "completed": True}
+        self._ready.pop(task_id, None)
+        self._critical_path = None
+
+        unblocked = []
+        for dependent in self.dependents[task_id]:
+            self._waiting[dependent] -= 1
+            if self._waiting[dependent] == 0 and dependent not in self.completed:
+                self._ready[dependent] = None
+                unblocked.append(dependent)
+        return unblocked
+
+    def downstream(self, task_id: str, include_root: bool = False) -> Set[str]:
+        """IDs of every task that transitively depends on ``task_id``"""
+        seen = {task_id}
+        queue = deque([task_id])
+        while queue:
+            for dependent in self.dependents[queue.popleft()]:
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+        if not include_root:
+            seen.discard(task_id)
+        return seen
+
+    def topological_order(self) -> List[str]:
+        """Task IDs with every task after its dependencies (Kahn's algorithm)
+
+        Raises ValueError if the dependencies contain a cycle.
+        """
+        if self._order is None:
+            waiting = {task_id: len(dependencies) for task_id, dependencies in self.dependencies.items()}
+            queue = deque(task_id for task_id, count in waiting.items() if count == 0)
+            order = []
+            while queue:
+                task_id = queue.popleft()
+                order.append(task_id)
+                for dependent in self.dependents[task_id]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        queue.append(dependent)
+            if len(order) < len(self.tasks):
+                raise ValueError("Task dependencies contain a cycle")
+            self._order = order
+        return self._order
+
+    def critical_path(self) -> Tuple[int, List[str]]:
+        """Longest chain of open tasks by study minutes, as (minutes, task IDs)
+
+        Monthly and weekly tasks ("1个月", "1周") only group daily work and
+        count as zero minutes; completed tasks count as zero too.
+        """
+        if self._critical_path is None:
+            best: Dict[str, int] = {}
+            previous: Dict[str, Optional[str]] = {}
+            for task_id in self.topological_order():
+                longest, via = 0, None
+                for dependency in self.dependencies[task_id]:
+                    if best[dependency] > longest or via is None:
+                        longest, via = best[dependency], dependency
+                best[task_id] = longest + self._minutes(task_id)
+                previous[task_id] = via
+
+            end = max(best, key=best.get, default=None)
+            path = []
+            while end is not None:
+                path.append(end)
+                end = previous[end]
+            path.reverse()
+            self._critical_path = (best[path[-1]] if path else 0, path)
+        return self._critical_path
+
+    def _minutes(self, task_id: str) -> int:
+        if task_id in self.completed:
+            return 0
+        duration = parse_duration(self.tasks[task_id].get("duration") or "")
+        if duration is None or duration.unit not in ("分钟", "小时"):
+            return 0
+        return duration.max_minutes
+
+class PathStore:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400):
+        """LRU store, with a TTL, of values keyed by learning path id"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path_id: str) -> Optional[Any]:
+        entry = self._entries.get(path_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[path_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path_id)
+        self.hits += 1
+        return value
+
+    def put(self, path_id: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[path_id] = (time.monotonic(), value)
+        self._entries.move_to_end(path_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class TaskGraphStore(PathStore):
+    """Task graphs of generated paths, queried and updated by the task endpoints"""
+
+@lru_cache()
+def get_task_graph_store() -> TaskGraphStore:
+    """Process-wide task graphs of recently generated paths"""
+    settings = get_settings()
+    return TaskGraphStore(settings.TASK_GRAPH_STORE_SIZE, settings.TASK_GRAPH_TTL)
+
+@lru_cache()
+def get_path_stage_store() -> PathStore:
+    """Process-wide PathGenerator stages, Kimi recommendation and start date of recently paged paths"""
+    settings = get_settings()
+    return PathStore(settings.TASK_GRAPH_STORE_SIZE, settings.TASK_GRAPH_TTL)
+
+register_cache("task_graph", lambda: (get_task_graph_store().hits, get_task_graph_store().misses))
+register_cache("path_stages", lambda: (get_path_stage_store().hits, get_path_stage_store().misses))
@@ -0,0 +1,9 @@
+import base64
+import os
+import sys
+
+# The app imports its modules from the app directory (core., services., ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# KimiAPI validates its key on construction; tests never reach the API
+os.environ.setdefault("KIMI_API_KEY", base64.b64encode(b"test-key" * 5).decode())
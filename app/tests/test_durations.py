@@ -0,0 +1,42 @@
+import pytest
+from core.durations import duration_minutes, material_minutes, parse_duration
+from core.materials_base import StudyMaterial
+from services.scheduler import DEFAULT_MATERIAL_MINUTES
+
+def _material(estimated_time):
+    return StudyMaterial(
+        id="function-concept-001",
+        category="基本概念",
+        title="函数的基本概念",
+        description="理解函数的定义",
+        content="函数是描述两个变量之间对应关系的数学概念。",
+        type="教材",
+        difficulty_level="基础",
+        estimated_time=estimated_time,
+        related_methods=[],
+        learning_outcomes=[]
+    )
+
+@pytest.mark.parametrize("text, minutes", [
+    ("45分钟", 45),
+    ("1.5小时", 90),
+    ("1小时30分钟", 90),
+    ("30-60分钟", 60),
+    ("1-2小时", 120)
+])
+def test_duration_minutes_takes_the_upper_bound(text, minutes):
+    assert duration_minutes(text) == minutes
+
+def test_unparseable_duration_gets_the_default():
+    assert parse_duration("视情况而定") is None
+    assert duration_minutes("视情况而定", 30) == 30
+
+def test_material_minutes_are_parsed_at_load():
+    material = _material("1-2小时")
+    assert material.estimated_minutes == 120
+    assert material_minutes(material.dict()) == 120
+
+def test_unparseable_material_time_falls_back_to_the_default():
+    material = _material("视情况而定")
+    assert material.estimated_minutes is None
+    assert material_minutes(material.dict(), DEFAULT_MATERIAL_MINUTES) == DEFAULT_MATERIAL_MINUTES
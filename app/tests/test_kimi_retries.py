@@ -0,0 +1,43 @@
+import asyncio
+import time
+import httpx
+from core.kimi import KimiAPI
+from core.llm_usage import LLMCallRecord
+
+def _send(statuses, retry_budget, max_retries=10):
+    """Send one request against a transport answering ``statuses`` in turn, then 200"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200, json={})
+
+    kimi = KimiAPI()
+    kimi.max_retries = max_retries
+    kimi.retry_max_wait = 0.05
+    kimi.retry_budget = retry_budget
+    record = LLMCallRecord("test")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await kimi._send(client, kimi._build_payload("prompt"), record)
+
+    started = time.perf_counter()
+    response = asyncio.run(run())
+    return response, len(calls), record, time.perf_counter() - started
+
+def test_retries_until_success_within_the_budget():
+    response, calls, record, _ = _send([503, 502], retry_budget=1)
+    assert response.status_code == 200
+    assert calls == 3 and record.retries == 2
+
+def test_retries_stop_at_the_plan_deadline():
+    response, calls, record, elapsed = _send([503] * 100, retry_budget=0.12)
+    assert response.status_code == 503
+    assert calls == record.retries + 1 < 5
+    assert elapsed < 0.2
+
+def test_retries_stop_at_max_retries():
+    response, calls, _, _ = _send([503] * 100, retry_budget=1, max_retries=1)
+    assert response.status_code == 503
+    assert calls == 2
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from schemas.learning_path import LearningPathCreate
+from services.learning_plan import LearningPlan, PlanCache
+from services.path_generator import PathGenerator
+
+PROFILE = LearningPathCreate(
+    subject="高中数学",
+    difficulty_level="中等",
+    learning_goals="掌握函数的基本概念",
+    available_time="每天1小时",
+    learning_style="以练习为主"
+)
+RECOMMENDATIONS = [
+    {"method_type": "错题整理", "priority": 2},
+    {"method_type": "概念图", "priority": 5, "time_allocation": "30分钟"}
+]
+
+class FakeKimi:
+    """Answers after ``delay`` seconds, or fails with ``error``"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def generate_method_match(self, user_profile, caller="method_match"):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return RECOMMENDATIONS
+
+def _plan(kimi, deadline=None, cache=None):
+    return LearningPlan(kimi, PROFILE, [{"name": "knowledge_acquisition"}], deadline=deadline, cache=cache)
+
+def test_concurrent_callers_share_one_call():
+    async def run():
+        kimi = FakeKimi(delay=0.01)
+        plan = _plan(kimi)
+        results = await asyncio.gather(plan.resolve(), plan.resolve(), plan.top_recommendation())
+        return kimi, plan, results
+
+    kimi, plan, (first, second, top) = asyncio.run(run())
+    assert kimi.calls == 1
+    assert first == second == RECOMMENDATIONS
+    assert top["method_type"] == "概念图"
+    assert not plan.degraded
+
+def test_unresolved_plan_makes_no_call():
+    kimi = FakeKimi()
+    _plan(kimi)
+    assert kimi.calls == 0
+
+def test_missed_deadline_degrades_and_caches_the_late_result():
+    cache = PlanCache()
+
+    async def run():
+        plan = _plan(FakeKimi(delay=0.05), deadline=0.01, cache=cache)
+        assert await plan.resolve() == []
+        await asyncio.sleep(0.08)  # The late answer arrives
+        return plan, await plan.resolve(), await plan.top_recommendation()
+
+    plan, later, top = asyncio.run(run())
+    assert plan.degraded
+    assert later == [] and top is None  # Still degraded for the rest of the request
+    assert cache.get(plan.cache_key) == RECOMMENDATIONS
+
+    async def repeat():
+        kimi = FakeKimi(delay=0.05)
+        plan = _plan(kimi, deadline=0.01, cache=cache)
+        return kimi, plan, await plan.resolve()
+
+    kimi, plan, recommendations = asyncio.run(repeat())
+    assert kimi.calls == 0
+    assert plan.cache_hit and not plan.degraded
+    assert recommendations == RECOMMENDATIONS
+
+def test_late_failure_after_deadline_is_not_raised():
+    async def run():
+        plan = _plan(FakeKimi(delay=0.05, error=RuntimeError("kimi down")), deadline=0.01, cache=PlanCache())
+        assert await plan.resolve() == []
+        await asyncio.sleep(0.08)
+        return plan, await plan.resolve(), await plan.top_recommendation()
+
+    plan, later, top = asyncio.run(run())
+    assert plan.degraded
+    assert later == [] and top is None
+
+@pytest.mark.parametrize("deadline", [1, None])
+def test_immediate_failure_degrades_instead_of_raising(deadline):
+    async def run():
+        kimi = FakeKimi(error=RuntimeError("kimi down"))
+        plan = _plan(kimi, deadline=deadline)
+        results = await asyncio.gather(plan.resolve(), plan.top_recommendation())
+        return kimi, plan, results, await plan.resolve()
+
+    kimi, plan, (first, top), later = asyncio.run(run())
+    assert kimi.calls == 1
+    assert plan.degraded
+    assert first == later == [] and top is None
+
+def test_failed_plan_still_yields_a_retrieval_only_path():
+    class Base:
+        def search_materials_batch(self, queries, k):
+            return [[] for _ in queries]
+
+        def search_methods_batch(self, queries, k):
+            return [[] for _ in queries]
+
+    async def run():
+        generator = PathGenerator(Base(), Base())
+        plan = _plan(FakeKimi(error=RuntimeError("HTTP 502")), deadline=1)
+        return await generator.generate_path(PROFILE, plan)
+
+    path = asyncio.run(run())
+    assert path and all(stage["degraded"] and stage["recommended_methods"] == [] for stage in path)
+
+def test_plan_cache_is_lru_with_ttl():
+    cache = PlanCache(max_entries=1, ttl_seconds=60)
+    cache.put("a", RECOMMENDATIONS)
+    cache.put("b", [])
+    assert cache.get("a") is None
+    assert cache.get("b") == []
+    assert not PlanCache(ttl_seconds=0).enabled
@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from config import get_settings
+from core.profiling import get_profiler
+from main import app
+
+TOKEN = "profile-secret"
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(get_settings(), "PROFILE_TOKEN", TOKEN)
+    return TestClient(app)
+
+def _profiled(client):
+    response = client.get("/api/v1/metrics/timing", headers={"X-Profile": "1", "X-Profile-Token": TOKEN})
+    assert response.status_code == 200
+    return response.headers["X-Profile-Id"]
+
+def test_profile_can_be_fetched(client):
+    profile_id = _profiled(client)
+    headers = {"X-Profile-Token": TOKEN}
+    assert profile_id in [profile["id"] for profile in client.get("/api/v1/profiles", headers=headers).json()["profiles"]]
+    assert client.get(f"/api/v1/profiles/{profile_id}", headers=headers).status_code == 200
+    assert client.get("/api/v1/profiles", headers={"X-Profile-Token": "wrong"}).status_code == 403
+
+def test_profile_is_written_off_the_event_loop(client, monkeypatch, tmp_path):
+    profiler = get_profiler()
+    monkeypatch.setattr(profiler, "directory", str(tmp_path))
+    written = []
+    write = profiler.write
+
+    def recording_write(profile):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()  # Not on the loop's thread
+        written.append(profile.id)
+        write(profile)
+
+    monkeypatch.setattr(profiler, "write", recording_write)
+    profile_id = _profiled(client)
+    assert written == [profile_id]
+    assert (tmp_path / f"{profile_id}.collapsed").exists()
@@ -0,0 +1,6 @@
+from core.prompt_builder import estimate_tokens
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("函数") == 2
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("函数 abcd") == 4
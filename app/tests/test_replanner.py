@@ -0,0 +1,99 @@
+import pytest
+from schemas.learning_path import ProgressEvent
+from services.replanner import Replanner
+from tests.test_task_graph import _material, _path_tasks
+
+def _task(task_id, due_date, dependencies=(), completed=False):
+    return {
+        "id": task_id,
+        "title": task_id,
+        "description": "",
+        "completed": completed,
+        "duration": "30分钟",
+        "type": "daily",
+        "stage_id": "knowledge_acquisition",
+        "stage_name": "知识获取",
+        "due_date": due_date,
+        "dependencies": list(dependencies)
+    }
+
+@pytest.fixture
+def tasks():
+    # a -> b -> c, and d on its own
+    return [
+        _task("a", "2025-03-01"),
+        _task("b", "2025-03-02", ["a"]),
+        _task("c", "2025-03-03", ["b"]),
+        _task("d", "2025-03-04")
+    ]
+
+def _delta(tasks, *events):
+    return Replanner().replan(tasks, [ProgressEvent(**event) for event in events])
+
+def test_on_time_completion_only_marks_the_task(tasks):
+    delta = _delta(tasks, {"task_id": "a", "status": "completed", "date": "2025-03-01"})
+    assert [task["id"] for task in delta["updated"]] == ["a"]
+    assert delta["updated"][0]["completed"]
+    assert delta["updated"][0]["due_date"] == "2025-03-01"
+    assert delta["removed"] == []
+    assert delta["unchanged"] == 3
+
+def test_late_completion_moves_downstream_tasks(tasks):
+    delta = _delta(tasks, {"task_id": "a", "status": "completed", "date": "2025-03-03"})
+    updated = {task["id"]: task for task in delta["updated"]}
+    assert updated["a"]["due_date"] == "2025-03-01"
+    assert updated["b"]["due_date"] == "2025-03-04"
+    assert updated["c"]["due_date"] == "2025-03-05"
+    assert "d" not in updated
+
+def test_delay_moves_the_task_and_its_dependents(tasks):
+    delta = _delta(tasks, {"task_id": "b", "status": "delayed", "delay_days": 3})
+    updated = {task["id"]: task["due_date"] for task in delta["updated"]}
+    assert updated == {"b": "2025-03-05", "c": "2025-03-06"}
+    assert delta["unchanged"] == 2
+
+def test_largest_delay_wins(tasks):
+    delta = _delta(
+        tasks,
+        {"task_id": "a", "status": "delayed", "delay_days": 1},
+        {"task_id": "b", "status": "delayed", "delay_days": 4}
+    )
+    updated = {task["id"]: task["due_date"] for task in delta["updated"]}
+    assert updated == {"a": "2025-03-02", "b": "2025-03-06", "c": "2025-03-07"}
+
+def test_skip_removes_only_the_task_and_relinks_its_dependents(tasks):
+    delta = _delta(tasks, {"task_id": "b", "status": "skipped"})
+    assert delta["removed"] == ["b"]
+    assert [(task["id"], task["dependencies"]) for task in delta["updated"]] == [("c", ["a"])]
+    assert delta["unchanged"] == 2
+
+def test_skipping_a_week_removes_the_tasks_it_groups():
+    tasks = [
+        _task("a", "2025-03-01"),
+        _task("b", "2025-03-08", ["a"]),
+        {**_task("week1", "2025-03-07", ["a"]), "type": "weekly"},
+        {**_task("week2", "2025-03-14", ["b", "week1"]), "type": "weekly"},
+        {**_task("month", "2025-03-31", ["week1", "week2"]), "type": "monthly"}
+    ]
+    delta = _delta(tasks, {"task_id": "week2", "status": "skipped"})
+    assert delta["removed"] == ["b", "week2"]
+    assert [(task["id"], task["dependencies"]) for task in delta["updated"]] == [("month", ["week1"])]
+
+def test_delaying_a_generated_day_moves_the_following_days():
+    _, tasks = _path_tasks([_material(f"m{i}", 60) for i in range(3)])
+    daily = sorted((task for task in tasks if task["type"] == "daily"), key=lambda task: task["due_date"])
+    delta = _delta(tasks, {"task_id": daily[1]["id"], "status": "delayed", "delay_days": 2})
+    moved = {task["id"]: task["due_date"] for task in delta["updated"]}
+    assert daily[0]["id"] not in moved
+    assert moved[daily[1]["id"]] == "2025-03-05"
+    assert moved[daily[2]["id"]] == "2025-03-06"
+    assert moved[daily[3]["id"]] == "2025-03-07"  # The next stage's first day
+
+def test_completed_tasks_are_not_moved():
+    tasks = [_task("a", "2025-03-01"), _task("b", "2025-03-02", ["a"], completed=True)]
+    delta = _delta(tasks, {"task_id": "a", "status": "delayed", "delay_days": 2})
+    assert [task["id"] for task in delta["updated"]] == ["a"]
+
+def test_unknown_task_is_rejected(tasks):
+    with pytest.raises(ValueError, match="missing"):
+        _delta(tasks, {"task_id": "missing", "status": "skipped"})
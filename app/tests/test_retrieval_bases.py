@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+from core import knowledge_base, materials_base
+from main import app
+
+def test_bases_are_loaded_once_at_startup(monkeypatch):
+    loads = []
+    for module, cls, loader in (
+        (knowledge_base, knowledge_base.KnowledgeBase, "load_methods"),
+        (materials_base, materials_base.MaterialsBase, "load_materials")
+    ):
+        original = getattr(cls, loader)
+        monkeypatch.setattr(cls, loader, lambda self, path, original=original: loads.append(path) or original(self, path))
+    knowledge_base.get_knowledge_base.cache_clear()
+    materials_base.get_materials_base.cache_clear()
+
+    with TestClient(app):
+        assert sorted(loads) == ["data/study_materials/materials.json", "data/study_methods/methods.json"]
+        assert knowledge_base.get_knowledge_base().methods
+        assert materials_base.get_materials_base() is materials_base.get_materials_base()
+    assert len(loads) == 2
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from datetime import datetime
+import pytest
+from core.durations import duration_minutes
+from schemas.learning_path import LearningPathCreate
+from services.path_generator import PathGenerator, prerequisite_ids
+from services.scheduler import CapacityScheduler, ScheduleItem, parse_daily_minutes
+from services.task_generator import TaskGenerator
+
+START = datetime(2025, 3, 1)
+
+def _material(index, minutes, prerequisites=None):
+    return {
+        "material": {
+            "id": f"m{index}",
+            "title": f"教材{index}",
+            "description": f"第{index}份材料",
+            "estimated_time": f"{minutes}分钟",
+            "prerequisites": prerequisites or []
+        }
+    }
+
+def _profile(available_time):
+    return LearningPathCreate(
+        subject="高中数学",
+        difficulty_level="中等",
+        learning_goals="掌握函数的基本概念",
+        available_time=available_time,
+        learning_style="以练习为主"
+    )
+
+def _stages(available_time, minutes):
+    """PathGenerator stages for materials of the given lengths, spread over every category"""
+    generator = PathGenerator(None, None)
+    rows = iter(minutes)
+    material_results = [
+        [_material(f"{stage['name']}{category}{i}", next(rows, 30)) for i in range(3)]
+        for stage in generator.learning_stages
+        for category in stage["categories"]
+    ]
+    method_results = [[] for _ in generator.learning_stages]
+    return list(generator._iter_stage_entries(_profile(available_time), material_results, method_results, []))
+
+def test_parse_daily_minutes():
+    assert parse_daily_minutes("每天2小时") == 120
+    assert parse_daily_minutes("每周7小时") == 60
+    with pytest.raises(ValueError):
+        parse_daily_minutes("两小时")
+
+def test_schedule_stage_respects_capacity_and_dependencies():
+    scheduler = CapacityScheduler(60)
+    items = [
+        ScheduleItem("a", 40),
+        ScheduleItem("b", 30, ["a"]),
+        ScheduleItem("c", 20),
+        ScheduleItem("d", 50, ["b"])
+    ]
+    days = scheduler.schedule_stage(items)
+    load = defaultdict(int)
+    for item, day in zip(items, days):
+        load[day] += item.minutes
+    assert max(load.values()) <= 60
+    assert days[0] <= days[1] <= days[3]
+
+def test_stages_never_share_a_day():
+    scheduler = CapacityScheduler(120)
+    first = scheduler.schedule_stage([ScheduleItem(str(i), 30) for i in range(5)])
+    second = scheduler.schedule_stage([ScheduleItem(str(i), 30) for i in range(5)])
+    assert max(first) < min(second)
+
+def test_item_longer_than_a_day_gets_its_own_day():
+    scheduler = CapacityScheduler(60)
+    days = scheduler.schedule_stage([ScheduleItem("long", 90), ScheduleItem("short", 20)])
+    assert days[0] != days[1]
+
+@pytest.mark.parametrize("available_time, minutes", [
+    ("每天1小时", [45, 30, 60, 20, 15, 40]),
+    ("每天2小时", [90, 45, 30, 60, 120]),
+    ("每周7小时", [30])
+])
+def test_daily_tasks_stay_within_daily_capacity(available_time, minutes):
+    stages = _stages(available_time, minutes * 20)
+    tasks = list(TaskGenerator().iter_tasks(stages, start_date=START, path_id="p"))
+    daily = [task for task in tasks if task["type"] == "daily"]
+
+    # Each material becomes exactly one daily task
+    assert len(daily) == sum(len(stage["materials"]) for stage in stages)
+
+    load = defaultdict(int)
+    for task in daily:
+        load[task["due_date"]] += duration_minutes(task["duration"])
+    assert max(load.values()) <= parse_daily_minutes(available_time)
+
+def test_daily_tasks_fall_in_their_weekly_window():
+    stages = _stages("每天1小时", [45, 30, 20])
+    tasks = {task["id"]: task for task in TaskGenerator().iter_tasks(stages, start_date=START, path_id="p")}
+    for monthly in tasks.values():
+        if monthly["type"] != "monthly":
+            continue
+        for weekly in map(tasks.get, monthly["dependencies"]):
+            assert weekly["due_date"] <= monthly["due_date"]
+            for daily in map(tasks.get, weekly["dependencies"]):
+                assert daily["due_date"] <= weekly["due_date"]
+
+def test_week_range_keeps_task_ids():
+    stages = _stages("每天2小时", [30, 45, 60])
+    generator = TaskGenerator()
+    full = {task["id"]: task for task in generator.iter_tasks(stages, start_date=START, path_id="p")}
+    page = list(generator.iter_tasks(stages, start_date=START, start_week=3, end_week=6, path_id="p"))
+    assert page
+    for task in page:
+        assert full[task["id"]] == task
+
+def test_prerequisite_topics_map_to_material_ids():
+    materials = [
+        {"id": "practice", "title": "函数运算练习", "prerequisites": ["函数基本概念"]},
+        {"id": "concept", "title": "函数的基本概念", "prerequisites": []},
+        {"id": "modeling", "title": "函数建模实例", "prerequisites": ["函数基本概念", "函数运算", "概率基础知识"]}
+    ]
+    assert prerequisite_ids(materials) == [["concept"], [], ["concept", "practice"]]
+
+def test_materials_are_scheduled_after_their_prerequisite_topics():
+    generator = PathGenerator(None, None)
+    concept = {"material": {"id": "concept", "title": "函数的基本概念", "description": "", "estimated_time": "30分钟", "prerequisites": []}}
+    practice = {"material": {"id": "practice", "title": "函数运算练习", "description": "", "estimated_time": "90分钟", "prerequisites": ["函数基本概念"]}}
+    material_results = [[] for stage in generator.learning_stages for _ in stage["categories"]]
+    material_results[0] = [practice, concept]
+    stages = generator._iter_stage_entries(
+        _profile("每天1小时"), material_results, [[] for _ in generator.learning_stages], []
+    )
+    entries = {entry["material"]["id"]: entry for entry in next(stages)["materials"]}
+    assert entries["practice"]["prerequisite_ids"] == ["concept"]
+    assert entries["concept"]["plan_day"] < entries["practice"]["plan_day"]
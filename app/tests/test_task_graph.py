@@ -0,0 +1,156 @@
+from datetime import datetime
+import pytest
+from schemas.learning_path import LearningPathCreate
+from services.path_generator import PathGenerator
+from services.task_generator import TaskGenerator
+from services.task_graph import PathStore, TaskGraph
+
+def _task(task_id, duration="30分钟", dependencies=(), completed=False):
+    return {"id": task_id, "duration": duration, "dependencies": list(dependencies), "completed": completed}
+
+@pytest.fixture
+def graph():
+    # month -> week -> (a -> b), week -> c
+    return TaskGraph([
+        _task("month", "1个月"),
+        _task("week", "1周", ["month"]),
+        _task("a", "45分钟", ["week"]),
+        _task("b", "1小时", ["a"]),
+        _task("c", "20分钟", ["week"])
+    ])
+
+def test_ready_set_follows_completions(graph):
+    assert graph.ready() == ["month"]
+    assert graph.complete("month") == ["week"]
+    assert graph.complete("week") == ["a", "c"]
+    assert graph.ready() == ["a", "c"]
+    assert graph.complete("a") == ["b"]
+    assert graph.ready() == ["c", "b"]
+    assert graph.complete("a") == []
+
+def test_completed_tasks_on_input_count_as_done():
+    graph = TaskGraph([_task("a", completed=True), _task("b", dependencies=["a"])])
+    assert graph.ready() == ["b"]
+
+def test_unknown_dependencies_are_ignored():
+    graph = TaskGraph([_task("a", dependencies=["elsewhere", "a"])])
+    assert graph.dependencies["a"] == []
+    assert graph.ready() == ["a"]
+
+def test_complete_unknown_task_raises(graph):
+    with pytest.raises(KeyError):
+        graph.complete("missing")
+
+def test_downstream(graph):
+    assert graph.downstream("week") == {"a", "b", "c"}
+    assert graph.downstream("a", include_root=True) == {"a", "b"}
+    assert graph.downstream("c") == set()
+
+def test_topological_order_puts_dependencies_first(graph):
+    order = graph.topological_order()
+    position = {task_id: index for index, task_id in enumerate(order)}
+    for task_id, dependencies in graph.dependencies.items():
+        assert all(position[dependency] < position[task_id] for dependency in dependencies)
+
+def test_cycle_is_rejected():
+    graph = TaskGraph([_task("a", dependencies=["b"]), _task("b", dependencies=["a"])])
+    with pytest.raises(ValueError):
+        graph.topological_order()
+
+def test_critical_path_counts_study_minutes_of_open_tasks(graph):
+    assert graph.critical_path() == (105, ["month", "week", "a", "b"])
+    graph.complete("month")
+    graph.complete("week")
+    graph.complete("a")
+    assert graph.critical_path() == (60, ["month", "week", "a", "b"])
+
+def _material(material_id, minutes, title=None, prerequisites=()):
+    return {"material": {
+        "id": material_id,
+        "title": title or material_id,
+        "description": "",
+        "estimated_time": f"{minutes}分钟",
+        "prerequisites": list(prerequisites)
+    }}
+
+def _path_tasks(first_category, available_time="每天1小时"):
+    """Tasks of a generated path whose only materials are ``first_category``, in the first category"""
+    generator = PathGenerator(None, None)
+    material_results = [[] for stage in generator.learning_stages for _ in stage["categories"]]
+    material_results[0] = first_category
+    material_results[-1] = [_material("project", 60)]
+    profile = LearningPathCreate(
+        subject="高中数学",
+        difficulty_level="中等",
+        learning_goals="掌握函数的基本概念",
+        available_time=available_time,
+        learning_style="以练习为主"
+    )
+    stages = list(generator._iter_stage_entries(profile, material_results, [[] for _ in generator.learning_stages], []))
+    return stages, list(TaskGenerator().iter_tasks(stages, start_date=datetime(2025, 3, 1), path_id="p"))
+
+def _titles(tasks, task_ids):
+    return [tasks[task_id]["title"] for task_id in task_ids]
+
+def test_daily_tasks_are_ready_day_by_day():
+    stages, tasks = _path_tasks([_material(f"m{i}", 60) for i in range(3)])
+    graph = TaskGraph(tasks)
+    tasks = graph.tasks
+
+    # A fresh path starts with the first day's work, not with the containers
+    first = graph.ready()
+    assert [tasks[task_id]["type"] for task_id in first] == ["daily"]
+    for _ in range(2):
+        (task_id,) = graph.ready()
+        (unblocked,) = graph.complete(task_id)
+        assert tasks[unblocked]["type"] == "daily"
+        assert tasks[unblocked]["due_date"] > tasks[task_id]["due_date"]
+
+    # Finishing the stage's last day unblocks its week, the first weeks of the
+    # empty stages after it and the next stage with materials
+    unblocked = graph.complete(graph.ready()[0])
+    assert sorted(_titles(tasks, unblocked)) == sorted([
+        "知识获取第1周计划", "练习强化第1周计划", "规律识别第1周计划", "学习project"
+    ])
+
+def test_critical_path_runs_through_every_study_day():
+    _, tasks = _path_tasks([_material("a", 45), _material("b", 30), _material("c", 60)])
+    graph = TaskGraph(tasks)
+    minutes, path = graph.critical_path()
+    daily = [task_id for task_id in path if graph.tasks[task_id]["type"] == "daily"]
+    assert _titles(graph.tasks, daily[-1:]) == ["学习project"]
+    assert len({graph.tasks[task_id]["due_date"] for task_id in daily}) == len(daily) == 4
+    assert minutes == 45 + 30 + 60 + 60
+
+def test_same_day_prerequisites_come_first():
+    _, tasks = _path_tasks([
+        _material("practice", 60, "函数运算练习", ["函数基本概念"]),
+        _material("concept", 30, "函数的基本概念")
+    ], available_time="每天2小时")
+    graph = TaskGraph(tasks)
+    assert _titles(graph.tasks, graph.ready()) == ["学习函数的基本概念"]
+    assert _titles(graph.tasks, graph.complete(graph.ready()[0])) == ["学习函数运算练习"]
+
+def test_streamed_stages_link_like_the_full_path():
+    stages, tasks = _path_tasks([_material("a", 45), _material("b", 30)])
+    generator = TaskGenerator()
+    streamed, previous = [], None
+    for index, stage in enumerate(stages):
+        streamed += generator.generate_stage_tasks(stage, index, datetime(2025, 3, 1), path_id="p", previous_stage=previous)
+        previous = stage if stage["materials"] else previous
+    assert streamed == tasks
+
+def test_path_store_evicts_least_recently_used():
+    store = PathStore(max_entries=2, ttl_seconds=10)
+    store.put("p1", 1)
+    store.put("p2", 2)
+    assert store.get("p1") == 1
+    store.put("p3", 3)
+    assert store.get("p2") is None
+    assert store.get("p1") == 1
+    assert (store.hits, store.misses) == (2, 1)
+
+def test_path_store_expires_entries():
+    store = PathStore(max_entries=2, ttl_seconds=-1)
+    store.put("p1", 1)
+    assert store.get("p1") is None
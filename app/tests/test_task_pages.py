@@ -0,0 +1,73 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from api.v1.endpoints import learning_path
+from core.kimi import KimiAPI
+from services.path_generator import PathGenerator
+from main import app
+
+PROFILE = {
+    "subject": "高中数学",
+    "difficulty_level": "中等",
+    "learning_goals": "掌握函数的基本概念",
+    "available_time": "每天1小时",
+    "learning_style": "以练习为主"
+}
+
+class FakeRetrievalGenerator(PathGenerator):
+    """PathGenerator with canned search results, counting retrievals"""
+
+    def __init__(self):
+        super().__init__(None, None)
+        self.retrievals = 0
+
+    async def _retrieve(self, user_profile, timings):
+        self.retrievals += 1
+        materials = [
+            [
+                {"material": {
+                    "id": f"{stage['name']}-{category}-{index}",
+                    "title": f"{category}{index}",
+                    "description": "练习",
+                    "estimated_time": f"{20 + 10 * index}分钟",
+                    "prerequisites": []
+                }}
+                for index in range(3)
+            ]
+            for stage in self.learning_stages
+            for category in stage["categories"]
+        ]
+        return materials, [[] for _ in self.learning_stages]
+
+@pytest.fixture
+def generator(monkeypatch):
+    async def generate_method_match(self, user_profile, caller="method_match"):
+        return [{"method_type": "概念图", "reasoning": "r", "priority": 4, "time_allocation": "30分钟"}]
+    monkeypatch.setattr(KimiAPI, "generate_method_match", generate_method_match)
+    generator = FakeRetrievalGenerator()
+    app.dependency_overrides[learning_path.get_path_generator] = lambda: generator
+    yield generator
+    app.dependency_overrides.clear()
+
+def _page(client, **params):
+    response = client.post("/api/v1/learning-path/tasks", params=params, json=PROFILE)
+    assert response.status_code == 200
+    return response.headers["X-Path-Id"], [json.loads(line) for line in response.text.splitlines()]
+
+def test_pages_of_one_path_share_task_ids(generator):
+    client = TestClient(app)
+    path_id, full = _page(client)
+    _, first = _page(client, start_week=1, end_week=2, path_id=path_id)
+    _, second = _page(client, start_week=3, end_week=8, path_id=path_id)
+
+    tasks = {task["id"]: task for task in full}
+    for task in first + second:
+        assert tasks[task["id"]] == task
+    assert generator.retrievals == 1
+
+def test_pages_without_path_id_are_new_paths(generator):
+    client = TestClient(app)
+    first_id, first = _page(client, start_week=1, end_week=1)
+    second_id, second = _page(client, start_week=1, end_week=1)
+    assert first_id != second_id
+    assert not {task["id"] for task in first} & {task["id"] for task in second}
@@ -1,15 +1,165 @@
 """API router with deferred endpoint loading."""
-import gc
-from fastapi import APIRouter
+from typing import Optional
+import hmac
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.config import ADMIN_TOKEN
+from app.core.memory_diagnostics import KEY_TYPES, get_memory_tracer, resident_sizes
+from app.core.memory_governor import get_memory_governor
+from app.core.model_residency import get_resident_models
+from app.core.log import get_logger
+from app.core.timing import span_duration
+from app.core.loop_monitor import get_loop_monitor
+from app.core.profiling import get_profiler, profile_token_valid
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
-    gc.collect()  # Force garbage collection
     return {"status": "healthy"}
 
+@router.get("/memory")
+async def memory_status():
+    """Memory governor decisions and resident models."""
+    return {
+        "governor": get_memory_governor().stats(),
+        "models": get_resident_models().stats()
+    }
+
+@router.get("/timing")
+async def timing_histograms():
+    """Histograms of request stage durations in milliseconds."""
+    return {span_duration.name: span_duration.snapshot()}
+
+@router.get("/loop")
+async def loop_status():
+    """Event loop lag histogram and recent stalls with the stack of the blocking frame."""
+    return get_loop_monitor().snapshot()
+
+def _check_admin_token(token: Optional[str]) -> None:
+    """Reject diagnostics access without a valid X-Admin-Token."""
+    if not ADMIN_TOKEN or token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token is required")
+
+def _traced(call):
+    """Run a tracer call, mapping unknown snapshots to 404 and tracing errors to 409."""
+    try:
+        return call()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {e.args[0]}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+_KEY_PATTERN = f"^({'|'.join(KEY_TYPES)})$"
+
+@router.get("/memory/resident")
+def resident_memory(x_admin_token: Optional[str] = Header(None)):
+    """Bytes held by resident models, FAISS indexes, knowledge base metadata and caches."""
+    _check_admin_token(x_admin_token)
+    return resident_sizes()
+
+@router.get("/memory/trace")
+def trace_status(x_admin_token: Optional[str] = Header(None)):
+    """Whether tracemalloc is tracing, traced memory and stored snapshots."""
+    _check_admin_token(x_admin_token)
+    return get_memory_tracer().status()
+
+@router.post("/memory/trace/start")
+def start_trace(frames: int = Query(1, ge=1, le=50), x_admin_token: Optional[str] = Header(None)):
+    """Start tracemalloc; allocations made before this are not traced."""
+    _check_admin_token(x_admin_token)
+    return get_memory_tracer().start(frames)
+
+@router.post("/memory/trace/stop")
+def stop_trace(x_admin_token: Optional[str] = Header(None)):
+    """Stop tracemalloc and release its traces; stored snapshots are kept."""
+    _check_admin_token(x_admin_token)
+    return get_memory_tracer().stop()
+
+@router.post("/memory/trace/snapshots")
+def take_snapshot(x_admin_token: Optional[str] = Header(None)):
+    """Take a snapshot to inspect or diff later."""
+    _check_admin_token(x_admin_token)
+    tracer = get_memory_tracer()
+    return {"snapshot": _traced(tracer.take_snapshot), **tracer.status()}
+
+@router.get("/memory/trace/top")
+def top_allocations(
+    snapshot: Optional[str] = None,
+    key: str = Query("lineno", pattern=_KEY_PATTERN),
+    limit: int = Query(20, ge=1, le=200),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Largest allocation sites.
+
+    Args:
+        snapshot: Stored snapshot id; a new snapshot is taken when omitted
+        key: Group by "lineno", "filename" or "traceback"
+        limit: Number of sites returned
+    """
+    _check_admin_token(x_admin_token)
+    return _traced(lambda: get_memory_tracer().top(snapshot, key, limit))
+
+@router.get("/memory/trace/diff")
+def diff_allocations(
+    base: str,
+    target: Optional[str] = None,
+    key: str = Query("lineno", pattern=_KEY_PATTERN),
+    limit: int = Query(20, ge=1, le=200),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Allocation sites that changed most between two snapshots.
+
+    Args:
+        base: Earlier snapshot id
+        target: Later snapshot id; a new snapshot is taken when omitted
+        key: Group by "lineno", "filename" or "traceback"
+        limit: Number of sites returned
+    """
+    _check_admin_token(x_admin_token)
+    return _traced(lambda: get_memory_tracer().diff(base, target, key, limit))
+
+def _check_profile_token(token: Optional[str]) -> None:
+    """Reject profile access without a valid X-Profile-Token."""
+    if not profile_token_valid(token):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token is required")
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Recently captured request profiles, newest first."""
+    _check_profile_token(x_profile_token)
+    profiler = get_profiler()
+    return {"profiles": profiler.list(), "skipped": profiler.skipped}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    x_profile_token: Optional[str] = Header(None)
+):
+    """
+    Return one captured profile.
+
+    Args:
+        profile_id: Value of the profiled response's X-Profile-Id header
+        format: "collapsed" stacks for flamegraph.pl, or a "speedscope" JSON file
+    """
+    _check_profile_token(x_profile_token)
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "speedscope":
+        return JSONResponse(
+            profile.speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'}
+        )
+    return PlainTextResponse(profile.collapsed())
+
 # Defer endpoint imports to reduce memory usage
 def load_endpoints():
     """Load endpoint modules on demand."""
@@ -29,12 +179,8 @@ def load_endpoints():
             prefix="/learning-paths",
             tags=["learning-paths"]
         )
-        
-        # Force garbage collection after loading
-        gc.collect()
     except Exception as e:
-        print(f"Warning: Failed to load endpoints: {e}")
-        gc.collect()  # Clean up on failure
+        logger.error("endpoints.load_failed", error=str(e), exc_info=True)
 
 # Load endpoints after router creation
 load_endpoints()
@@ -1,15 +1,24 @@
 """
 API endpoints for learning path generation and material integration.
 """
-from typing import List, Dict
-from fastapi import APIRouter, HTTPException
+from typing import List, Dict, Optional, Any
+import json
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from app.core.personalized_method_generator import PersonalizedMethodGenerator
 from app.core.learning_path_generator import LearningPathGenerator
+from app.core.task_generator import TaskGenerator
+from app.core.job_queue import get_job_queue, JobQueueFull
+from app.core.memory_governor import get_memory_governor
+from app.core.log import get_logger
 from app.api.v1.endpoints.study_methods import UserProfile, LearningStageActivity
 
 router = APIRouter()
+logger = get_logger(__name__)
+
+COMPACT_MEDIA_TYPE = "application/vnd.learning-path.compact+json"
 
 class LearningStage(BaseModel):
     """Stage in a learning path."""
@@ -56,6 +65,58 @@ class LearningPathResponse(BaseModel):
     materials: Dict[str, List[StageMaterial]]
     message: str = "Successfully generated learning path with materials."
 
+class JobStatus(BaseModel):
+    """Status of a learning path generation job."""
+    job_id: str
+    kind: str
+    status: str
+    submitted_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+class JobResult(BaseModel):
+    """Result of a finished learning path generation job."""
+    path: LearningPath
+    materials: Dict[str, List[StageMaterial]]
+    tasks: Dict[str, List[Dict[str, Any]]]
+
+class TaskPage(BaseModel):
+    """One week range of a job's tasks."""
+    tasks: List[Dict[str, Any]]
+    cursor: int
+    next_cursor: Optional[int] = None
+    total_weeks: int
+
+def _generate_path(user_info: Dict) -> Dict:
+    """
+    Run the full generation pipeline for one profile.
+    
+    Executed on a job worker thread: personalized methods, then the learning
+    path and its stage materials. Tasks are validated here but generated
+    lazily when the result or task pages are read, so a stored job stays
+    small however long the plan is.
+    
+    Args:
+        user_info: User profile information
+        
+    Returns:
+        Dictionary with the path and its materials by stage
+    """
+    try:
+        method_generator = PersonalizedMethodGenerator()
+        methods = method_generator.generate_personalized_methods(user_info, num_methods=2)
+        
+        path_generator = LearningPathGenerator()
+        path = path_generator.generate_path(methods, user_info)
+        materials = path_generator.get_stage_materials(path)
+        
+        # Fail the job now rather than when its tasks are first read
+        next(TaskGenerator().iter_tasks(path, materials), None)
+        return {"path": path, "materials": materials}
+    finally:
+        get_memory_governor().check()
+
 @router.post("/generate", response_model=LearningPathResponse)
 async def generate_learning_path(profile: UserProfile):
     """
@@ -74,21 +135,18 @@ async def generate_learning_path(profile: UserProfile):
         try:
             methods = method_generator.generate_personalized_methods(profile.dict(), num_methods=2)
         except Exception as e:
-            print(f"Error generating methods: {str(e)}")
+            logger.warning("methods.fallback", error=str(e))
             methods = method_generator.generate_personalized_methods(profile.dict(), num_methods=1)
-        finally:
-            import gc
-            gc.collect()
         
         # Generate learning path with materials using lazy loading
         path_generator = LearningPathGenerator()
         path = path_generator.generate_path(methods, profile.dict())
         
-        # Get materials in smaller batches with cleanup
+        # Reclaim memory only if the request pushed RSS over a threshold
         try:
             materials = path_generator.get_stage_materials(path)
         finally:
-            gc.collect()
+            get_memory_governor().check()
         
         return LearningPathResponse(
             path=path,
@@ -113,3 +171,182 @@ async def get_example_path():
         subjects="数学"
     )
     return await generate_learning_path(profile)
+
+@router.post("/jobs", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_learning_path_job(profile: UserProfile):
+    """
+    Queue learning path generation and return immediately.
+    
+    Poll GET /jobs/{job_id} for status and GET /jobs/{job_id}/result for
+    the path, materials and tasks once it has succeeded.
+    
+    Args:
+        profile: User profile containing learning preferences and goals
+        
+    Returns:
+        Status of the queued job
+        
+    Raises:
+        HTTPException: 503 if the job queue is full
+    """
+    try:
+        job = get_job_queue().submit("learning_path", _generate_path, profile.dict())
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "30"}
+        )
+    return job.to_dict()
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_learning_path_job(job_id: str):
+    """
+    Get the status of a learning path generation job.
+    
+    Raises:
+        HTTPException: 404 if the job is unknown or its result has expired
+    """
+    return _get_job(job_id).to_dict()
+
+@router.get(
+    "/jobs/{job_id}/result",
+    response_model=JobResult,
+    responses={
+        200: {"content": {COMPACT_MEDIA_TYPE: {}}},
+        202: {"model": JobStatus, "description": "Job has not finished yet"}
+    }
+)
+async def get_learning_path_job_result(
+    job_id: str,
+    request: Request,
+    format: Optional[str] = Query(None, description="json or compact (default: from Accept)")
+):
+    """
+    Get the result of a finished learning path generation job.
+    
+    With format=compact or "Accept: application/vnd.learning-path.compact+json"
+    tasks use the normalized format, with shared activities, materials and
+    checklists in lookup tables.
+    
+    Returns:
+        The generated path, materials and tasks, or the job status with
+        202 while the job is still queued or running
+        
+    Raises:
+        HTTPException: 404 if the job is unknown or expired, 500 if it failed
+    """
+    job = _get_job(job_id)
+    if job.status == job.FAILED:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating learning path: {job.error}"
+        )
+    if not job.done:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=job.to_dict(),
+            headers={"Retry-After": "5"}
+        )
+    result = job.result
+    if _wants_compact(request, format):
+        return JSONResponse(
+            content={
+                **result,
+                "tasks": TaskGenerator().generate_compact_tasks(result["path"], result["materials"])
+            },
+            media_type=COMPACT_MEDIA_TYPE
+        )
+    return {
+        **result,
+        "tasks": TaskGenerator().generate_tasks(result["path"], result["materials"])
+    }
+
+@router.get(
+    "/jobs/{job_id}/tasks",
+    response_model=TaskPage,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        202: {"model": JobStatus, "description": "Job has not finished yet"}
+    }
+)
+async def get_learning_path_job_tasks(
+    job_id: str,
+    request: Request,
+    cursor: int = Query(1, ge=1, description="First week of the page"),
+    weeks: Optional[int] = Query(None, ge=1, description="Weeks per page (default: all remaining)"),
+    format: Optional[str] = Query(None, description="json, ndjson or compact (default: from Accept)")
+):
+    """
+    Page through a finished job's tasks by week range, or stream them.
+    
+    Tasks are generated lazily for the requested weeks only. With
+    format=ndjson or "Accept: application/x-ndjson" they are streamed one
+    per line; otherwise a page is returned with the cursor of the next one,
+    its tasks in the normalized format when compact is requested.
+    
+    Raises:
+        HTTPException: 404 if the job is unknown or expired, 500 if it failed
+    """
+    job = _get_job(job_id)
+    if job.status == job.FAILED:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating learning path: {job.error}"
+        )
+    if not job.done:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=job.to_dict(),
+            headers={"Retry-After": "5"}
+        )
+        
+    task_generator = TaskGenerator()
+    path, materials = job.result["path"], job.result["materials"]
+    total_weeks = task_generator.total_weeks(path)
+    end_week = min(cursor + weeks - 1, total_weeks) if weeks else total_weeks
+    
+    if _wants_ndjson(request, format):
+        return StreamingResponse(
+            (
+                json.dumps(task, ensure_ascii=False) + "\n"
+                for task in task_generator.iter_tasks(path, materials, cursor, end_week)
+            ),
+            media_type="application/x-ndjson",
+            headers={"X-Total-Weeks": str(total_weeks)}
+        )
+    if _wants_compact(request, format):
+        return JSONResponse(
+            content={
+                "tasks": task_generator.generate_compact_tasks(path, materials, cursor, end_week),
+                "cursor": cursor,
+                "next_cursor": end_week + 1 if end_week < total_weeks else None,
+                "total_weeks": total_weeks
+            },
+            media_type=COMPACT_MEDIA_TYPE
+        )
+    return {
+        "tasks": list(task_generator.iter_tasks(path, materials, cursor, end_week)),
+        "cursor": cursor,
+        "next_cursor": end_week + 1 if end_week < total_weeks else None,
+        "total_weeks": total_weeks
+    }
+
+def _get_job(job_id: str):
+    """Look up a job or raise 404."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+def _wants_ndjson(request: Request, format: Optional[str]) -> bool:
+    """Whether the client asked for newline-delimited JSON."""
+    if format is not None:
+        return format == "ndjson"
+    return "application/x-ndjson" in request.headers.get("accept", "")
+
+def _wants_compact(request: Request, format: Optional[str]) -> bool:
+    """Whether the client asked for the normalized task format."""
+    if format is not None:
+        return format == "compact"
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
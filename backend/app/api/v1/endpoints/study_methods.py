@@ -6,8 +6,11 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from app.core.personalized_method_generator import PersonalizedMethodGenerator
+from app.core.memory_governor import get_memory_governor
+from app.core.log import get_logger
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 class UserProfile(BaseModel):
     """User profile for personalized study method generation."""
@@ -18,6 +21,13 @@ class UserProfile(BaseModel):
     difficulty_level: str
     subjects: str
 
+class LearningStageActivity(BaseModel):
+    """Activity within a learning path stage."""
+    type: str
+    description: str
+    method: str
+    duration: str
+
 class StudyMethodResponse(BaseModel):
     """Response model for personalized study methods."""
     title: str
@@ -51,13 +61,12 @@ async def generate_personalized_methods(profile: UserProfile):
         try:
             methods = generator.generate_personalized_methods(profile.dict(), num_methods=2)
         except Exception as e:
-            print(f"Error generating methods: {str(e)}")
+            logger.warning("methods.fallback", error=str(e))
             # Fallback to generating just one method if memory is constrained
             methods = generator.generate_personalized_methods(profile.dict(), num_methods=1)
         finally:
-            # Force cleanup
-            import gc
-            gc.collect()
+            # Reclaim memory only if the request pushed RSS over a threshold
+            get_memory_governor().check()
         
         # Convert to response format
         response_methods = []
@@ -17,8 +17,43 @@ MODEL_DEVICE = "cpu"  # Force CPU only
 TORCH_THREADS = 1  # Single thread
 BATCH_SIZE = 1  # Process one at a time
 ENABLE_CUDA = False  # No GPU
-GC_COLLECT_INTERVAL = 1  # Continuous GC
 LAZY_LOAD_THRESHOLD = 32 * 1024 * 1024  # 32MB threshold
 MAX_WORKERS = 1  # Single worker
 KEEP_ALIVE = 2  # Short keep-alive
 BACKLOG = 8  # Minimal connection backlog
+
+# Background Jobs - In-process queue, no external broker
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "16"))  # Queued + running jobs
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))  # Seconds to keep finished jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))  # Generation is memory bound
+
+# Model Residency - keep: never unload, idle: unload after MODEL_IDLE_TIMEOUT
+# seconds unused, budget: unload least recently used when RSS exceeds MEMORY_BUDGET_MB
+MODEL_RESIDENCY = os.getenv("MODEL_RESIDENCY", "budget")
+MODEL_IDLE_TIMEOUT = float(os.getenv("MODEL_IDLE_TIMEOUT", "300"))
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "450"))  # Below the 512MB instance limit
+MEMORY_SAMPLE_INTERVAL = float(os.getenv("MEMORY_SAMPLE_INTERVAL", "1"))  # Seconds an RSS sample is reused
+MEMORY_GC_THRESHOLD = float(os.getenv("MEMORY_GC_THRESHOLD", "0.8"))  # Fraction of the budget that triggers gc
+MEMORY_GC_MIN_INTERVAL = float(os.getenv("MEMORY_GC_MIN_INTERVAL", "30"))  # Seconds between threshold collections
+
+# Logging - JSON lines through a queue handler
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")  # e.g. "materials.search.unfiltered=0.1"
+LOG_MEMORY_INTERVAL = float(os.getenv("LOG_MEMORY_INTERVAL", "300"))  # Seconds between memory reports, 0 disables
+
+# Profiling - requests opt in with X-Profile: 1 (or ?profile=1) and X-Profile-Token
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")  # Empty disables per-request profiling
+PROFILE_SAMPLE_HZ = float(os.getenv("PROFILE_SAMPLE_HZ", "100"))  # Stack samples per second, shared by all profiles
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))  # Requests profiled at once
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "16"))  # Finished profiles kept in memory
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")  # Also write collapsed stacks here when set
+
+# Memory diagnostics - tracemalloc admin endpoints, disabled while ADMIN_TOKEN is empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))  # Frames per traced allocation
+MEMORY_TRACE_SNAPSHOTS = int(os.getenv("MEMORY_TRACE_SNAPSHOTS", "4"))  # Snapshots kept for diffs
+
+# Event loop monitor - lag histogram and stacks of stalls
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))  # Seconds between measurements, 0 disables
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))  # Lag that counts as a stall
+LOOP_STALLS_KEPT = int(os.getenv("LOOP_STALLS_KEPT", "20"))
@@ -0,0 +1,114 @@
+"""
+Parsing of duration strings such as "30分钟", "每天1-2小时" or "1-2周".
+
+All duration text in materials, stages and study methods goes through
+parse_duration(), which is compiled once and memoized, so each distinct
+string is parsed a single time per process.
+"""
+from typing import Dict, NamedTuple, Optional
+from functools import lru_cache
+import re
+from app.core.metrics import register_cache
+
+UNIT_MINUTES = {"分钟": 1, "小时": 60, "天": 1440, "周": 10080, "个月": 43200, "月": 43200}
+STUDY_UNITS = ("分钟", "小时")
+_UNIT = "|".join(sorted(UNIT_MINUTES, key=len, reverse=True))
+_DURATION_PATTERN = re.compile(
+    rf"(?P<low>\d+(?:\.\d+)?)\s*(?P<low_unit>{_UNIT})?"
+    rf"(?:\s*(?:-|~|～|到|至)\s*(?P<high>\d+(?:\.\d+)?))?\s*(?P<unit>{_UNIT})"
+)
+
+class Duration(NamedTuple):
+    """A parsed duration: "每天1-2小时" is prefix "每天", low 1, high 2, unit "小时"."""
+    prefix: str
+    low: float
+    high: float
+    unit: str
+    min_minutes: int
+    max_minutes: int
+
+    def scaled(self, factor: float) -> str:
+        """
+        Render the duration with both bounds multiplied by a factor.
+        
+        Args:
+            factor: Multiplier applied to the lower and upper bound
+            
+        Returns:
+            The duration text with the same prefix and unit; minutes are
+            whole numbers, other units have one decimal
+        """
+        if self.unit == "分钟":
+            values = [str(int(self.low * factor)), str(int(self.high * factor))]
+        else:
+            values = [f"{self.low * factor:.1f}", f"{self.high * factor:.1f}"]
+        if self.low == self.high:
+            values = values[:1]
+        return f"{self.prefix}{'-'.join(values)}{self.unit}"
+
+@lru_cache(maxsize=4096)
+def parse_duration(text: str) -> Optional[Duration]:
+    """
+    Parse a duration string into its bounds, unit and prefix.
+    
+    Text before the first number is the prefix ("每天", "每个概念"). Several
+    amounts in a row ("1小时30分钟") add up and are reported in minutes.
+    
+    Args:
+        text: Duration such as "30分钟", "1-2小时", "每天1-2小时" or "1-2周"
+        
+    Returns:
+        The parsed duration, or None if the text has no amount with a unit
+    """
+    matches = list(_DURATION_PATTERN.finditer(str(text)))
+    if not matches:
+        return None
+    prefix = text[:matches[0].start()].strip()
+    if len(matches) > 1:
+        low = high = 0
+        for match in matches:
+            bounds = _bounds_minutes(match)
+            low += bounds[0]
+            high += bounds[1]
+        return Duration(prefix, low, high, "分钟", int(low), int(high))
+
+    match = matches[0]
+    low = float(match.group("low"))
+    high = float(match.group("high") or low)
+    low_minutes, high_minutes = _bounds_minutes(match)
+    return Duration(prefix, low, high, match.group("unit"), int(low_minutes), int(high_minutes))
+
+register_cache("duration_parse", lambda: parse_duration.cache_info()[:2])
+
+def duration_minutes(text: str, default: int = 0) -> int:
+    """
+    Upper bound of a duration in minutes; ranges such as "1-2小时" give 120.
+    
+    Args:
+        text: Duration string
+        default: Value returned when the text cannot be parsed
+    """
+    duration = parse_duration(text)
+    return duration.max_minutes if duration is not None else default
+
+def material_minutes(material: Dict, default: int = 0) -> int:
+    """
+    Minutes of a study material, using the value precomputed at ingest if present.
+    
+    Args:
+        material: Material dictionary with "estimated_time" and, once
+            ingested, "estimated_minutes"
+        default: Value returned when the time cannot be parsed
+    """
+    minutes = material.get("estimated_minutes")
+    if minutes is not None:
+        return minutes
+    return duration_minutes(material.get("estimated_time", ""), default)
+
+def _bounds_minutes(match: "re.Match") -> tuple:
+    """Lower and upper bound of one matched amount, in minutes."""
+    unit = UNIT_MINUTES[match.group("unit")]
+    low_unit = UNIT_MINUTES[match.group("low_unit")] if match.group("low_unit") else unit
+    low = float(match.group("low")) * low_unit
+    high = float(match.group("high")) * unit if match.group("high") else low
+    return low, high
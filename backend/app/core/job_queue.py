@@ -0,0 +1,177 @@
+"""
+In-process job queue for long-running generation work.
+
+Jobs run on a small local thread pool and their results are kept in memory
+for a limited time, so a single box needs no external broker.
+"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+import time
+import uuid
+from app.core.config import JOB_QUEUE_MAX_SIZE, JOB_RESULT_TTL, JOB_WORKERS
+from app.core.metrics import metrics_registry
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+    pass
+
+class Job:
+    """A submitted unit of work and its outcome."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, kind: str):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = Job.QUEUED
+        self.submitted_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.expires_at: Optional[float] = None  # time.monotonic() deadline once finished
+
+    @property
+    def done(self) -> bool:
+        return self.status in (Job.SUCCEEDED, Job.FAILED)
+
+    def to_dict(self) -> Dict:
+        """Status view of the job, without its result."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+class JobQueue:
+    def __init__(
+        self,
+        max_size: int = JOB_QUEUE_MAX_SIZE,
+        workers: int = JOB_WORKERS,
+        result_ttl: float = JOB_RESULT_TTL
+    ):
+        """
+        Initialize the job queue.
+
+        Args:
+            max_size: Maximum number of queued and running jobs
+            workers: Number of worker threads
+            result_ttl: Seconds a finished job is kept before it is purged
+        """
+        self.max_size = max_size
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None  # Lazy start
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queue a job for execution.
+
+        Args:
+            kind: Short label of the job type
+            func: Callable run on a worker thread; its return value is the result
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobQueueFull: If max_size jobs are already queued or running
+        """
+        with self._lock:
+            self._purge_expired()
+            if self._pending >= self.max_size:
+                raise JobQueueFull(f"Job queue is full ({self.max_size} pending jobs)")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="job"
+                )
+            job = Job(kind)
+            self._jobs[job.id] = job
+            self._pending += 1
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job, or None if it is unknown or its result has expired."""
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        """Counts of jobs by status plus capacity."""
+        with self._lock:
+            self._purge_expired()
+            counts = {status: 0 for status in (Job.QUEUED, Job.RUNNING, Job.SUCCEEDED, Job.FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {
+                **counts,
+                "pending": self._pending,
+                "max_size": self.max_size,
+                "workers": self.workers
+            }
+
+    def results(self) -> Dict[str, Any]:
+        """Results of the finished jobs still kept, by job id."""
+        with self._lock:
+            self._purge_expired()
+            return {job_id: job.result for job_id, job in self._jobs.items() if job.done}
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: Dict) -> None:
+        """Execute a job on a worker thread and record its outcome."""
+        job.status = Job.RUNNING
+        job.started_at = datetime.now().isoformat()
+        try:
+            job.result = func(*args, **kwargs)
+            job.status = Job.SUCCEEDED
+        except Exception as e:
+            job.error = str(e)
+            job.status = Job.FAILED
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            with self._lock:
+                job.expires_at = time.monotonic() + self.result_ttl
+                self._pending -= 1
+
+    def _purge_expired(self) -> None:
+        """Drop finished jobs past their TTL. Caller must hold the lock."""
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.expires_at is not None and job.expires_at <= now
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
+
+def _job_samples():
+    if _job_queue is None:
+        return []  # Not started; a scrape should not start it
+    stats = _job_queue.stats()
+    return [((status,), stats[status]) for status in (Job.QUEUED, Job.RUNNING)]
+
+metrics_registry.gauge("job_queue_jobs", "Generation jobs waiting for or running on a worker", ("status",), _job_samples)
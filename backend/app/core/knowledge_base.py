@@ -6,9 +6,18 @@ import json
 from pathlib import Path
 import numpy as np
 import torch
-from sentence_transformers import SentenceTransformer
 import faiss
 from app.core.config import EMBEDDING_MODEL, BATCH_SIZE
+from app.core.model_residency import embedding_model
+from app.core.log import get_logger
+from app.core.metrics import SIZE_BUCKETS, metrics_registry
+from app.core.timing import span
+
+logger = get_logger(__name__)
+
+encode_batch_size = metrics_registry.histogram(
+    "encode_batch_size", "Texts per embedding encode call", ("index",), SIZE_BUCKETS
+)
 
 class StudyMethodKnowledgeBase:
     def __init__(self, model_name: Optional[str] = None):
@@ -21,23 +30,9 @@ class StudyMethodKnowledgeBase:
         
     def _ensure_initialized(self):
         """Ensure model is initialized."""
-        import psutil
-        import gc
-        
-        def log_memory():
-            mem = psutil.Process().memory_info()
-            return f"Memory usage: RSS={mem.rss/1024/1024:.1f}MB, VMS={mem.vms/1024/1024:.1f}MB"
-            
-        print(f"Before model initialization: {log_memory()}")
-        gc.collect()  # Force garbage collection before loading
-        
         if self.model is None:
-            print(f"Loading sentence transformer model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            print(f"After model loading: {log_memory()}")
-            
-        gc.collect()  # Clean up any temporary objects
-        print(f"Final memory state: {log_memory()}")
+            self.model = embedding_model(self.model_name)
+            logger.memory("model.ready", model=self.model_name)
     
     def _create_method_text(self, method: Dict) -> str:
         """Create a searchable text representation of a study method."""
@@ -46,7 +41,7 @@ class StudyMethodKnowledgeBase:
     def build_index(self, methods_file: str = "data/study_methods/sample_methods.json"):
         """Build the FAISS index from study methods."""
         self._ensure_initialized()
-        print("Building knowledge base index...")
+        logger.info("index.build", index="methods", source=methods_file)
         # Load study methods
         with open(methods_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -63,11 +58,13 @@ class StudyMethodKnowledgeBase:
             batch = texts[i:i + batch_size]
             with torch.no_grad():
                 self._ensure_initialized()  # Ensure model is initialized before each batch
-                embeddings = self.model.encode(
-                    batch,
-                    convert_to_tensor=True,
-                    show_progress_bar=False
-                )
+                encode_batch_size.observe(len(batch), "methods")
+                with span("encode"):
+                    embeddings = self.model.encode(
+                        batch,
+                        convert_to_tensor=True,
+                        show_progress_bar=False
+                    )
                 embeddings_list.append(embeddings.cpu().numpy())
         
         embeddings_np = np.vstack(embeddings_list)
@@ -98,10 +95,13 @@ class StudyMethodKnowledgeBase:
             raise ValueError("Knowledge base index not built. Call build_index() first.")
         
         # Generate query embedding
-        query_embedding = self.model.encode([query])
+        encode_batch_size.observe(1, "methods")
+        with span("encode"):
+            query_embedding = self.model.encode([query])
         
         # Search index
-        distances, indices = self.index.search(query_embedding, k)
+        with span("search"):
+            distances, indices = self.index.search(query_embedding, k)
         
         # Return matched methods with scores
         results = []
@@ -116,7 +116,7 @@ class StudyMethodKnowledgeBase:
         
         # If no valid results found, return empty list
         if not results:
-            print(f"No matching methods found for query: {query}")
+            logger.info("methods.search.empty", sample=0.1, query=query[:100])
             return []
             
         return results
@@ -4,9 +4,14 @@ AI model for generating learning paths based on personalized study methods.
 from typing import List, Dict, Optional
 from datetime import datetime
 import uuid
-from sentence_transformers import SentenceTransformer
 from app.core.config import EMBEDDING_MODEL, BATCH_SIZE
 from app.core.materials_knowledge_base import StudyMaterialKnowledgeBase
+from app.core.model_residency import embedding_model, get_resident_models
+from app.core.log import get_logger
+from app.core.timing import timed
+from app.core.durations import parse_duration
+
+logger = get_logger(__name__)
 
 class LearningPathGenerator:
     def __init__(self, model_name: Optional[str] = None):
@@ -16,30 +21,28 @@ class LearningPathGenerator:
         self.materials_kb = None  # Lazy load the knowledge base
         
     def _ensure_initialized(self):
-        """Ensure model and knowledge base are initialized."""
-        import psutil
-        import gc
-        
-        def log_memory():
-            mem = psutil.Process().memory_info()
-            return f"Memory usage: RSS={mem.rss/1024/1024:.1f}MB, VMS={mem.vms/1024/1024:.1f}MB"
-            
-        print(f"Before initialization: {log_memory()}")
-        gc.collect()  # Force garbage collection before loading
+        """
+        Ensure model and knowledge base are initialized.
         
+        Both are shared, resident resources: whether they stay loaded between
+        requests is decided by the model residency policy.
+        """
         if self.model is None:
-            print(f"Loading sentence transformer model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            print(f"After loading model: {log_memory()}")
+            self.model = embedding_model(self.model_name)
             
         if self.materials_kb is None:
-            print("Initializing materials knowledge base...")
-            self.materials_kb = StudyMaterialKnowledgeBase()
-            self.materials_kb.build_index()
-            print(f"After initializing KB: {log_memory()}")
-            
-        gc.collect()  # Clean up any temporary objects
-        print(f"Final memory state: {log_memory()}")
+            self.materials_kb = get_resident_models().get(
+                f"materials_kb:{self.model_name}",
+                self._load_materials_kb,
+                depends_on=(f"model:{self.model_name}",)
+            )
+            logger.memory("materials_kb.ready", model=self.model_name)
+        
+    def _load_materials_kb(self) -> StudyMaterialKnowledgeBase:
+        """Build the materials knowledge base index."""
+        materials_kb = StudyMaterialKnowledgeBase(self.model_name)
+        materials_kb.build_index()
+        return materials_kb
     
     def _validate_path_inputs(self, personalized_methods: List[Dict], user_info: Dict) -> None:
         """
@@ -73,6 +76,7 @@ class LearningPathGenerator:
         if missing_fields:
             raise ValueError(f"User profile missing required fields: {', '.join(missing_fields)}")
 
+    @timed("path")
     def generate_path(self, personalized_methods: List[Dict], user_info: Dict) -> Dict:
         """
         Generate a learning path based on personalized study methods.
@@ -88,7 +92,6 @@ class LearningPathGenerator:
             ValueError: If inputs are invalid
             RuntimeError: If path generation fails
         """
-        import gc
         try:
             # Validate inputs
             self._validate_path_inputs(personalized_methods, user_info)
@@ -119,15 +122,6 @@ class LearningPathGenerator:
             return path
         except Exception as e:
             raise RuntimeError(f"Failed to generate learning path: {str(e)}")
-        finally:
-            # Clean up resources after path generation
-            if hasattr(self, 'model'):
-                del self.model
-                self.model = None
-            if hasattr(self, 'materials_kb'):
-                del self.materials_kb
-                self.materials_kb = None
-            gc.collect()
     
     def _generate_path_title(self, user_info: Dict) -> str:
         """Generate a descriptive title for the learning path."""
@@ -232,6 +226,7 @@ class LearningPathGenerator:
             prerequisites.update(method.get("prerequisites", []))
         return list(prerequisites)
     
+    @timed("materials")
     def get_stage_materials(self, path: Dict) -> Dict[str, List[Dict]]:
         """
         Get study materials organized by stage for the learning path.
@@ -240,6 +235,11 @@ class LearningPathGenerator:
         Returns:
             Dict mapping stage IDs to lists of recommended materials
         """
+        self._ensure_initialized()
+        if self.materials_kb is None:
+            logger.warning("materials_kb.unavailable")
+            return {}
+            
         materials = []
         seen_materials = set()  # Track seen material IDs
         difficulty_levels = {'入门': 0, '中等': 1, '高级': 2}
@@ -278,40 +278,20 @@ class LearningPathGenerator:
             # Add time filter using the longest activity duration
             max_minutes = 0
             for activity in stage["activities"]:
-                if "每天" in activity["duration"]:
-                    time_str = activity["duration"].replace("每天", "")
-                    # Handle time ranges (e.g., "1-2小时")
-                    if "-" in time_str:
-                        max_time = time_str.split("-")[1]
-                    else:
-                        max_time = time_str
-                        
-                    if "小时" in max_time:
-                        # Remove any non-numeric characters except decimal point
-                        hours = float(''.join(c for c in max_time.replace("小时", "") if c.isdigit() or c == '.'))
-                        minutes = int(hours * 60)
-                    elif "分钟" in max_time:
-                        # Remove any non-numeric characters
-                        minutes = int(''.join(c for c in max_time.replace("分钟", "") if c.isdigit()))
-                    max_minutes = max(max_minutes, minutes)
+                duration = parse_duration(activity["duration"])
+                if duration is not None and "每天" in duration.prefix:
+                    max_minutes = max(max_minutes, duration.max_minutes)
             
             if max_minutes > 0:
                 filters["max_time"] = max_minutes
             
             # Search for materials with relaxed filters first
-            print(f"\nSearching materials for stage: {stage['title']}")
-            self._ensure_initialized()
-            if self.materials_kb is None:
-                print("Warning: Materials knowledge base is not initialized!")
-                return {}
-            
-            print(f"Searching with query: {stage_query[:100]}...")
             stage_materials = self.materials_kb.search(
                 query=stage_query,
                 filters={"subject": path["subject"]},  # Start with just subject filter
                 k=10  # Get more candidates
             )
-            print(f"Found {len(stage_materials)} initial materials")
+            logger.debug("stage.search", stage=stage["title"], query=stage_query[:100], found=len(stage_materials))
             
             # Apply difficulty and time filters manually for better control
             filtered_materials = []
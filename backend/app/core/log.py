@@ -0,0 +1,184 @@
+"""
+Structured, sampled logging.
+
+Log records are one JSON object per line: timestamp, level, logger, event
+name and the event's fields. Request threads only put records on a queue;
+a QueueListener thread formats and writes them, so a slow stdout never
+blocks a request. Frequent events can be sampled, either per call or with
+LOG_SAMPLE_RATES, and memory snapshots are only taken at debug level or by
+the periodic reporter.
+"""
+from typing import Any, Dict, Optional
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from app.core.config import LOG_LEVEL, LOG_SAMPLE_RATES, LOG_MEMORY_INTERVAL
+
+ROOT_LOGGER = "app"
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_memory_reporter: Optional[threading.Thread] = None
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse "event=rate,event=rate" into a mapping.
+
+    Args:
+        spec: Comma separated event names and sampling rates between 0 and 1
+
+    Returns:
+        Sampling rate by event name
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+_SAMPLE_RATES = parse_sample_rates(LOG_SAMPLE_RATES)
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": getattr(record, "event", record.getMessage()),
+            **getattr(record, "fields", {})
+        }
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are; formatting is left to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            # Tracebacks cannot cross the queue, so render them here
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Route the application loggers through a non-blocking queue handler.
+
+    Called by main.py at startup, so importing a module that logs starts
+    no thread. Safe to call more than once; only the first call has an effect.
+
+    Args:
+        level: Minimum level name, e.g. "INFO" or "DEBUG"
+    """
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level.upper())
+        root.addHandler(_QueueHandler(records))
+        root.propagate = False
+        _configured = True
+
+class EventLogger:
+    def __init__(self, name: str):
+        """
+        Logger that emits named events with structured fields.
+
+        Args:
+            name: Logger name, usually the module's __name__
+        """
+        self._logger = logging.getLogger(name if name.startswith(ROOT_LOGGER) else f"{ROOT_LOGGER}.{name}")
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, event: str, sample: Optional[float] = None, **fields: Any) -> None:
+        self.log(logging.DEBUG, event, sample, **fields)
+
+    def info(self, event: str, sample: Optional[float] = None, **fields: Any) -> None:
+        self.log(logging.INFO, event, sample, **fields)
+
+    def warning(self, event: str, sample: Optional[float] = None, **fields: Any) -> None:
+        self.log(logging.WARNING, event, sample, **fields)
+
+    def error(self, event: str, sample: Optional[float] = None, exc_info: bool = False, **fields: Any) -> None:
+        self.log(logging.ERROR, event, sample, exc_info=exc_info, **fields)
+
+    def log(
+        self,
+        level: int,
+        event: str,
+        sample: Optional[float] = None,
+        exc_info: bool = False,
+        **fields: Any
+    ) -> None:
+        """
+        Emit an event if its level is enabled and it is sampled in.
+
+        Args:
+            level: Logging level
+            event: Event name, e.g. "materials.search.unfiltered"
+            sample: Fraction of calls to keep; LOG_SAMPLE_RATES overrides it
+            exc_info: Attach the current exception's traceback
+            **fields: Structured fields of the event
+        """
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = _SAMPLE_RATES.get(event, 1.0 if sample is None else sample)
+        if rate < 1.0:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+        self._logger.log(level, event, exc_info=exc_info, extra={"event": event, "fields": fields})
+
+    def memory(self, event: str, **fields: Any) -> None:
+        """Log a memory snapshot, only when debug logging is enabled."""
+        if self._logger.isEnabledFor(logging.DEBUG):
+            from app.core.memory_governor import get_memory_governor
+            self.debug(event, rss_mb=round(get_memory_governor().rss_mb(fresh=True), 1), **fields)
+
+def get_logger(name: str) -> EventLogger:
+    """Return an event logger for a module."""
+    return EventLogger(name)
+
+def start_memory_reporter(interval: float = LOG_MEMORY_INTERVAL) -> None:
+    """
+    Log the memory governor's stats every interval seconds on a daemon thread.
+
+    Args:
+        interval: Seconds between reports; 0 disables the reporter
+    """
+    global _memory_reporter
+    if interval <= 0 or _memory_reporter is not None:
+        return
+    logger = get_logger("memory")
+
+    def report():
+        from app.core.memory_governor import get_memory_governor
+        while True:
+            time.sleep(interval)
+            logger.info("memory.report", **get_memory_governor().stats())
+
+    _memory_reporter = threading.Thread(target=report, name="memory-reporter", daemon=True)
+    _memory_reporter.start()
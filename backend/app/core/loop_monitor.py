@@ -0,0 +1,143 @@
+"""
+Event loop lag monitor.
+
+Blocking work inside async handlers stalls every request on the loop. A
+task on the loop sleeps a fixed interval at a time and records how late it
+wakes up in the event_loop_lag_ms histogram; a watchdog thread watches its
+heartbeat and, once the loop is LOOP_LAG_THRESHOLD_MS overdue, captures the
+loop thread's stack while it is still inside the blocking call. Stalls are
+counted, logged and kept with their stacks for /api/v1/loop.
+"""
+from typing import Any, Deque, Dict, Optional, Tuple
+from collections import deque
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from app.core.config import LOOP_MONITOR_INTERVAL, LOOP_LAG_THRESHOLD_MS, LOOP_STALLS_KEPT
+from app.core.log import get_logger
+from app.core.metrics import metrics_registry
+
+logger = get_logger(__name__)
+
+LAG_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MAX_STACK_FRAMES = 40
+
+loop_lag = metrics_registry.histogram(
+    "event_loop_lag_ms", "Delay of the lag monitor's wake-ups past their schedule in milliseconds", (), LAG_BUCKETS_MS
+)
+loop_stalls = metrics_registry.counter(
+    "event_loop_stalls_total", "Event loop stalls longer than LOOP_LAG_THRESHOLD_MS"
+)
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval: float = LOOP_MONITOR_INTERVAL,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+        max_stalls: int = LOOP_STALLS_KEPT
+    ):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between lag measurements; 0 disables the monitor
+            threshold_ms: Lag past which the loop counts as stalled
+            max_stalls: Most recent stalls kept with their stacks
+
+        Raises:
+            ValueError: If threshold_ms is not positive
+        """
+        if threshold_ms <= 0:
+            raise ValueError(f"threshold_ms must be positive, got {threshold_ms}")
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self._loop_thread: Optional[int] = None
+        self._heartbeat = 0.0
+        self._stall: Optional[Tuple[float, Dict[str, Any]]] = None  # (heartbeat it followed, record)
+        self._reported_beat = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from a coroutine on it."""
+        if self.running or self.interval <= 0:
+            return
+        if self._watchdog is not None:
+            self._watchdog.join(self.threshold)  # A stopped watchdog exits as soon as it wakes
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()  # Its own event, so a late old watchdog still sees its stop
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stopped,), name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Stop the measuring task and the watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Settings, lag histogram and recent stalls, newest first."""
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag": loop_lag.snapshot(),
+            "stalls": list(reversed(self.stalls))
+        }
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            previous, self._heartbeat = self._heartbeat, time.monotonic()
+            loop_lag.observe(lag * 1000)
+            stall, self._stall = self._stall, None
+            if stall is not None and stall[0] == previous:
+                stall[1]["lag_ms"] = round(lag * 1000, 1)  # The stall's full length, known now it is over
+
+    def _watch(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.threshold / 2):
+            beat = self._heartbeat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue < self.threshold or beat == self._reported_beat:
+                continue  # On time, or this stall is already recorded
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)[-MAX_STACK_FRAMES:]
+            stall = {
+                "at": time.time(),
+                "lag_ms": round(overdue * 1000, 1),  # So far; updated when the loop runs again
+                "stack": [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack]
+            }
+            if self._heartbeat != beat:
+                continue  # The loop caught up while the stack was being read
+            self._reported_beat = beat
+            self._stall = (beat, stall)
+            self.stalls.append(stall)
+            loop_stalls.inc()
+            logger.warning("event_loop.stall", lag_ms=stall["lag_ms"], frame=stall["stack"][-1] if stall["stack"] else None)
+
+_loop_monitor: Optional[LoopMonitor] = None
+_loop_monitor_lock = threading.Lock()
+
+def get_loop_monitor() -> LoopMonitor:
+    """Return the process-wide event loop monitor."""
+    global _loop_monitor
+    with _loop_monitor_lock:
+        if _loop_monitor is None:
+            _loop_monitor = LoopMonitor()
+        return _loop_monitor
@@ -6,9 +6,19 @@ import json
 from pathlib import Path
 import numpy as np
 import torch
-from sentence_transformers import SentenceTransformer
 import faiss
 from app.core.config import EMBEDDING_MODEL, BATCH_SIZE
+from app.core.model_residency import embedding_model
+from app.core.log import get_logger
+from app.core.metrics import SIZE_BUCKETS, metrics_registry
+from app.core.timing import span
+from app.core.durations import duration_minutes, material_minutes
+
+logger = get_logger(__name__)
+
+encode_batch_size = metrics_registry.histogram(
+    "encode_batch_size", "Texts per embedding encode call", ("index",), SIZE_BUCKETS
+)
 
 class StudyMaterialKnowledgeBase:
     def __init__(self, model_name: Optional[str] = None):
@@ -21,23 +31,9 @@ class StudyMaterialKnowledgeBase:
         
     def _ensure_initialized(self):
         """Ensure model is initialized."""
-        import psutil
-        import gc
-        
-        def log_memory():
-            mem = psutil.Process().memory_info()
-            return f"Memory usage: RSS={mem.rss/1024/1024:.1f}MB, VMS={mem.vms/1024/1024:.1f}MB"
-            
-        print(f"Before model initialization: {log_memory()}")
-        gc.collect()  # Force garbage collection before loading
-        
         if self.model is None:
-            print(f"Loading sentence transformer model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            print(f"After model loading: {log_memory()}")
-            
-        gc.collect()  # Clean up any temporary objects
-        print(f"Final memory state: {log_memory()}")
+            self.model = embedding_model(self.model_name)
+            logger.memory("model.ready", model=self.model_name)
         
     def _create_material_text(self, material: Dict) -> str:
         """Create a searchable text representation of a study material."""
@@ -62,11 +58,13 @@ class StudyMaterialKnowledgeBase:
     def build_index(self, materials_file: str = "data/study_materials/sample_materials.json"):
         """Build the FAISS index from study materials."""
         self._ensure_initialized()
-        print("Building materials knowledge base index...")
+        logger.info("index.build", index="materials", source=materials_file)
         # Load study materials
         with open(materials_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
             self.materials = data['materials']  # Access the materials array
+        for material in self.materials:
+            self._index_duration(material)
         
         # Create text representations
         texts = [self._create_material_text(material) for material in self.materials]
@@ -79,11 +77,13 @@ class StudyMaterialKnowledgeBase:
             batch = texts[i:i + batch_size]
             with torch.no_grad():
                 self._ensure_initialized()  # Ensure model is initialized before each batch
-                embeddings = self.model.encode(
-                    batch,
-                    convert_to_tensor=True,
-                    show_progress_bar=False
-                )
+                encode_batch_size.observe(len(batch), "materials")
+                with span("encode"):
+                    embeddings = self.model.encode(
+                        batch,
+                        convert_to_tensor=True,
+                        show_progress_bar=False
+                    )
                 embeddings_list.append(embeddings.cpu().numpy())
         
         embeddings_np = np.vstack(embeddings_list)
@@ -115,10 +115,13 @@ class StudyMaterialKnowledgeBase:
             raise ValueError("Knowledge base index not built. Call build_index() first.")
         
         # Generate query embedding
-        query_embedding = self.model.encode([query])
+        encode_batch_size.observe(1, "materials")
+        with span("encode"):
+            query_embedding = self.model.encode([query])
         
         # Search index
-        distances, indices = self.index.search(query_embedding, k * 3)  # Get more results for filtering
+        with span("search"):
+            distances, indices = self.index.search(query_embedding, k * 3)  # Get more results for filtering
         
         # Apply filters and return matched materials
         results = []
@@ -142,7 +145,7 @@ class StudyMaterialKnowledgeBase:
         
         # If no results found after filtering, try without filters
         if not results and filters:
-            print(f"\nNo results found with filters {filters}. Showing unfiltered results:")
+            logger.info("materials.search.unfiltered", sample=0.1, filters=filters)
             return self.search(query, filters=None, k=k)
         
         return results[:k]
@@ -179,27 +182,16 @@ class StudyMaterialKnowledgeBase:
                 pass
                 
             elif key == 'max_time':
-                material_time = self._parse_time_to_minutes(material.get('estimated_time', '0分钟'))
+                material_time = material_minutes(material)
                 # Allow slightly longer materials (up to 50% more)
                 if material_time > value * 1.5:
                     return False
                     
         return True
     
-    def _parse_time_to_minutes(self, time_str: str) -> int:
-        """Convert time string to minutes, handling ranges by taking the maximum."""
-        # Handle ranges (e.g., "1-2小时")
-        if '-' in time_str:
-            time_str = time_str.split('-')[1]  # Take the maximum time
-            
-        if '小时' in time_str:
-            # Extract numeric value, handling decimals
-            hours = float(''.join(c for c in time_str.replace('小时', '') if c.isdigit() or c == '.'))
-            return int(hours * 60)
-        elif '分钟' in time_str:
-            # Extract numeric value
-            return int(''.join(c for c in time_str.replace('分钟', '') if c.isdigit()))
-        return 0
+    def _index_duration(self, material: Dict) -> None:
+        """Store the material's estimated time as minutes, so filters compare integers."""
+        material['estimated_minutes'] = duration_minutes(material.get('estimated_time', ''))
     
     def add_material(self, material: Dict) -> bool:
         """Add a new study material to the knowledge base."""
@@ -207,6 +199,8 @@ class StudyMaterialKnowledgeBase:
         if not self.index:
             raise ValueError("Knowledge base index not built. Call build_index() first.")
         
+        self._index_duration(material)
+        
         # Generate embedding for new material
         text = self._create_material_text(material)
         embedding = self.model.encode([text])
@@ -242,6 +236,9 @@ class StudyMaterialKnowledgeBase:
         # Load materials
         with open(load_dir / "materials.json", 'r', encoding='utf-8') as f:
             kb.materials = json.load(f)
+        for material in kb.materials:
+            if 'estimated_minutes' not in material:
+                kb._index_duration(material)
         kb.material_map = {i: material for i, material in enumerate(kb.materials)}
         
         # Load FAISS index
@@ -0,0 +1,267 @@
+"""
+Memory diagnostics: tracemalloc snapshots and sizes of resident structures.
+
+tracemalloc is off unless started through the admin endpoint, since tracing
+slows allocation down and costs memory of its own. While it runs, snapshots
+can be taken, listed by allocation site and compared with each other, which
+attributes growth between two points in time to source lines.
+
+resident_sizes() measures what the process keeps loaded on purpose: model
+parameters and buffers, FAISS index bytes, knowledge base metadata and the
+in-process caches, independently of tracemalloc.
+"""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from datetime import datetime
+import sys
+import threading
+import tracemalloc
+from app.core.config import MEMORY_TRACE_FRAMES, MEMORY_TRACE_SNAPSHOTS
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+)
+
+def _mb(size: float) -> float:
+    return round(size / 1024 / 1024, 3)
+
+def _stat_row(stat: Any, key_type: str) -> Dict:
+    """One allocation site of a snapshot statistic or statistic diff."""
+    frames = stat.traceback.format() if key_type == "traceback" else [str(stat.traceback[0])]
+    row = {"site": frames if key_type == "traceback" else frames[0], "size_mb": _mb(stat.size), "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        row["size_diff_mb"] = _mb(stat.size_diff)
+        row["count_diff"] = stat.count_diff
+    return row
+
+class MemoryTracer:
+    def __init__(self, max_snapshots: int = MEMORY_TRACE_SNAPSHOTS):
+        """
+        Initialize the tracer.
+
+        Args:
+            max_snapshots: Snapshots kept for diffs; the oldest is dropped first
+        """
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._taken_at: Dict[str, str] = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = MEMORY_TRACE_FRAMES) -> Dict:
+        """
+        Start tracing allocations, if not tracing already.
+
+        Args:
+            frames: Stack frames recorded per allocation; more frames give
+                fuller tracebacks at a higher cost
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, frames))
+        return self.status()
+
+    def stop(self) -> Dict:
+        """Stop tracing; snapshots already taken stay available."""
+        tracemalloc.stop()
+        return self.status()
+
+    def status(self) -> Dict:
+        """Whether tracing is on, traced memory and the stored snapshots."""
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [{"id": key, "taken_at": self._taken_at[key]} for key in self._snapshots]
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "traced_mb": _mb(current),
+            "traced_peak_mb": _mb(peak),
+            "overhead_mb": _mb(tracemalloc.get_tracemalloc_memory()),
+            "snapshots": snapshots
+        }
+
+    def take_snapshot(self) -> str:
+        """
+        Take and store a snapshot.
+
+        Returns:
+            Id of the snapshot
+
+        Raises:
+            RuntimeError: If tracemalloc is not tracing
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        with self._lock:
+            self._counter += 1
+            snapshot_id = f"s{self._counter}"
+            self._snapshots[snapshot_id] = snapshot
+            self._taken_at[snapshot_id] = datetime.now().isoformat()
+            while len(self._snapshots) > self.max_snapshots:
+                dropped, _ = self._snapshots.popitem(last=False)
+                del self._taken_at[dropped]
+        return snapshot_id
+
+    def top(self, snapshot_id: Optional[str] = None, key_type: str = "lineno", limit: int = 20) -> Dict:
+        """
+        Largest allocation sites of a snapshot.
+
+        Args:
+            snapshot_id: Stored snapshot; a new one is taken when omitted
+            key_type: Group by "lineno", "filename" or "traceback"
+            limit: Number of sites returned
+
+        Raises:
+            KeyError: If the snapshot is unknown
+            RuntimeError: If a new snapshot is needed and tracemalloc is not tracing
+        """
+        snapshot_id = snapshot_id or self.take_snapshot()
+        stats = self._get(snapshot_id).statistics(key_type)
+        return {
+            "snapshot": snapshot_id,
+            "total_mb": _mb(sum(stat.size for stat in stats)),
+            "top": [_stat_row(stat, key_type) for stat in stats[:limit]]
+        }
+
+    def diff(self, base_id: str, target_id: Optional[str] = None, key_type: str = "lineno", limit: int = 20) -> Dict:
+        """
+        Allocation sites that grew or shrank most between two snapshots.
+
+        Args:
+            base_id: Earlier snapshot
+            target_id: Later snapshot; a new one is taken when omitted
+            key_type: Group by "lineno", "filename" or "traceback"
+            limit: Number of sites returned
+
+        Raises:
+            KeyError: If a snapshot is unknown
+            RuntimeError: If a new snapshot is needed and tracemalloc is not tracing
+        """
+        base = self._get(base_id)
+        target_id = target_id or self.take_snapshot()
+        stats = self._get(target_id).compare_to(base, key_type)
+        return {
+            "base": base_id,
+            "target": target_id,
+            "size_diff_mb": _mb(sum(stat.size_diff for stat in stats)),
+            "top": [_stat_row(stat, key_type) for stat in stats[:limit]]
+        }
+
+    def _get(self, snapshot_id: str) -> tracemalloc.Snapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is None:
+            raise KeyError(snapshot_id)
+        return snapshot
+
+_memory_tracer: Optional[MemoryTracer] = None
+_memory_tracer_lock = threading.Lock()
+
+def get_memory_tracer() -> MemoryTracer:
+    """Return the process-wide memory tracer."""
+    global _memory_tracer
+    with _memory_tracer_lock:
+        if _memory_tracer is None:
+            _memory_tracer = MemoryTracer()
+        return _memory_tracer
+
+def deep_sizeof(value: Any, seen: Optional[set] = None) -> int:
+    """
+    Approximate size in bytes of a Python object graph.
+
+    Follows dicts, lists, tuples and sets; objects already in seen are not
+    counted again, so structures sharing records (methods and method_map)
+    are not counted twice when measured with one seen set.
+
+    Args:
+        value: Root object
+        seen: Ids of objects already counted
+    """
+    seen = set() if seen is None else seen
+    size, stack = 0, [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return size
+
+def _module_bytes(module: Any) -> Dict[str, int]:
+    """Parameter and buffer bytes of a torch module."""
+    return {
+        "parameters": sum(p.numel() * p.element_size() for p in module.parameters()),
+        "buffers": sum(b.numel() * b.element_size() for b in module.buffers())
+    }
+
+def _index_bytes(index: Any) -> int:
+    """Vector bytes held by a FAISS index."""
+    code_size = getattr(index, "code_size", None) or index.d * 4  # Flat indexes store float32 vectors
+    return int(index.ntotal) * int(code_size)
+
+def measure(value: Any) -> Dict[str, int]:
+    """
+    Bytes held by a resident model or knowledge base, by part.
+
+    Embedding models shared through the registry are measured under their
+    own key and skipped when found inside a knowledge base.
+    """
+    if hasattr(value, "parameters") and hasattr(value, "buffers"):
+        return _module_bytes(value)
+    parts: Dict[str, int] = {}
+    seen: set = set()
+    for name, attribute in vars(value).items():
+        if attribute is None or hasattr(attribute, "parameters"):
+            continue
+        if hasattr(attribute, "ntotal") and hasattr(attribute, "d"):
+            parts[name] = _index_bytes(attribute)
+        elif hasattr(attribute, "nbytes"):
+            parts[name] = int(attribute.nbytes)
+        elif isinstance(attribute, (dict, list, tuple, set)):
+            parts[name] = deep_sizeof(attribute, seen)
+    return parts
+
+def resident_sizes() -> Dict:
+    """
+    Sizes of the resident models, indexes and caches.
+
+    Returns:
+        Bytes by part for each resident registry entry, and entry counts and
+        approximate bytes of the in-process caches
+    """
+    from app.core.durations import parse_duration
+    from app.core.job_queue import get_job_queue
+    from app.core.model_residency import get_resident_models
+    from app.core.profiling import get_profiler
+
+    resident = {}
+    for key, value in get_resident_models().resident_values().items():
+        parts = measure(value)
+        resident[key] = {"type": type(value).__name__, "bytes": parts, "total_mb": _mb(sum(parts.values()))}
+
+    jobs = get_job_queue().results()
+    profiles = [get_profiler().get(profile["id"]) for profile in get_profiler().list()]
+    duration_cache = parse_duration.cache_info()
+    return {
+        "resident": resident,
+        "resident_total_mb": round(sum(entry["total_mb"] for entry in resident.values()), 3),
+        "caches": {
+            "duration_parse": {"entries": duration_cache.currsize, "max_entries": duration_cache.maxsize},
+            "job_results": {"entries": len(jobs), "mb": _mb(deep_sizeof(jobs))},
+            "profiles": {
+                "entries": len(profiles),
+                "mb": _mb(deep_sizeof([profile.stacks for profile in profiles if profile is not None]))
+            }
+        }
+    }
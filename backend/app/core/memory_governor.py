@@ -0,0 +1,207 @@
+"""
+Process memory governor.
+
+The one place that decides when to spend time reclaiming memory. RSS is
+sampled cheaply (a /proc read, reused for MEMORY_SAMPLE_INTERVAL seconds)
+and compared with the configured budget:
+
+- under MEMORY_GC_THRESHOLD of the budget: nothing is done
+- above it: a full gc.collect(), at most once per MEMORY_GC_MIN_INTERVAL
+- above the budget: registered evictors (resident models and indexes)
+  release memory until RSS is back under budget; once an eviction does not
+  lower RSS, nothing more is evicted until RSS grows past that level
+
+Callers run check() at request and job boundaries instead of calling
+gc.collect() themselves; every decision is counted and exposed by stats().
+"""
+from typing import Callable, Dict, Optional
+import gc
+import os
+import threading
+import time
+from app.core.metrics import metrics_registry
+from app.core.config import (
+    MEMORY_BUDGET_MB, MEMORY_SAMPLE_INTERVAL, MEMORY_GC_THRESHOLD, MEMORY_GC_MIN_INTERVAL
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+OK = "ok"
+COLLECT = "collect"
+EVICT = "evict"
+
+def read_rss_mb() -> float:
+    """Current resident set size in MB, from /proc when available."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 / 1024
+    except (OSError, IndexError, ValueError):
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+
+class MemoryGovernor:
+    def __init__(
+        self,
+        budget_mb: float = MEMORY_BUDGET_MB,
+        sample_interval: float = MEMORY_SAMPLE_INTERVAL,
+        gc_threshold: float = MEMORY_GC_THRESHOLD,
+        gc_min_interval: float = MEMORY_GC_MIN_INTERVAL
+    ):
+        """
+        Initialize the memory governor.
+
+        Args:
+            budget_mb: RSS above which evictors are asked to free memory
+            sample_interval: Seconds an RSS sample is reused before reading again
+            gc_threshold: Fraction of the budget above which a collection runs
+            gc_min_interval: Minimum seconds between threshold collections
+        """
+        self.budget_mb = budget_mb
+        self.sample_interval = sample_interval
+        self.gc_threshold = gc_threshold
+        self.gc_min_interval = gc_min_interval
+        self._evictors: Dict[str, Callable[[], bool]] = {}
+        self._lock = threading.Lock()
+        self._sampled_at = 0.0
+        self._rss_mb = 0.0
+        self._collected_at = float("-inf")
+        self._counters = {
+            "checks": 0,
+            "collections": 0,
+            "evictions": 0,
+            "evict_failures": 0,  # Over budget with nothing left to evict
+            "evict_no_gain": 0,  # Evictions that did not lower RSS
+            "samples": 0
+        }
+        self._peak_rss_mb = 0.0
+        self._no_gain_rss_mb = 0.0  # RSS when an eviction last freed nothing; 0 once under budget
+        self._last_decision = OK
+
+    def register_evictor(self, name: str, evictor: Callable[[], bool]) -> None:
+        """
+        Register a callback that releases one unit of memory.
+
+        Args:
+            name: Label of the evictor
+            evictor: Frees something, e.g. the least recently used model, and
+                returns False once there is nothing left to free
+        """
+        with self._lock:
+            self._evictors[name] = evictor
+
+    def rss_mb(self, fresh: bool = False) -> float:
+        """
+        Resident set size in MB, reusing the last sample within sample_interval.
+
+        Args:
+            fresh: Read the current value even if the last sample is recent
+        """
+        now = time.monotonic()
+        if fresh or now - self._sampled_at >= self.sample_interval:
+            self._rss_mb = read_rss_mb()
+            self._sampled_at = now
+            self._counters["samples"] += 1
+            self._peak_rss_mb = max(self._peak_rss_mb, self._rss_mb)
+            if self._rss_mb <= self.budget_mb:
+                self._no_gain_rss_mb = 0.0
+        return self._rss_mb
+
+    def over_budget(self, fresh: bool = False) -> bool:
+        return self.rss_mb(fresh) > self.budget_mb
+
+    def check(self) -> str:
+        """
+        Compare RSS with the thresholds and reclaim memory only if one is crossed.
+
+        Cheap when under the thresholds: at most one /proc read per
+        sample_interval.
+
+        Returns:
+            The decision taken: "ok", "collect" or "evict"
+        """
+        self._counters["checks"] += 1
+        rss = self.rss_mb()
+        if rss > self.budget_mb:
+            decision = EVICT if self.enforce() else self._collect()
+        elif rss > self.budget_mb * self.gc_threshold:
+            decision = self._collect()
+        else:
+            decision = OK
+        self._last_decision = decision
+        return decision
+
+    def enforce(self) -> int:
+        """
+        Evict until RSS is under budget or no evictor can free anything more.
+
+        Stops as well once an eviction does not lower RSS: the rest of the
+        process is over budget on its own (or the allocator keeps the freed
+        pages), and unloading more would only cost reloads. Later calls
+        evict again only when RSS has grown past that level, or after it
+        was back under budget.
+
+        Returns:
+            Number of evictions made
+        """
+        evicted = 0
+        with self._lock:
+            evictors = list(self._evictors.values())
+        while self.rss_mb(fresh=True) > max(self.budget_mb, self._no_gain_rss_mb):
+            before = self._rss_mb
+            if not any(evictor() for evictor in evictors):
+                self._counters["evict_failures"] += 1
+                break
+            evicted += 1
+            self._counters["evictions"] += 1
+            self._collect(force=True)  # Reclaim the evicted objects before measuring again
+            if self._rss_mb >= before:
+                self._no_gain_rss_mb = self._rss_mb
+                self._counters["evict_no_gain"] += 1
+                break
+        return evicted
+
+    def stats(self) -> Dict:
+        """Current and peak RSS, thresholds and decision counters."""
+        return {
+            "rss_mb": round(self.rss_mb(), 1),
+            "peak_rss_mb": round(self._peak_rss_mb, 1),
+            "budget_mb": self.budget_mb,
+            "no_gain_rss_mb": round(self._no_gain_rss_mb, 1),
+            "gc_threshold_mb": round(self.budget_mb * self.gc_threshold, 1),
+            "last_decision": self._last_decision,
+            **self._counters
+        }
+
+    def _collect(self, force: bool = False) -> str:
+        """Run a full collection unless one ran within gc_min_interval."""
+        now = time.monotonic()
+        if not force and now - self._collected_at < self.gc_min_interval:
+            return OK
+        gc.collect()
+        self._collected_at = now
+        self._counters["collections"] += 1
+        self.rss_mb(fresh=True)
+        return COLLECT
+
+_memory_governor: Optional[MemoryGovernor] = None
+_memory_governor_lock = threading.Lock()
+
+def get_memory_governor() -> MemoryGovernor:
+    """Return the process-wide memory governor."""
+    global _memory_governor
+    with _memory_governor_lock:
+        if _memory_governor is None:
+            _memory_governor = MemoryGovernor()
+        return _memory_governor
+
+metrics_registry.gauge(
+    "process_resident_memory_bytes", "Resident set size of the process", (),
+    lambda: [((), read_rss_mb() * 1024 * 1024)]
+)
+metrics_registry.counter_callback(
+    "memory_governor_actions_total", "Threshold collections and evictions run by the memory governor", ("action",),
+    lambda: [
+        ((action,), get_memory_governor().stats()[action])
+        for action in ("collections", "evictions", "evict_failures", "evict_no_gain")
+    ]
+)
@@ -0,0 +1,264 @@
+"""
+Process-wide residency of embedding models and knowledge base indexes.
+
+Generators are created per request, but the models and indexes they use are
+loaded once here and shared. Whether they stay loaded is decided by the
+configured policy rather than by each caller:
+
+- keep: never unloaded
+- idle: unloaded after MODEL_IDLE_TIMEOUT seconds without use
+- budget: least recently used first, when the memory governor reports RSS
+  above MEMORY_BUDGET_MB; a resource being returned by get(), and what it
+  depends on, is never the one unloaded
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import threading
+import time
+from app.core.config import MODEL_RESIDENCY, MODEL_IDLE_TIMEOUT
+from app.core.memory_governor import MemoryGovernor, get_memory_governor
+from app.core.metrics import metrics_registry, register_cache
+from app.core.timing import span
+
+KEEP = "keep"
+IDLE = "idle"
+BUDGET = "budget"
+POLICIES = (KEEP, IDLE, BUDGET)
+
+class _Entry:
+    """A loaded resource and its bookkeeping."""
+
+    __slots__ = ("value", "last_used", "depends_on")
+
+    def __init__(self, value: Any, depends_on: Sequence[str]):
+        self.value = value
+        self.last_used = time.monotonic()
+        self.depends_on = tuple(depends_on)
+
+class ResidentModels:
+    def __init__(
+        self,
+        policy: str = MODEL_RESIDENCY,
+        idle_timeout: float = MODEL_IDLE_TIMEOUT,
+        governor: Optional[MemoryGovernor] = None
+    ):
+        """
+        Initialize the registry.
+
+        Args:
+            policy: One of "keep", "idle" or "budget"
+            idle_timeout: Seconds without use before an entry is unloaded
+                under the idle policy
+            governor: Memory governor consulted under the budget policy
+
+        Raises:
+            ValueError: If the policy is unknown
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Model residency policy must be one of: {', '.join(POLICIES)}")
+        self.policy = policy
+        self.idle_timeout = idle_timeout
+        self.governor = governor or get_memory_governor()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._in_use: Dict[str, int] = {}  # Keys get() is returning, by number of callers
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self.governor.register_evictor("resident_models", self.evict_least_recent)
+
+    def get(self, key: str, loader: Callable[[], Any], depends_on: Sequence[str] = ()) -> Any:
+        """
+        Return a resident resource, loading it on first use.
+
+        Concurrent callers asking for the same key wait for a single load.
+
+        Args:
+            key: Name of the resource
+            loader: Builds the resource when it is not loaded
+            depends_on: Keys of resources this one holds references to; it is
+                unloaded together with any of them so their memory is freed
+
+        Returns:
+            The loaded resource
+        """
+        entry = self._touch(key)
+        if entry is not None:
+            self.hits += 1
+            return entry.value
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            entry = self._touch(key)
+            if entry is not None:
+                return entry.value
+            with span("model_load"):
+                value = loader()
+            with self._lock:
+                self._entries[key] = _Entry(value, depends_on)
+                self.loads += 1
+
+        if self.policy == BUDGET:
+            protected = self._protect(key)
+            try:
+                self.governor.enforce()
+            finally:
+                self._release(protected)
+        elif self.policy == IDLE:
+            self._start_sweeper()
+        return value
+
+    def evict(self, key: str) -> bool:
+        """
+        Unload a resource and every resource that depends on it.
+
+        Callers still holding a reference keep it alive until they release it.
+
+        Returns:
+            Whether the resource was loaded
+        """
+        with self._lock:
+            return self._evict_locked(key)
+
+    def evict_least_recent(self) -> bool:
+        """Unload the least recently used resource not in use; False if there is none."""
+        if self.policy != BUDGET:
+            return False
+        with self._lock:
+            candidates = [key for key in self._entries if key not in self._in_use]
+            if not candidates:
+                return False
+            key = min(candidates, key=lambda name: self._entries[name].last_used)
+            return self._evict_locked(key)
+
+    def evict_idle(self) -> List[str]:
+        """
+        Unload resources unused for longer than idle_timeout.
+
+        Returns:
+            Keys of the unloaded resources
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry.last_used <= deadline]
+            return [key for key in idle if self._evict_locked(key)]
+
+    def clear(self) -> None:
+        """Unload everything, whatever the policy."""
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Policy, loaded resources and load/eviction counts."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "resident": {
+                    key: {"idle_seconds": round(now - entry.last_used, 1)}
+                    for key, entry in self._entries.items()
+                },
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+    def resident_values(self) -> Dict[str, Any]:
+        """Loaded resources by key, without touching their last use."""
+        with self._lock:
+            return {key: entry.value for key, entry in self._entries.items()}
+
+    def _touch(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+            return entry
+
+    def _protect(self, key: str) -> List[str]:
+        """Mark a resource and everything it depends on as in use; returns the marked keys."""
+        with self._lock:
+            protected, pending = [], [key]
+            while pending:
+                name = pending.pop()
+                if name in protected:
+                    continue
+                protected.append(name)
+                entry = self._entries.get(name)
+                if entry is not None:
+                    pending.extend(entry.depends_on)
+            for name in protected:
+                self._in_use[name] = self._in_use.get(name, 0) + 1
+            return protected
+
+    def _release(self, protected: List[str]) -> None:
+        with self._lock:
+            for name in protected:
+                self._in_use[name] -= 1
+                if not self._in_use[name]:
+                    del self._in_use[name]
+
+    def _evict_locked(self, key: str) -> bool:
+        """Unload a resource and its dependents. Caller must hold the lock."""
+        if self._entries.pop(key, None) is None:
+            return False
+        self.evictions += 1
+        for dependent in [name for name, entry in self._entries.items() if key in entry.depends_on]:
+            self._evict_locked(dependent)
+        return True
+
+    def _start_sweeper(self) -> None:
+        """Start the background thread unloading idle resources, once."""
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep, name="model-residency", daemon=True)
+        self._sweeper.start()
+
+    def _sweep(self) -> None:
+        while True:
+            time.sleep(max(self.idle_timeout / 2, 1))
+            if self.policy == IDLE:
+                self.evict_idle()
+
+_resident_models: Optional[ResidentModels] = None
+_resident_models_lock = threading.Lock()
+
+def get_resident_models() -> ResidentModels:
+    """Return the process-wide model registry."""
+    global _resident_models
+    with _resident_models_lock:
+        if _resident_models is None:
+            _resident_models = ResidentModels()
+        return _resident_models
+
+# Read at scrape time without creating the registry
+register_cache("resident_models", lambda: (
+    (_resident_models.hits, _resident_models.loads) if _resident_models is not None else (0, 0)
+))
+metrics_registry.gauge(
+    "resident_models", "Models and indexes currently loaded", (),
+    lambda: [((), len(_resident_models._entries))] if _resident_models is not None else []
+)
+metrics_registry.counter_callback(
+    "resident_model_evictions_total", "Models and indexes unloaded", (),
+    lambda: [((), _resident_models.evictions)] if _resident_models is not None else []
+)
+
+def embedding_model(model_name: str) -> Any:
+    """
+    Return the shared SentenceTransformer for a model name.
+
+    Args:
+        model_name: Hugging Face model name
+
+    Returns:
+        The resident SentenceTransformer
+    """
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    return get_resident_models().get(f"model:{model_name}", load)
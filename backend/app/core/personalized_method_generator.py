@@ -4,9 +4,14 @@ AI model for generating personalized study methods based on user information.
 from typing import List, Dict, Optional
 from datetime import datetime
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from app.core.knowledge_base import StudyMethodKnowledgeBase
 from app.core.config import EMBEDDING_MODEL
+from app.core.model_residency import embedding_model, get_resident_models
+from app.core.log import get_logger
+from app.core.timing import timed
+from app.core.durations import STUDY_UNITS, parse_duration
+
+logger = get_logger(__name__)
 
 class PersonalizedMethodGenerator:
     def __init__(self, model_name: Optional[str] = None):
@@ -24,12 +29,21 @@ class PersonalizedMethodGenerator:
         """
         try:
             if self.model is None:
-                self.model = SentenceTransformer(self.model_name)
+                self.model = embedding_model(self.model_name)
             if self.knowledge_base is None:
-                self.knowledge_base = StudyMethodKnowledgeBase()
-                self.knowledge_base.build_index()
+                self.knowledge_base = get_resident_models().get(
+                    f"methods_kb:{self.model_name}",
+                    self._load_knowledge_base,
+                    depends_on=(f"model:{self.model_name}",)
+                )
         except Exception as e:
             raise RuntimeError(f"Failed to initialize components: {str(e)}")
+            
+    def _load_knowledge_base(self) -> StudyMethodKnowledgeBase:
+        """Build the study methods knowledge base index."""
+        knowledge_base = StudyMethodKnowledgeBase(self.model_name)
+        knowledge_base.build_index()
+        return knowledge_base
     
     def _create_user_profile_embedding(self, user_info: Dict) -> np.ndarray:
         """
@@ -92,6 +106,7 @@ class PersonalizedMethodGenerator:
         if not any(indicator in time_str for indicator in valid_time_indicators):
             raise ValueError("Invalid time format. Must include time indicators like '小时'/'分钟'/'每天'/'充足时间'/'周末'")
 
+    @timed("methods")
     def generate_personalized_methods(self, user_info: Dict, num_methods: int = 3) -> List[Dict]:
         """
         Generate personalized study methods based on user information.
@@ -130,7 +145,7 @@ class PersonalizedMethodGenerator:
             
             # Handle case when no methods are found
             if not base_methods:
-                print(f"No suitable methods found for profile: {profile_text}")
+                logger.info("methods.none_found", sample=0.1, profile=profile_text[:100])
                 return []
             
             # Personalize and combine methods
@@ -180,52 +195,17 @@ class PersonalizedMethodGenerator:
         return personalized
     
     def _adjust_time_commitment(self, time_str: str, factor: float) -> str:
-        """Adjust time commitment by a factor."""
-        # Extract prefix if exists (e.g., "每个概念", "每次学习后")
-        prefix = ""
-        if '每个' in time_str:
-            parts = time_str.split('每个')
-            prefix = f"每个{parts[0]}" if parts[0] else "每个"
-            time_str = parts[1]
-        elif '每次' in time_str:
-            parts = time_str.split('每次')
-            prefix = f"每次{parts[0]}" if parts[0] else "每次"
-            time_str = parts[1]
-            
-        # Handle range format (e.g., "30-60分钟")
-        if '-' in time_str:
-            try:
-                start, end = time_str.split('-')
-                if '分钟' in end:
-                    end_num = int(end.replace('分钟', ''))
-                    start_num = int(start)
-                    adjusted_start = int(start_num * factor)
-                    adjusted_end = int(end_num * factor)
-                    return f"{prefix}{adjusted_start}-{adjusted_end}分钟"
-                elif '小时' in end:
-                    end_num = float(end.replace('小时', ''))
-                    start_num = float(start)
-                    adjusted_start = start_num * factor
-                    adjusted_end = end_num * factor
-                    return f"{prefix}{adjusted_start:.1f}-{adjusted_end:.1f}小时"
-            except ValueError:
-                return time_str
-        
-        # Handle single value format
-        if '分钟' in time_str:
-            try:
-                minutes = int(time_str.replace('分钟', ''))
-                return f"{prefix}{int(minutes * factor)}分钟"
-            except ValueError:
-                return time_str
-        elif '小时' in time_str:
-            try:
-                hours = float(time_str.replace('小时', ''))
-                return f"{prefix}{hours * factor:.1f}小时"
-            except ValueError:
-                return time_str
+        """
+        Adjust time commitment by a factor.
         
-        return time_str
+        The prefix ("每天", "每个概念") and unit are kept, so "每个概念30-60分钟"
+        scaled by 1.5 becomes "每个概念45-90分钟". Text without a minute or
+        hour amount is returned unchanged.
+        """
+        duration = parse_duration(time_str)
+        if duration is None or duration.unit not in STUDY_UNITS:
+            return time_str
+        return duration.scaled(factor)
     
     def _adjust_difficulty_description(self, description: str, target_level: str) -> str:
         """Adjust method description based on target difficulty level."""
@@ -0,0 +1,277 @@
+"""
+Opt-in per-request profiling.
+
+A request carrying X-Profile: 1 (or ?profile=1) and an X-Profile-Token
+matching PROFILE_TOKEN is run under a wall-clock stack sampler. One sampler
+thread serves every profiled request at the global PROFILE_SAMPLE_HZ rate
+and at most PROFILE_MAX_CONCURRENT requests are profiled at once, so the
+hook is safe to leave enabled. Finished profiles are kept in memory, where
+the API serves them as collapsed stacks or speedscope files, and optionally
+written to PROFILE_DIR as collapsed stacks, off the event loop.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter, OrderedDict
+from urllib.parse import parse_qs
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from app.core.config import (
+    PROFILE_TOKEN, PROFILE_SAMPLE_HZ, PROFILE_MAX_CONCURRENT, PROFILE_STORE_SIZE, PROFILE_DIR
+)
+
+MAX_DEPTH = 128
+_IDLE_FRAMES = {  # Leaf frames of threads waiting for work
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its queue
+    ("selectors.py", "select"),
+    ("handlers.py", "dequeue")  # Log QueueListener waiting for records
+}
+
+class Profile:
+    def __init__(self, method: str, path: str, thread_id: int, interval: float):
+        """
+        Initialize an empty profile of one request.
+
+        Args:
+            method: HTTP method of the request
+            path: Request path
+            thread_id: Thread serving the request; never skipped as idle
+            interval: Seconds between samples
+
+        stacks counts identical stacks, root first, each rooted at the name
+        of the thread it was seen on.
+        """
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.thread_id = thread_id
+        self.interval = interval
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.samples = 0
+        self.stacks: "Counter[Tuple[str, ...]]" = Counter()
+        self._started = time.perf_counter()
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": self.samples,
+            "interval_ms": round(self.interval * 1000, 2)
+        }
+
+    def collapsed(self) -> str:
+        """Collapsed-stack format, one "frame;frame;frame count" line per stack."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self) -> Dict[str, Any]:
+        """speedscope file: one sampled profile, identical stacks merged and weighted."""
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(round(count * self.interval * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.method} {self.path}",
+            "exporter": "study-methods-backend",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(self.duration_ms, 3),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        sample_hz: float = PROFILE_SAMPLE_HZ,
+        max_concurrent: int = PROFILE_MAX_CONCURRENT,
+        store_size: int = PROFILE_STORE_SIZE,
+        directory: str = PROFILE_DIR
+    ):
+        """
+        Initialize the wall-clock stack sampler shared by every profiled request.
+
+        Samples cover the whole process, so requests served concurrently show
+        up too; threads idling on a queue are skipped.
+
+        Args:
+            sample_hz: Samples per second, whatever the number of profiles
+            max_concurrent: Requests profiled at once
+            store_size: Finished profiles kept in memory
+            directory: Where to also write collapsed stacks; empty to skip
+        """
+        self.interval = 1 / sample_hz if sample_hz > 0 else 0.01
+        self.max_concurrent = max_concurrent
+        self.store_size = store_size
+        self.directory = directory
+        self.skipped = 0
+        self._active: Dict[str, Profile] = {}
+        self._finished: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, method: str, path: str) -> Optional[Profile]:
+        """
+        Start profiling the calling thread's request.
+
+        Returns:
+            The profile, or None when max_concurrent requests are profiled already
+        """
+        with self._lock:
+            if len(self._active) >= self.max_concurrent:
+                self.skipped += 1
+                return None
+            profile = Profile(method, path, threading.get_ident(), self.interval)
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def end(self, profile: Profile) -> None:
+        """Stop sampling a profile and store it in memory."""
+        profile.finish()
+        with self._lock:
+            self._active.pop(profile.id, None)
+            self._finished[profile.id] = profile
+            while len(self._finished) > self.store_size:
+                self._finished.popitem(last=False)
+
+    def write(self, profile: Profile) -> None:
+        """
+        Write a finished profile's collapsed stacks to the directory, if one is set.
+
+        Blocking file I/O: async callers run it on an executor.
+        """
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{profile.id}.collapsed"), "w", encoding="utf-8") as f:
+            f.write(profile.collapsed())
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._finished.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._finished.values())]
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active.values())
+                if not profiles:
+                    self._thread = None
+                    return
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            request_threads = {profile.thread_id for profile in profiles}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if thread_id not in request_threads and (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stack.reverse()
+                stacks.append(tuple(stack))
+            with self._lock:
+                for profile in profiles:
+                    if profile.id not in self._active:
+                        continue  # Ended while this sample was taken
+                    profile.stacks.update(stacks)
+                    profile.samples += 1
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+def get_profiler() -> SamplingProfiler:
+    """Return the process-wide sampling profiler."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = SamplingProfiler()
+        return _profiler
+
+def profile_token_valid(token: Optional[str]) -> bool:
+    """Whether token matches PROFILE_TOKEN; always False while profiling is disabled."""
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that opt in.
+
+    The response carries X-Profile-Id, the id to fetch the profile under, or
+    X-Profile-Skipped: busy at the concurrency cap. Requests that do not opt
+    in only pay for a header lookup; with no PROFILE_TOKEN set, not even that.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        flag = headers.get(b"x-profile", b"").decode("latin-1")
+        if not flag and b"profile=" in scope.get("query_string", b""):
+            flag = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [""])[0]
+        if flag not in ("1", "true") or not profile_token_valid(headers.get(b"x-profile-token", b"").decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = get_profiler()
+        profile = profiler.begin(scope["method"], scope.get("path", ""))
+        result = (b"x-profile-id", profile.id.encode()) if profile else (b"x-profile-skipped", b"busy")
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [result]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if profile is not None:
+                profiler.end(profile)
+                if profiler.directory:
+                    await asyncio.get_running_loop().run_in_executor(None, profiler.write, profile)
@@ -1,9 +1,14 @@
 """
 Task generator for creating structured learning tasks from paths and materials.
 """
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 from datetime import datetime, timedelta
+import hashlib
 import uuid
+from app.core.timing import timed
+from app.core.durations import STUDY_UNITS, UNIT_MINUTES, material_minutes, parse_duration
+
+_UUID_NAMESPACE = uuid.NAMESPACE_URL.bytes
 
 class TaskGenerator:
     def __init__(self):
@@ -74,10 +79,11 @@ class TaskGenerator:
                     raise ValueError(f"Material missing required fields: {', '.join(missing_fields)}")
                     
                 # Validate time format
-                time_str = material['estimated_time']
-                if not any(unit in time_str for unit in ['小时', '分钟']):
+                duration = parse_duration(material['estimated_time'])
+                if duration is None or duration.unit not in STUDY_UNITS:
                     raise ValueError(f"Invalid time format in material '{material['title']}'. Must include '小时' or '分钟'")
 
+    @timed("tasks")
     def generate_tasks(self, path: Dict, materials_by_stage: Dict[str, List[Dict]]) -> Dict:
         """
         Generate monthly, weekly, and daily tasks from a learning path and its materials.
@@ -94,189 +100,327 @@ class TaskGenerator:
             TypeError: If inputs have wrong types
         """
         try:
-            # Validate inputs
-            self._validate_path_structure(path)
-            self._validate_materials(materials_by_stage)
-            
-            # Generate tasks
-            tasks = {
-                "monthly": self._generate_monthly_tasks(path, materials_by_stage),
-                "weekly": self._generate_weekly_tasks(path, materials_by_stage),
-                "daily": self._generate_daily_tasks(path, materials_by_stage)
-            }
+            # Group the lazily generated tasks by kind
+            tasks = {"monthly": [], "weekly": [], "daily": []}
+            for task in self.iter_tasks(path, materials_by_stage):
+                tasks[task.pop("kind")].append(task)
             return tasks
         except Exception as e:
             raise RuntimeError(f"Failed to generate tasks: {str(e)}")
     
-    def _generate_monthly_tasks(self, path: Dict, materials_by_stage: Dict[str, List[Dict]]) -> List[Dict]:
-        """Generate monthly tasks focusing on overall progress and major milestones."""
-        monthly_tasks = []
+    def iter_tasks(
+        self,
+        path: Dict,
+        materials_by_stage: Dict[str, List[Dict]],
+        start_week: int = 1,
+        end_week: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Lazily yield tasks week by week, for streaming and pagination.
         
-        # Calculate total duration in weeks
-        total_weeks = sum(
-            int(stage["duration"].split("-")[1].replace("周", ""))
-            for stage in path["stages"]
-        )
+        Each stage's monthly task comes first, then every week's weekly task
+        followed by its seven daily tasks. Every task carries a "kind" of
+        "monthly", "weekly" or "daily". Task ids are derived from the path id,
+        so a week yields the same ids however the plan is paged.
         
-        # Create monthly overview tasks
-        current_week = 1
-        for stage in path["stages"]:
-            stage_weeks = int(stage["duration"].split("-")[1].replace("周", ""))
+        Args:
+            path: Learning path dictionary
+            materials_by_stage: Dictionary mapping stage IDs to lists of materials
+            start_week: First week to yield (1-based)
+            end_week: Last week to yield, or None for the end of the path
             
-            # Create monthly task for stage
-            monthly_tasks.append({
-                "id": str(uuid.uuid4()),
-                "title": f"完成{stage['title']}",
-                "description": stage["description"],
-                "start_week": current_week,
-                "end_week": current_week + stage_weeks - 1,
-                "stage_id": stage["id"],
-                "materials": [
-                    {
-                        "id": material["id"],
-                        "title": material["title"],
-                        "type": material["type"],
-                        "estimated_time": material["estimated_time"]
-                    }
-                    for material in materials_by_stage.get(stage["id"], [])
-                ],
-                "learning_goals": [
-                    f"掌握{stage['title']}的核心内容",
-                    f"完成{len(materials_by_stage.get(stage['id'], []))}个学习材料",
-                    f"应用{', '.join(stage['methods'])}等学习方法"
-                ],
-                "evaluation_criteria": [
-                    "是否完成所有学习材料",
-                    "是否掌握核心概念",
-                    "是否能够应用所学知识"
-                ]
-            })
+        Yields:
+            Task dictionaries
             
-            current_week += stage_weeks
+        Raises:
+            ValueError: If inputs are invalid
+            TypeError: If inputs have wrong types
+        """
+        self._validate_path_structure(path)
+        self._validate_materials(materials_by_stage)
         
-        return monthly_tasks
-    
-    def _generate_weekly_tasks(self, path: Dict, materials_by_stage: Dict[str, List[Dict]]) -> List[Dict]:
-        """Generate weekly tasks breaking down monthly goals into manageable chunks."""
-        weekly_tasks = []
+        for stage_plan in self._plan_stages(path, materials_by_stage, start_week):
+            first_week = stage_plan["start_week"]
+            if end_week is not None and first_week > end_week:
+                return
+                
+            yield self._build_monthly_task(path, stage_plan)
+            
+            stage = stage_plan["stage"]
+            activities = stage_plan["activities"]
+            for week_index, week_materials in enumerate(stage_plan["weeks"]):
+                week_number = first_week + week_index
+                if week_number < start_week:
+                    continue
+                if end_week is not None and week_number > end_week:
+                    return
+                weekly_task = self._build_weekly_task(path, stage, week_index, week_number, week_materials, activities)
+                yield weekly_task
+                for day in range(7):
+                    yield self._build_daily_task(path, weekly_task, day, week_materials[day::7], activities)
+
+    def generate_compact_tasks(
+        self,
+        path: Dict,
+        materials_by_stage: Dict[str, List[Dict]],
+        start_week: int = 1,
+        end_week: Optional[int] = None
+    ) -> Dict:
+        """
+        Generate tasks in the normalized, de-duplicated format.
+        
+        Activities, materials and checklists are emitted once in lookup tables
+        keyed by id (checklists by name) and tasks reference them, instead of
+        every daily task embedding copies of its week's activities, materials
+        and the fixed checklist. Daily activity status, always "pending" when
+        generated, is omitted.
         
+        Args:
+            path: Learning path dictionary
+            materials_by_stage: Dictionary mapping stage IDs to lists of materials
+            start_week: First week to include (1-based)
+            end_week: Last week to include, or None for the end of the path
+            
+        Returns:
+            Dictionary with "activities", "materials" and "checklists" tables
+            and "monthly", "weekly" and "daily" task lists
+        """
+        compact = {
+            "activities": {},
+            "materials": {},
+            "checklists": {},
+            "monthly": [],
+            "weekly": [],
+            "daily": []
+        }
+        for task in self.iter_tasks(path, materials_by_stage, start_week, end_week):
+            kind = task.pop("kind")
+            for material in task.pop("materials"):
+                entry = compact["materials"].setdefault(material["id"], {
+                    "title": material["title"],
+                    "type": material["type"],
+                    "estimated_time": material["estimated_time"]
+                })
+                activity = material.get("recommended_activity") or material.get("activity")
+                if activity:
+                    entry["recommended_activity"] = activity
+                task.setdefault("material_ids", []).append(material["id"])
+            task.setdefault("material_ids", [])
+            if "activities" in task:
+                activities = task.pop("activities")
+                for activity in activities:
+                    compact["activities"].setdefault(activity["id"], {
+                        key: value for key, value in activity.items()
+                        if key not in ("id", "status")
+                    })
+                task["activity_ids"] = [activity["id"] for activity in activities]
+            if "checklist" in task:
+                task["checklist"] = self._checklist_ref(compact["checklists"], "daily", task["checklist"])
+            if "evaluation_criteria" in task:
+                task["evaluation_criteria"] = self._checklist_ref(
+                    compact["checklists"], "evaluation", task["evaluation_criteria"]
+                )
+            compact[kind].append(task)
+        return compact
+
+    def _checklist_ref(self, checklists: Dict[str, List[str]], name: str, items: List[str]) -> str:
+        """Store a checklist once under its name and return the reference."""
+        checklists.setdefault(name, items)
+        return name
+
+    def total_weeks(self, path: Dict) -> int:
+        """Number of weeks covered by the path's stages."""
+        return sum(self._stage_weeks(stage) for stage in path["stages"])
+
+    def _task_id(self, path: Dict, *parts) -> str:
+        """
+        Stable task id derived from the path id and the task's position.
+        
+        Equal to str(uuid.uuid5(uuid.NAMESPACE_URL, "<path id>/<parts>")), but
+        formatted directly from the digest since a long plan needs thousands.
+        """
+        name = "/".join([str(path["id"]), *map(str, parts)])
+        digest = bytearray(hashlib.sha1(_UUID_NAMESPACE + name.encode("utf-8")).digest()[:16])
+        digest[6] = (digest[6] & 0x0F) | 0x50  # Version 5
+        digest[8] = (digest[8] & 0x3F) | 0x80  # RFC 4122 variant
+        hex_id = digest.hex()
+        return f"{hex_id[:8]}-{hex_id[8:12]}-{hex_id[12:16]}-{hex_id[16:20]}-{hex_id[20:]}"
+
+    def _stage_weeks(self, stage: Dict) -> int:
+        """Upper bound in weeks of a stage duration such as "1-2周"."""
+        duration = parse_duration(stage["duration"])
+        if duration is None:
+            raise ValueError(f"Invalid stage duration: {stage['duration']}")
+        return max(1, int(duration.max_minutes // UNIT_MINUTES["周"]))
+
+    def _plan_stages(
+        self,
+        path: Dict,
+        materials_by_stage: Dict[str, List[Dict]],
+        start_week: int = 1
+    ) -> Iterator[Dict]:
+        """
+        Parse each stage once into what the task builders need.
+        
+        Each stage's duration is parsed a single time. Its materials are
+        distributed across its weeks, with their minutes parsed up front, and
+        its activities get their ids, so weekly and daily tasks reuse the same
+        values instead of re-deriving them. Stages ending before start_week
+        are skipped after parsing their duration.
+        
+        Yields:
+            One entry per stage with "stage", "start_week", "end_week",
+            "materials", "weeks" (materials per week) and "activities"
+        """
         current_week = 1
         for stage in path["stages"]:
-            stage_weeks = int(stage["duration"].split("-")[1].replace("周", ""))
-            stage_materials = materials_by_stage.get(stage["id"], [])
+            stage_weeks = self._stage_weeks(stage)
+            if current_week + stage_weeks - 1 < start_week:
+                current_week += stage_weeks
+                continue
+                
+            stage_materials = [
+                {
+                    "id": material["id"],
+                    "title": material["title"],
+                    "type": material["type"],
+                    "estimated_time": material["estimated_time"],
+                    "recommended_activity": material.get("recommended_activity"),
+                    "minutes": material_minutes(material)
+                }
+                for material in materials_by_stage.get(stage["id"], [])
+            ]
             
             # Distribute materials across weeks
             materials_per_week = len(stage_materials) // stage_weeks
             if materials_per_week == 0:
                 materials_per_week = 1
-            
-            for week in range(stage_weeks):
-                week_materials = stage_materials[week * materials_per_week:(week + 1) * materials_per_week]
                 
-                # Create weekly tasks
-                activities = []
-                for activity in stage["activities"]:
-                    activities.append({
-                        "id": str(uuid.uuid4()),
+            yield {
+                "stage": stage,
+                "start_week": current_week,
+                "end_week": current_week + stage_weeks - 1,
+                "materials": stage_materials,
+                "weeks": [
+                    stage_materials[week * materials_per_week:(week + 1) * materials_per_week]
+                    for week in range(stage_weeks)
+                ],
+                "activities": [
+                    {
+                        "id": self._task_id(path, "activity", stage["id"], index),
                         "type": activity["type"],
                         "description": activity["description"],
                         "duration": activity["duration"],
                         "method": activity["method"]
-                    })
-                
-                weekly_tasks.append({
-                    "id": str(uuid.uuid4()),
-                    "week_number": current_week,
-                    "stage_id": stage["id"],
-                    "title": f"{stage['title']} 第{week + 1}周",
-                    "description": f"完成本周{stage['title']}的学习任务",
-                    "materials": [
-                        {
-                            "id": material["id"],
-                            "title": material["title"],
-                            "type": material["type"],
-                            "estimated_time": material["estimated_time"],
-                            "recommended_activity": material["recommended_activity"]
-                        }
-                        for material in week_materials
-                    ],
-                    "activities": activities,
-                    "total_time": sum(
-                        int(material["estimated_time"].replace("分钟", ""))
-                        for material in week_materials
-                        if "分钟" in material["estimated_time"]
-                    ),
-                    "learning_goals": [
-                        f"完成{len(week_materials)}个学习材料",
-                        f"每日练习{stage['activities'][0]['duration']}",
-                        "复习本周学习内容"
-                    ]
-                })
-                
-                current_week += 1
-        
-        return weekly_tasks
-    
-    def _generate_daily_tasks(self, path: Dict, materials_by_stage: Dict[str, List[Dict]]) -> List[Dict]:
-        """Generate daily tasks for detailed activity planning."""
-        daily_tasks = []
-        
-        # Calculate days needed based on weekly tasks
-        weekly_tasks = self._generate_weekly_tasks(path, materials_by_stage)
-        total_days = len(weekly_tasks) * 7
-        
-        current_day = 1
-        for weekly_task in weekly_tasks:
-            # Distribute weekly materials across days
-            materials = weekly_task["materials"]
-            activities = weekly_task["activities"]
-            
-            # Create tasks for each day of the week
-            for day in range(7):
-                # Assign materials to specific days
-                day_materials = materials[day::7]
-                
-                daily_tasks.append({
-                    "id": str(uuid.uuid4()),
-                    "day_number": current_day,
-                    "week_id": weekly_task["id"],
-                    "title": f"第{current_day}天学习任务",
-                    "description": "完成今日学习任务和练习",
-                    "materials": [
-                        {
-                            "id": material["id"],
-                            "title": material["title"],
-                            "type": material["type"],
-                            "estimated_time": material["estimated_time"],
-                            "activity": material["recommended_activity"]
-                        }
-                        for material in day_materials
-                    ],
-                    "activities": [
-                        {
-                            "id": activity["id"],
-                            "type": activity["type"],
-                            "description": activity["description"],
-                            "duration": activity["duration"],
-                            "method": activity["method"],
-                            "status": "pending"
-                        }
-                        for activity in activities
-                    ],
-                    "total_time": sum(
-                        int(material["estimated_time"].replace("分钟", ""))
-                        for material in day_materials
-                        if "分钟" in material["estimated_time"]
-                    ),
-                    "checklist": [
-                        "完成今日学习材料",
-                        "进行课后练习",
-                        "复习昨日内容",
-                        "记录学习笔记",
-                        "完成自测题"
-                    ]
-                })
-                
-                current_day += 1
-        
-        return daily_tasks
+                    }
+                    for index, activity in enumerate(stage["activities"])
+                ]
+            }
+            current_week += stage_weeks
+
+    def _build_monthly_task(self, path: Dict, stage_plan: Dict) -> Dict:
+        """Build the monthly overview task of a stage."""
+        stage = stage_plan["stage"]
+        stage_materials = stage_plan["materials"]
+        return {
+            "kind": "monthly",
+            "id": self._task_id(path, "monthly", stage["id"]),
+            "title": f"完成{stage['title']}",
+            "description": stage["description"],
+            "start_week": stage_plan["start_week"],
+            "end_week": stage_plan["end_week"],
+            "stage_id": stage["id"],
+            "materials": [
+                {
+                    "id": material["id"],
+                    "title": material["title"],
+                    "type": material["type"],
+                    "estimated_time": material["estimated_time"]
+                }
+                for material in stage_materials
+            ],
+            "learning_goals": [
+                f"掌握{stage['title']}的核心内容",
+                f"完成{len(stage_materials)}个学习材料",
+                f"应用{', '.join(stage['methods'])}等学习方法"
+            ],
+            "evaluation_criteria": [
+                "是否完成所有学习材料",
+                "是否掌握核心概念",
+                "是否能够应用所学知识"
+            ]
+        }
+
+    def _build_weekly_task(
+        self,
+        path: Dict,
+        stage: Dict,
+        week_index: int,
+        week_number: int,
+        week_materials: List[Dict],
+        activities: List[Dict]
+    ) -> Dict:
+        """Build the weekly task for one week of a stage."""
+        return {
+            "kind": "weekly",
+            "id": self._task_id(path, "weekly", week_number),
+            "week_number": week_number,
+            "stage_id": stage["id"],
+            "title": f"{stage['title']} 第{week_index + 1}周",
+            "description": f"完成本周{stage['title']}的学习任务",
+            "materials": [
+                {
+                    "id": material["id"],
+                    "title": material["title"],
+                    "type": material["type"],
+                    "estimated_time": material["estimated_time"],
+                    "recommended_activity": material["recommended_activity"]
+                }
+                for material in week_materials
+            ],
+            "activities": [dict(activity) for activity in activities],
+            "total_time": sum(material["minutes"] for material in week_materials),
+            "learning_goals": [
+                f"完成{len(week_materials)}个学习材料",
+                f"每日练习{stage['activities'][0]['duration']}",
+                "复习本周学习内容"
+            ]
+        }
+
+    def _build_daily_task(
+        self,
+        path: Dict,
+        weekly_task: Dict,
+        day: int,
+        day_materials: List[Dict],
+        activities: List[Dict]
+    ) -> Dict:
+        """Build the daily task for one day of a weekly task."""
+        day_number = (weekly_task["week_number"] - 1) * 7 + day + 1
+        return {
+            "kind": "daily",
+            "id": self._task_id(path, "daily", day_number),
+            "day_number": day_number,
+            "week_id": weekly_task["id"],
+            "title": f"第{day_number}天学习任务",
+            "description": "完成今日学习任务和练习",
+            "materials": [
+                {
+                    "id": material["id"],
+                    "title": material["title"],
+                    "type": material["type"],
+                    "estimated_time": material["estimated_time"],
+                    "activity": material["recommended_activity"]
+                }
+                for material in day_materials
+            ],
+            "activities": [{**activity, "status": "pending"} for activity in activities],
+            "total_time": sum(material["minutes"] for material in day_materials),
+            "checklist": [
+                "完成今日学习材料",
+                "进行课后练习",
+                "复习昨日内容",
+                "记录学习笔记",
+                "完成自测题"
+            ]
+        }
@@ -1,11 +1,17 @@
 """Ultra-minimal FastAPI app with bare essentials only."""
-import gc
 import os
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.api.v1.api import router as api_router
+from app.core.log import configure_logging, start_memory_reporter
+from app.core.metrics import RequestMetricsMiddleware, metrics_registry
+from app.core import durations, job_queue, model_residency  # noqa: F401  Register their metrics
+from app.core.timing import ServerTimingMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.loop_monitor import get_loop_monitor
 
-# Force garbage collection
-gc.collect()
+configure_logging()
 
 # Create minimal FastAPI application
 app = FastAPI()
@@ -23,10 +29,33 @@ app.add_middleware(
     allow_methods=os.getenv("CORS_METHODS", "GET,POST,PUT,DELETE").split(","),
     allow_headers=os.getenv("CORS_HEADERS", "").split(",") or ["*"]
 )
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+app.include_router(api_router, prefix="/api/v1")
+
+@app.on_event("startup")
+async def start_memory_reporting():
+    """Log memory stats on a timer rather than from request handlers."""
+    start_memory_reporter()
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    """Measure event loop lag and capture the stacks of stalls."""
+    get_loop_monitor().start()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    get_loop_monitor().stop()
 
 @app.get("/")
 @app.get("/health")
 async def health_check():
     """Basic health check endpoint."""
-    gc.collect()  # Force garbage collection
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics_registry.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,85 @@
+"""
+Benchmark request latency under each model residency policy.
+
+Runs the /learning-paths/generate pipeline (personalized methods, learning
+path, stage materials) repeatedly in one process and reports the latency
+distribution, model and index loads, and RSS for each policy. The "evict"
+row unloads everything after every request, as generate_path used to.
+
+Usage:
+    python -m app.scripts.benchmark_model_residency --requests 20 --idle-timeout 0 --budget-mb 450
+"""
+import argparse
+import statistics
+import time
+from app.core.learning_path_generator import LearningPathGenerator
+from app.core.memory_governor import get_memory_governor
+from app.core.model_residency import BUDGET, IDLE, KEEP, get_resident_models
+from app.core.personalized_method_generator import PersonalizedMethodGenerator
+
+PROFILE = {
+    "learning_goals": "提高数学理解能力和解题速度",
+    "learning_style": "视觉学习",
+    "available_time": "工作日每天2小时",
+    "preferences": "喜欢通过实例学习",
+    "difficulty_level": "中等",
+    "subjects": "数学"
+}
+
+def run_request() -> float:
+    """Run one generation request and return its latency in ms."""
+    start = time.perf_counter()
+    methods = PersonalizedMethodGenerator().generate_personalized_methods(PROFILE, num_methods=2)
+    path_generator = LearningPathGenerator()
+    path = path_generator.generate_path(methods, PROFILE)
+    path_generator.get_stage_materials(path)
+    return (time.perf_counter() - start) * 1000
+
+def run_policy(policy: str, requests: int, idle_timeout: float, budget_mb: float) -> dict:
+    """Run the requests under one policy, starting with nothing loaded."""
+    models = get_resident_models()
+    governor = get_memory_governor()
+    models.clear()
+    models.policy = policy if policy != "evict" else KEEP
+    models.idle_timeout = idle_timeout
+    governor.budget_mb = budget_mb
+    loads, evictions = models.loads, models.evictions
+
+    latencies = []
+    for _ in range(requests):
+        if policy == IDLE:
+            models.evict_idle()  # What the sweeper thread would have done since the last request
+        latencies.append(run_request())
+        if policy == "evict":
+            models.clear()
+
+    warm = sorted(latencies[1:]) or latencies
+    return {
+        "policy": policy,
+        "first": latencies[0],
+        "p50": statistics.median(warm),
+        "p95": warm[min(len(warm) - 1, int(len(warm) * 0.95))],
+        "loads": models.loads - loads,
+        "evictions": models.evictions - evictions,
+        "rss": governor.rss_mb(fresh=True)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--idle-timeout", type=float, default=0.0, help="Idle policy timeout in seconds")
+    parser.add_argument("--budget-mb", type=float, default=get_memory_governor().budget_mb)
+    parser.add_argument("--policies", default=f"evict,{KEEP},{IDLE},{BUDGET}")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests per policy, idle timeout {args.idle_timeout}s, budget {args.budget_mb:.0f}MB")
+    print(f"{'policy':<8}{'first ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'loads':>7}{'evicted':>9}{'rss MB':>9}")
+    for policy in args.policies.split(","):
+        row = run_policy(policy, args.requests, args.idle_timeout, args.budget_mb)
+        print(
+            f"{row['policy']:<8}{row['first']:>10.1f}{row['p50']:>10.1f}{row['p95']:>10.1f}"
+            f"{row['loads']:>7}{row['evictions']:>9}{row['rss']:>9.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
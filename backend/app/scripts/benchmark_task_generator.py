@@ -0,0 +1,56 @@
+"""
+Benchmark the task generator on long multi-stage plans.
+
+Times full generation, the normalized format and a single one-week page, and
+reports the peak memory of each.
+
+Usage:
+    python -m app.scripts.benchmark_task_generator --stages 12 --weeks 52 --materials-per-stage 20
+"""
+import argparse
+import time
+import tracemalloc
+from app.core.task_generator import TaskGenerator
+from app.scripts.measure_task_payload import build_plan
+
+def measure(func, repeat: int) -> tuple:
+    """Return the best wall time (ms) over repeat runs and the peak traced memory (KB)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", type=int, default=12)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--materials-per-stage", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path, materials_by_stage = build_plan(args.weeks, args.stages, args.materials_per_stage)
+    generator = TaskGenerator()
+    tasks = generator.generate_tasks(path, materials_by_stage)
+    counts = {kind: len(items) for kind, items in tasks.items()}
+    middle_week = args.weeks // 2
+
+    cases = [
+        ("generate_tasks", lambda: generator.generate_tasks(path, materials_by_stage)),
+        ("generate_compact_tasks", lambda: generator.generate_compact_tasks(path, materials_by_stage)),
+        ("iter_tasks (1 week)", lambda: list(generator.iter_tasks(path, materials_by_stage, middle_week, middle_week)))
+    ]
+
+    print(f"{args.weeks}-week plan, {args.stages} stages, {args.materials_per_stage} materials per stage: {counts}")
+    print(f"{'case':<26}{'best ms':>10}{'peak KB':>10}")
+    for name, func in cases:
+        elapsed, peak = measure(func, args.repeat)
+        print(f"{name:<26}{elapsed:>10.1f}{peak:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure the task payload of the expanded and compact response formats.
+
+Builds a synthetic plan shaped like LearningPathGenerator output, so no model
+or knowledge base is loaded, and prints the JSON size of both formats.
+
+Usage:
+    python -m app.scripts.measure_task_payload --weeks 6 --materials-per-stage 2
+"""
+import argparse
+import gzip
+import json
+from app.core.task_generator import TaskGenerator
+
+def build_plan(weeks: int, stages: int, materials_per_stage: int):
+    """Build a path and its materials spanning the given number of weeks."""
+    methods = ["费曼学习法", "间隔重复", "思维导图"]
+    stage_weeks = [weeks // stages + (1 if i < weeks % stages else 0) for i in range(stages)]
+    path = {
+        "id": "payload-benchmark",
+        "title": "数学中等级学习路径",
+        "difficulty_level": "中等",
+        "estimated_duration": f"{weeks}周",
+        "study_methods": methods,
+        "stages": []
+    }
+    materials_by_stage = {}
+    for i, duration in enumerate(stage_weeks):
+        stage_id = f"stage-{i + 1}"
+        path["stages"].append({
+            "id": stage_id,
+            "title": f"第{i + 1}阶段",
+            "description": "掌握核心概念和基础知识",
+            "duration": f"1-{duration}周",
+            "methods": methods,
+            "activities": [
+                {"type": "学习", "description": "理解和掌握基本概念", "method": methods[0], "duration": "每天1-2小时"},
+                {"type": "练习", "description": "完成基础练习和测试", "method": methods[1], "duration": "每天30-60分钟"}
+            ]
+        })
+        materials_by_stage[stage_id] = [
+            {
+                "id": f"{stage_id}-material-{j + 1}",
+                "title": f"函数与方程专题{j + 1}",
+                "type": "视频课程",
+                "estimated_time": "45分钟",
+                "recommended_activity": "学习"
+            }
+            for j in range(materials_per_stage)
+        ]
+    return path, materials_by_stage
+
+def payload_size(data) -> tuple:
+    """Return the raw and gzip-compressed size of data serialized as JSON."""
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    return len(body), len(gzip.compress(body))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=6)
+    parser.add_argument("--stages", type=int, default=3)
+    parser.add_argument("--materials-per-stage", type=int, default=2)
+    args = parser.parse_args()
+
+    path, materials_by_stage = build_plan(args.weeks, args.stages, args.materials_per_stage)
+    generator = TaskGenerator()
+    expanded = payload_size(generator.generate_tasks(path, materials_by_stage))
+    compact = payload_size(generator.generate_compact_tasks(path, materials_by_stage))
+
+    print(f"{args.weeks}-week plan, {args.stages} stages, {args.materials_per_stage} materials per stage")
+    print(f"{'format':<10}{'json bytes':>12}{'gzip bytes':>12}")
+    print(f"{'expanded':<10}{expanded[0]:>12}{expanded[1]:>12}")
+    print(f"{'compact':<10}{compact[0]:>12}{compact[1]:>12}")
+    print(f"{'reduction':<10}{1 - compact[0] / expanded[0]:>12.1%}{1 - compact[1] / expanded[1]:>12.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules are imported as app.*, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.main refuses to start without allowed origins
+os.environ.setdefault("CORS_ORIGINS", "http://localhost:3000")
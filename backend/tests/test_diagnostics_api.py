@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.api.v1 import api
+from app.core import profiling
+from app.main import app
+
+ADMIN = {"X-Admin-Token": "admin-secret"}
+PROFILE = {"X-Profile-Token": "profile-secret"}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", ADMIN["X-Admin-Token"])
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", PROFILE["X-Profile-Token"])
+    return TestClient(app)
+
+@pytest.mark.parametrize("path", ["/api/v1/health", "/api/v1/memory", "/api/v1/timing", "/api/v1/loop"])
+def test_status_endpoints_are_mounted(client, path):
+    assert client.get(path).status_code == 200
+
+def test_memory_reports_governor_and_models(client):
+    body = client.get("/api/v1/memory").json()
+    assert set(body) == {"governor", "models"}
+
+def test_memory_diagnostics_require_admin_token(client):
+    assert client.get("/api/v1/memory/resident").status_code == 403
+    assert client.get("/api/v1/memory/trace", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+def test_memory_trace_round_trip(client):
+    assert client.get("/api/v1/memory/resident", headers=ADMIN).status_code == 200
+    assert client.post("/api/v1/memory/trace/start", headers=ADMIN).json()["tracing"]
+    try:
+        base = client.post("/api/v1/memory/trace/snapshots", headers=ADMIN).json()["snapshot"]
+        assert client.get("/api/v1/memory/trace/top", params={"snapshot": base}, headers=ADMIN).status_code == 200
+        assert client.get("/api/v1/memory/trace/diff", params={"base": base}, headers=ADMIN).status_code == 200
+        assert client.get("/api/v1/memory/trace/top", params={"snapshot": "s0"}, headers=ADMIN).status_code == 404
+    finally:
+        assert not client.post("/api/v1/memory/trace/stop", headers=ADMIN).json()["tracing"]
+
+def test_profiled_request_can_be_fetched(client):
+    response = client.get("/api/v1/health", headers={"X-Profile": "1", **PROFILE})
+    profile_id = response.headers["X-Profile-Id"]
+
+    listed = client.get("/api/v1/profiles", headers=PROFILE).json()["profiles"]
+    assert profile_id in [profile["id"] for profile in listed]
+    assert client.get(f"/api/v1/profiles/{profile_id}", headers=PROFILE).status_code == 200
+    speedscope = client.get(f"/api/v1/profiles/{profile_id}", params={"format": "speedscope"}, headers=PROFILE)
+    assert speedscope.json()["profiles"][0]["type"] == "sampled"
+    assert client.get("/api/v1/profiles", headers={"X-Profile-Token": "wrong"}).status_code == 403
+
+def test_profile_is_written_off_the_event_loop(client, monkeypatch, tmp_path):
+    profiler = profiling.get_profiler()
+    monkeypatch.setattr(profiler, "directory", str(tmp_path))
+    threads = []
+    write = profiler.write
+
+    def recording_write(profile):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()  # Not on the loop's thread
+        threads.append(profile.id)
+        write(profile)
+
+    monkeypatch.setattr(profiler, "write", recording_write)
+    profile_id = client.get("/api/v1/health", headers={"X-Profile": "1", **PROFILE}).headers["X-Profile-Id"]
+    assert threads == [profile_id]
+    assert (tmp_path / f"{profile_id}.collapsed").exists()
@@ -0,0 +1,120 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.core import job_queue
+from app.core.job_queue import Job, JobQueue, JobQueueFull
+
+PROFILE = {
+    "learning_goals": "掌握函数的基本概念",
+    "learning_style": "视觉学习",
+    "available_time": "每天1小时",
+    "difficulty_level": "中等",
+    "subjects": "数学"
+}
+
+def _wait(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job is None or job.done:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def _stage(index):
+    activities = [
+        {"type": "学习", "description": "阅读教材", "method": "m1", "duration": "每天1-2小时"},
+        {"type": "练习", "description": "完成习题", "method": "m2", "duration": "每天30-60分钟"}
+    ]
+    return {
+        "id": f"s{index}", "title": f"阶段{index}", "description": "d", "duration": "1-2周",
+        "methods": ["m1", "m2"], "activities": activities
+    }
+
+def _result():
+    stages = [_stage(index) for index in range(2)]
+    path = {
+        "id": "p1", "title": "函数", "description": "d", "created_at": "", "updated_at": "",
+        "subject": "数学", "difficulty_level": "中等", "estimated_duration": "2-4周", "stages": stages,
+        "prerequisites": [], "learning_goals": "g", "study_methods": ["m1", "m2"], "metadata": {}
+    }
+    materials = {
+        stage["id"]: [
+            {
+                "id": f"{stage['id']}-{index}", "title": "材料", "description": "d", "type": "video",
+                "subject": "数学", "difficulty_level": "中等", "estimated_time": "30分钟",
+                "stage_id": stage["id"], "stage_duration": stage["duration"],
+                "recommended_activity": "学习", "learning_activities": stage["activities"]
+            }
+            for index in range(3)
+        ]
+        for stage in stages
+    }
+    return {"path": path, "materials": materials}
+
+def test_submit_runs_job_and_keeps_result():
+    queue = JobQueue(max_size=2, workers=1, result_ttl=60)
+    job = _wait(queue, queue.submit("sum", sum, [1, 2, 3]).id)
+    assert job.status == Job.SUCCEEDED
+    assert job.result == 6
+    assert queue.stats()["pending"] == 0
+
+def test_failed_job_records_error():
+    queue = JobQueue(max_size=2, workers=1, result_ttl=60)
+    job = _wait(queue, queue.submit("fail", lambda: 1 / 0).id)
+    assert job.status == Job.FAILED
+    assert "division" in job.error
+
+def test_admission_is_bounded_by_max_size():
+    queue = JobQueue(max_size=2, workers=1, result_ttl=60)
+    release = threading.Event()
+    first = queue.submit("block", release.wait)
+    second = queue.submit("block", release.wait)
+    with pytest.raises(JobQueueFull):
+        queue.submit("block", release.wait)
+    release.set()
+    _wait(queue, first.id)
+    _wait(queue, second.id)
+    assert queue.submit("block", release.wait) is not None
+
+def test_finished_jobs_expire_after_ttl():
+    queue = JobQueue(max_size=2, workers=1, result_ttl=0.05)
+    job = _wait(queue, queue.submit("sum", sum, [1]).id)
+    assert job is not None
+    time.sleep(0.1)
+    assert queue.get(job.id) is None
+    assert queue.results() == {}
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.api.v1.endpoints import learning_paths
+    from app.main import app
+    monkeypatch.setattr(learning_paths, "_generate_path", lambda user_info: _result())
+    monkeypatch.setattr(job_queue, "_job_queue", JobQueue(max_size=2, workers=1, result_ttl=60))
+    return TestClient(app)
+
+def test_job_endpoints_are_mounted(client):
+    response = client.post("/api/v1/learning-paths/jobs", json=PROFILE)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    _wait(job_queue.get_job_queue(), job_id)
+    status = client.get(f"/api/v1/learning-paths/jobs/{job_id}")
+    assert status.status_code == 200
+    assert status.json()["status"] == Job.SUCCEEDED
+
+    result = client.get(f"/api/v1/learning-paths/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json()["path"]["id"] == "p1"
+    assert result.json()["tasks"]["daily"]
+
+    page = client.get(f"/api/v1/learning-paths/jobs/{job_id}/tasks", params={"weeks": 1})
+    assert page.status_code == 200
+    assert page.json()["cursor"] == 1
+    assert page.json()["tasks"]
+
+def test_unknown_job_is_404(client):
+    response = client.get("/api/v1/learning-paths/jobs/missing")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Job not found or expired"
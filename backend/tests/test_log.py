@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+def test_importing_modules_that_log_starts_no_listener():
+    code = (
+        "import threading\n"
+        "from app.core import log, materials_knowledge_base, learning_path_generator, personalized_method_generator\n"
+        "assert log._listener is None, 'listener started on import'\n"
+        "assert threading.active_count() == 1, threading.enumerate()\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([backend] + sys.path)}
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,32 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.loop_monitor import LoopMonitor
+
+def _watchdogs():
+    return [thread for thread in threading.enumerate() if thread.name == "loop-watchdog"]
+
+def test_threshold_must_be_positive():
+    with pytest.raises(ValueError):
+        LoopMonitor(0.01, threshold_ms=0)
+
+def test_restart_records_each_stall_once():
+    monitor = LoopMonitor(0.01, threshold_ms=50)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        first = monitor._watchdog
+        monitor.stop()
+        monitor.start()  # Well within threshold/2 of the stop
+        assert not first.is_alive()
+        assert _watchdogs() == [monitor._watchdog]
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)  # Blocks the loop past the threshold
+        await asyncio.sleep(0.02)
+        monitor.stop()
+
+    asyncio.run(run())
+    assert len(monitor.stalls) == 1
+    assert monitor.stalls[0]["lag_ms"] >= 150
@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from app.core import memory_governor
+from app.core.memory_governor import MemoryGovernor
+from app.core.model_residency import BUDGET, IDLE, KEEP, ResidentModels
+
+class FakeRSS:
+    """Stands in for /proc reads; each resident entry costs ``per_entry`` MB on top of ``base``."""
+
+    def __init__(self, monkeypatch, base, per_entry=0.0):
+        self.base = base
+        self.per_entry = per_entry
+        self.models = None
+        monkeypatch.setattr(memory_governor, "read_rss_mb", self)
+
+    def __call__(self):
+        resident = len(self.models.resident_values()) if self.models else 0
+        return self.base + resident * self.per_entry
+
+def _registry(policy, governor, **kwargs):
+    return ResidentModels(policy, governor=governor, **kwargs)
+
+def _loader(value, calls=None):
+    def load():
+        if calls is not None:
+            calls.append(value)
+        return value
+    return load
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ResidentModels("sometimes", governor=MemoryGovernor(budget_mb=1e9))
+
+def test_concurrent_callers_share_one_load():
+    models = _registry(KEEP, MemoryGovernor(budget_mb=1e9))
+    calls = []
+    threads = [threading.Thread(target=models.get, args=("model:x", _loader("model", calls))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["model"]
+    assert models.get("model:x", _loader("model", calls)) == "model"
+    assert models.stats()["loads"] == 1
+
+def test_keep_never_unloads(monkeypatch):
+    FakeRSS(monkeypatch, base=500)
+    models = _registry(KEEP, MemoryGovernor(budget_mb=100))
+    models.get("a", _loader("a"))
+    models.get("b", _loader("b"))
+    assert models.evict_least_recent() is False
+    assert set(models.resident_values()) == {"a", "b"}
+
+def test_idle_unloads_unused_entries():
+    models = _registry(IDLE, MemoryGovernor(budget_mb=1e9), idle_timeout=0.05)
+    models.get("old", _loader("old"))
+    time.sleep(0.1)
+    models.get("new", _loader("new"))
+    assert models.evict_idle() == ["old"]
+    assert set(models.resident_values()) == {"new"}
+
+def test_evicting_a_dependency_unloads_its_dependents():
+    models = _registry(KEEP, MemoryGovernor(budget_mb=1e9))
+    models.get("model:x", _loader("model"))
+    models.get("kb", _loader("kb"), depends_on=("model:x",))
+    assert models.evict("model:x")
+    assert models.resident_values() == {}
+    assert models.evictions == 2
+
+def test_budget_evicts_least_recent_until_under_budget(monkeypatch):
+    rss = FakeRSS(monkeypatch, base=50, per_entry=40)
+    governor = MemoryGovernor(budget_mb=180)
+    models = rss.models = _registry(BUDGET, governor)
+    for key in ("a", "b", "c"):
+        models.get(key, _loader(key))
+    models.get("a", _loader("a"))  # b is now the least recently used
+
+    models.get("d", _loader("d"))
+    assert set(models.resident_values()) == {"a", "c", "d"}
+    assert governor.stats()["evict_no_gain"] == 0
+
+def test_budget_keeps_the_entry_being_returned(monkeypatch):
+    FakeRSS(monkeypatch, base=500)  # Over budget whatever is loaded
+    governor = MemoryGovernor(budget_mb=100)
+    models = _registry(BUDGET, governor)
+    calls = []
+    for _ in range(5):
+        models.get("model:x", _loader("model", calls))
+        models.get("kb", _loader("kb", calls), depends_on=("model:x",))
+
+    assert calls == ["model", "kb"]
+    assert models.stats()["hits"] == 8
+    assert set(models.resident_values()) == {"model:x", "kb"}
+
+def test_budget_stops_evicting_when_rss_does_not_drop(monkeypatch):
+    FakeRSS(monkeypatch, base=500)
+    governor = MemoryGovernor(budget_mb=100)
+    models = _registry(BUDGET, governor)
+    calls = []
+    for _ in range(5):
+        for key in ("a", "b", "c"):
+            models.get(key, _loader(key, calls))
+
+    # One eviction is tried, frees nothing, and later loads leave the rest alone
+    assert models.stats()["evictions"] == 1
+    assert len(calls) == 4
+    assert governor.stats()["evict_no_gain"] == 1